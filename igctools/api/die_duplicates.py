@@ -0,0 +1,94 @@
+# apps/igctools/igctools/api/die_duplicates.py
+import frappe
+
+from igctools.igc_die_duplicates import DUPLICATE_TOLERANCE_MM, find_duplicate_clusters
+from igctools.igc_die_index import _load_die_index_entries
+from igctools.igc_die_matcher import DIE_FEATURES_VERSION, get_die_catalog_version
+
+# Último reporte (se regenera a pedido; la versión del catálogo indica si quedó viejo)
+DUPLICATES_REPORT_KEY = "igctools:die_duplicates_report"
+DUPLICATES_REPORT_TTL = 7 * 24 * 3600
+
+# Evento realtime al terminar
+DUPLICATES_DONE_EVENT = "igctools_die_duplicates_done"
+
+
+def _duplicates_job(tolerance_mm: float = DUPLICATE_TOLERANCE_MM, tipo_producto: str | None = None):
+    """Arma el reporte de clusters de troqueles casi duplicados."""
+    catalog_version = get_die_catalog_version()
+    started = frappe.utils.now_datetime()
+
+    # Troqueles sin features vigentes: _load_die_index_entries los analiza
+    # al vuelo; el reporte dice cuántos para que no parezca que faltan
+    filters = [
+        ["svg_plano_mecanico_individual", "is", "set"],
+        ["igc_die_features_version", "!=", DIE_FEATURES_VERSION],
+    ]
+    if tipo_producto:
+        filters.append(["tipo_producto", "=", tipo_producto])
+    analyzed_on_the_fly = frappe.db.count("Troquel", filters=filters)
+
+    entries = _load_die_index_entries(tipo_producto)
+    clusters, stats = find_duplicate_clusters(entries, tolerance_mm)
+    stats["analyzed_on_the_fly"] = analyzed_on_the_fly
+
+    report = {
+        "tolerance_mm": tolerance_mm,
+        "tipo_producto": tipo_producto,
+        "catalog_version": catalog_version,
+        "created": str(started),
+        "stats": stats,
+        "clusters": clusters,
+    }
+    frappe.cache.set_value(DUPLICATES_REPORT_KEY, report, expires_in_sec=DUPLICATES_REPORT_TTL)
+
+    frappe.publish_realtime(
+        DUPLICATES_DONE_EVENT,
+        {"clusters": len(clusters), **stats},
+        user=frappe.session.user,
+    )
+    return report
+
+
+@frappe.whitelist()
+def find_duplicate_dies(tolerance_mm: float = DUPLICATE_TOLERANCE_MM, tipo_producto: str | None = None, enqueue: int = 1):
+    if not frappe.has_permission(doctype="Troquel", ptype="read"):
+        frappe.throw("Permisos insuficientes")
+
+    tol = float(tolerance_mm if tolerance_mm not in (None, "") else DUPLICATE_TOLERANCE_MM)
+    if tol < 0:
+        frappe.throw("La tolerancia no puede ser negativa")
+    tipo = tipo_producto or None
+
+    if int(enqueue):
+        job = frappe.enqueue(
+            "igctools.api.die_duplicates._duplicates_job",
+            queue="long",
+            job_name="IGCTools: Duplicate Dies Report",
+            job_id="igctools_die_duplicates",
+            deduplicate=True,
+            timeout=60 * 60,
+            tolerance_mm=tol,
+            tipo_producto=tipo,
+        )
+        return {
+            "enqueued": bool(job),
+            "job_name": job.get_id() if job else "igctools_die_duplicates",
+            "done_event": DUPLICATES_DONE_EVENT,
+        }
+    else:
+        return _duplicates_job(tolerance_mm=tol, tipo_producto=tipo)
+
+
+@frappe.whitelist()
+def get_duplicate_dies_report():
+    if not frappe.has_permission(doctype="Troquel", ptype="read"):
+        frappe.throw("Permisos insuficientes")
+
+    report = frappe.cache.get_value(DUPLICATES_REPORT_KEY)
+    if not report:
+        return {"report": None}
+    return {
+        "report": report,
+        "stale": report.get("catalog_version") != get_die_catalog_version(),
+    }
@@ -0,0 +1,181 @@
+# apps/igctools/igctools/api/die_features.py
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import frappe
+from frappe.utils import flt
+
+from igctools.api.die_pitch import PITCH_HEIGHT_FIELD, PITCH_STATUS_PENDING
+from igctools.igc_die_matcher import (
+    DIE_FEATURES_VERSION,
+    _die_features_to_values,
+    analyze_die_svg,
+    bump_die_catalog_version,
+)
+
+# Procesos para analyze_die_svg (CPU puro: XML + geometría)
+REINDEX_PROCESSES = max(1, (os.cpu_count() or 2) - 1)
+
+# Checkpoint persistente (tabla de defaults, sobrevive a un flush de Redis)
+REINDEX_CHECKPOINT_KEY = "igctools_die_reindex_checkpoint"
+
+# Evento realtime con el avance
+REINDEX_PROGRESS_EVENT = "igctools_die_reindex_progress"
+
+
+# =======================
+# Utilidades
+# =======================
+def _analyze_one(svg_text):
+    # Se ejecuta en el pool: solo CPU, nada de frappe/BD
+    svg_text = (svg_text or "").strip()
+    if not svg_text:
+        return {"width": None, "height": None, "dx_list": [], "dy_list": []}
+    return analyze_die_svg(svg_text)
+
+
+def _get_checkpoint():
+    raw = frappe.db.get_global(REINDEX_CHECKPOINT_KEY)
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except Exception:
+        return None
+
+
+def _set_checkpoint(data):
+    frappe.db.set_global(REINDEX_CHECKPOINT_KEY, json.dumps(data) if data else None)
+
+
+def _reindex_filters(force: bool):
+    filters = [["svg_plano_mecanico_individual", "is", "set"]]
+    if not force:
+        filters.append(["igc_die_features_version", "!=", DIE_FEATURES_VERSION])
+    return filters
+
+
+def _publish_progress(state: dict):
+    frappe.publish_realtime(REINDEX_PROGRESS_EVENT, state, user=frappe.session.user)
+
+
+# =======================
+# Job
+# =======================
+def _reindex_job(batch_size: int = 100, force: bool = False, restart: bool = False, processes: int = 0):
+    """
+    Recalcula las features de die de todos los Troqueles.
+    - Paginación keyset por name (estable aunque las filas cambien de versión)
+    - analyze_die_svg repartido en un pool de procesos
+    - Checkpoint tras cada lote: un job cortado retoma donde quedó
+    """
+    checkpoint = None if restart else _get_checkpoint()
+    if checkpoint and bool(checkpoint.get("force")) != force:
+        # Otro tipo de corrida: no mezclar avances
+        checkpoint = None
+
+    state = {
+        "force": force,
+        "last_name": (checkpoint or {}).get("last_name") or "",
+        "processed": int((checkpoint or {}).get("processed") or 0),
+        "errors": int((checkpoint or {}).get("errors") or 0),
+        "resumed": bool(checkpoint),
+    }
+
+    filters = _reindex_filters(force)
+    remaining = frappe.db.count("Troquel", filters=[*filters, ["name", ">", state["last_name"]]])
+    state["total"] = state["processed"] + remaining
+
+    with ProcessPoolExecutor(max_workers=int(processes) or REINDEX_PROCESSES) as pool:
+        while True:
+            rows = frappe.get_all(
+                "Troquel",
+                filters=[*filters, ["name", ">", state["last_name"]]],
+                fields=["name", "svg_plano_mecanico_individual", PITCH_HEIGHT_FIELD],
+                order_by="name asc",
+                page_length=batch_size,
+            )
+            if not rows:
+                break
+
+            try:
+                feats_list = list(pool.map(_analyze_one, [r.svg_plano_mecanico_individual for r in rows]))
+            except Exception as e:
+                frappe.log_error(frappe.utils.cstr(e), "IGCTools: die reindex pool failed")
+                feats_list = [None] * len(rows)
+
+            for row, feats in zip(rows, feats_list, strict=True):
+                try:
+                    if feats is None:
+                        feats = _analyze_one(row.svg_plano_mecanico_individual)
+                    values = _die_features_to_values(feats)
+                    if PITCH_HEIGHT_FIELD in values and values[PITCH_HEIGHT_FIELD] != flt(row.get(PITCH_HEIGHT_FIELD)):
+                        # set_value no pasa por el before_save: el pitch se marca a mano
+                        values["igc_pitch_status"] = PITCH_STATUS_PENDING
+                    frappe.db.set_value("Troquel", row.name, values, update_modified=False)
+                except Exception as e:
+                    state["errors"] += 1
+                    frappe.log_error(frappe.utils.cstr(e), f"IGCTools: die reindex failed for {row.name}")
+
+            state["processed"] += len(rows)
+            state["last_name"] = rows[-1].name
+            _set_checkpoint(state)
+            frappe.db.commit()
+            _publish_progress(state)
+
+    # set_value no dispara hooks: invalidar índices/caches una sola vez al final
+    bump_die_catalog_version()
+    _set_checkpoint(None)
+    frappe.db.commit()
+
+    state["done"] = True
+    _publish_progress(state)
+    return {"ok": True, **state}
+
+
+def enqueue_die_reindex(batch_size: int = 100, force: bool = False, restart: bool = False):
+    """Encola _reindex_job; si ya hay una corrida en cola/ejecución devuelve None."""
+    return frappe.enqueue(
+        "igctools.api.die_features._reindex_job",
+        queue="long",
+        job_name="IGCTools: Rebuild Die Features",
+        job_id="igctools_die_reindex",
+        deduplicate=True,
+        timeout=60 * 60 * 4,
+        batch_size=int(batch_size),
+        force=force,
+        restart=restart,
+    )
+
+
+@frappe.whitelist()
+def rebuild_die_features(batch_size: int = 100, force: int = 0, restart: int = 0, enqueue: int = 1):
+    if not frappe.has_permission(doctype="Troquel", ptype="write"):
+        frappe.throw("Permisos insuficientes")
+
+    force_b = bool(int(force))
+    restart_b = bool(int(restart))
+    enqueue_b = bool(int(enqueue))
+
+    if enqueue_b:
+        job = enqueue_die_reindex(batch_size=int(batch_size), force=force_b, restart=restart_b)
+        # deduplicate: si ya hay una corrida en cola/ejecución no se encola otra
+        return {
+            "enqueued": bool(job),
+            "job_name": job.get_id() if job else "igctools_die_reindex",
+            "progress_event": REINDEX_PROGRESS_EVENT,
+        }
+    else:
+        return _reindex_job(batch_size=int(batch_size), force=force_b, restart=restart_b)
+
+
+@frappe.whitelist()
+def die_features_status():
+    filters = [["svg_plano_mecanico_individual", "is", "set"]]
+    return {
+        "version": DIE_FEATURES_VERSION,
+        "total": frappe.db.count("Troquel", filters=filters),
+        "stale": frappe.db.count("Troquel", filters=_reindex_filters(False)),
+        "checkpoint": _get_checkpoint(),
+    }
@@ -0,0 +1,280 @@
+# apps/igctools/igctools/api/die_pitch.py
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import frappe
+from frappe.utils import cint
+
+from igctools.api.nesting import (
+    PITCH_SOLVER_VERSION,
+    _min_step_y_tetebeche_mm,
+    _pitch_cache_key,
+    get_tetebeche_step_y_mm,
+)
+
+# Procesos para el solver de pitch (CPU puro: SVG + Shapely)
+PITCH_PROCESSES = max(1, (os.cpu_count() or 2) - 1)
+
+# Evento realtime con el avance
+PITCH_PROGRESS_EVENT = "igctools_die_pitch_progress"
+
+PITCH_FIELDS = ["igc_tetebeche_step_y", "igc_grid_step_y", "igc_pitch_error", "igc_pitch_hash", "igc_pitch_status"]
+
+# igc_pitch_status: el before_save de Troquel marca "Pendiente" al cambiar
+# el SVG o el alto, y el job diario solo lee esas filas. Vacío = nunca
+# calculado (Troqueles previos a este campo), también pendiente.
+PITCH_STATUS_PENDING = "Pendiente"
+PITCH_STATUS_DONE = "Calculado"
+PITCH_STATUS_FAILED = "Fallido"
+
+# Versión del solver con la que corrió el último job (tabla de defaults):
+# si cambia, el próximo job revisa todas las filas, no solo las pendientes
+PITCH_SOLVER_VERSION_KEY = "igctools_die_pitch_solver_version"
+
+# Alto con el que se calcula el pitch. Troquel (doctype de otra app) no
+# tiene un campo de alto nominal en el que podamos confiar, así que se usa
+# el alto medido del SVG (igc_die_height, lo llena analyze_die_svg) como
+# sustituto. Si el doctype suma un alto nominal, cambiarlo acá.
+PITCH_HEIGHT_FIELD = "igc_die_height"
+
+
+# =======================
+# Utilidades
+# =======================
+def _pitch_one(args):
+    # Se ejecuta en el pool: solo CPU, nada de BD. Los errores vuelven como
+    # texto (las excepciones de frappe no siempre se pueden picklear)
+    svg_text, height_mm = args
+    try:
+        step_y, error_mm, _stats = _min_step_y_tetebeche_mm(svg_text, height_mm)
+        return {"step_y": step_y, "error_mm": error_mm}
+    except Exception as e:
+        return {"error": frappe.utils.cstr(e) or e.__class__.__name__}
+
+
+def _pitch_values(result, height_mm, geometry_hash):
+    """
+    Campos a guardar en el Troquel. Si el solver falló queda solo el grid
+    (el alto del die), pitch y error en 0 (columnas Float NOT NULL), estado
+    "Fallido" y el hash, para no reintentar hasta que cambie el SVG.
+    """
+    ok = result and "error" not in result
+    return {
+        "igc_tetebeche_step_y": result["step_y"] if ok else 0,
+        "igc_grid_step_y": height_mm,
+        "igc_pitch_error": result["error_mm"] if ok else 0,
+        "igc_pitch_hash": geometry_hash,
+        "igc_pitch_status": PITCH_STATUS_DONE if ok else PITCH_STATUS_FAILED,
+    }
+
+
+def _pitch_filters(pending_only=False):
+    filters = [
+        ["svg_plano_mecanico_individual", "is", "set"],
+        [PITCH_HEIGHT_FIELD, ">", 0],
+    ]
+    if pending_only:
+        # not in aplica ifnull: incluye los que nunca se calcularon
+        filters.append(["igc_pitch_status", "not in", [PITCH_STATUS_DONE, PITCH_STATUS_FAILED]])
+    return filters
+
+
+def mark_pitch_pending(doc, method=None):
+    """
+    before_save en Troquel (después de update_troquel_die_features, que
+    actualiza el alto): SVG o alto nuevos → pitch pendiente.
+    """
+    if doc.is_new() or doc.has_value_changed("svg_plano_mecanico_individual") \
+            or doc.has_value_changed(PITCH_HEIGHT_FIELD):
+        doc.set("igc_pitch_status", PITCH_STATUS_PENDING)
+
+
+def _publish_progress(state: dict):
+    frappe.publish_realtime(PITCH_PROGRESS_EVENT, state, user=frappe.session.user)
+
+
+# =======================
+# Job
+# =======================
+def _pitch_job(batch_size: int = 50, force: bool = False, processes: int = 0):
+    """
+    Precalcula el pitch tête-bêche (sin gap) de los Troqueles a
+    PITCH_HEIGHT_FIELD (alto medido del SVG, sustituto del nominal).
+    - Paginación keyset por name
+    - Solo lee los Troqueles pendientes (igc_pitch_status); todos si
+      cambió PITCH_SOLVER_VERSION desde el último job o con force
+    - De esos, calcula los que no tienen el hash de geometría vigente
+      (todos con force)
+    - El solver corre en un pool de procesos, que se levanta recién con
+      el primer Troquel a calcular (una corrida sin cambios no lo crea)
+    """
+    solver_changed = cint(frappe.db.get_global(PITCH_SOLVER_VERSION_KEY)) != PITCH_SOLVER_VERSION
+    state = {"force": force, "last_name": "", "scanned": 0, "computed": 0, "errors": 0}
+    filters = _pitch_filters(pending_only=not (force or solver_changed))
+    state["total"] = frappe.db.count("Troquel", filters=filters)
+
+    pool = None
+    try:
+        while True:
+            rows = frappe.get_all(
+                "Troquel",
+                filters=[*filters, ["name", ">", state["last_name"]]],
+                fields=[
+                    "name", "svg_plano_mecanico_individual", PITCH_HEIGHT_FIELD,
+                    "igc_pitch_hash", "igc_tetebeche_step_y",
+                ],
+                order_by="name asc",
+                page_length=batch_size,
+            )
+            if not rows:
+                break
+
+            todo = []
+            for row in rows:
+                height_mm = row.get(PITCH_HEIGHT_FIELD)
+                geometry_hash = _pitch_cache_key(row.svg_plano_mecanico_individual, height_mm)
+                if force or row.igc_pitch_hash != geometry_hash:
+                    todo.append((row, height_mm, geometry_hash))
+                else:
+                    # Se guardó sin cambiar la geometría: el valor sigue vigente
+                    status = PITCH_STATUS_DONE if row.igc_tetebeche_step_y else PITCH_STATUS_FAILED
+                    frappe.db.set_value("Troquel", row.name, "igc_pitch_status", status, update_modified=False)
+
+            if todo:
+                args = [(row.svg_plano_mecanico_individual, height_mm) for row, height_mm, _h in todo]
+                try:
+                    if pool is None:
+                        pool = ProcessPoolExecutor(max_workers=int(processes) or PITCH_PROCESSES)
+                    results = list(pool.map(_pitch_one, args))
+                except Exception as e:
+                    frappe.log_error(frappe.utils.cstr(e), "IGCTools: die pitch pool failed")
+                    results = [_pitch_one(a) for a in args]
+
+                for (row, height_mm, geometry_hash), result in zip(todo, results, strict=True):
+                    try:
+                        if "error" in result:
+                            state["errors"] += 1
+                            frappe.log_error(result["error"], f"IGCTools: die pitch failed for {row.name}")
+                        values = _pitch_values(result, height_mm, geometry_hash)
+                        frappe.db.set_value("Troquel", row.name, values, update_modified=False)
+                        state["computed"] += 1
+                    except Exception as e:
+                        state["errors"] += 1
+                        frappe.log_error(frappe.utils.cstr(e), f"IGCTools: die pitch failed for {row.name}")
+
+            state["scanned"] += len(rows)
+            state["last_name"] = rows[-1].name
+            frappe.db.commit()
+            _publish_progress(state)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    frappe.db.set_global(PITCH_SOLVER_VERSION_KEY, PITCH_SOLVER_VERSION)
+    frappe.db.commit()
+
+    state["done"] = True
+    _publish_progress(state)
+    return {"ok": True, **state}
+
+
+def precompute_stale_pitches():
+    """scheduler (daily_long): pitch de los Troqueles pendientes (nuevos o modificados)."""
+    frappe.enqueue(
+        "igctools.api.die_pitch._pitch_job",
+        queue="long",
+        job_name="IGCTools: Precompute Die Pitch",
+        job_id="igctools_die_pitch",
+        deduplicate=True,
+        timeout=60 * 60 * 4,
+    )
+
+
+@frappe.whitelist()
+def rebuild_die_pitches(batch_size: int = 50, force: int = 0, enqueue: int = 1):
+    if not frappe.has_permission(doctype="Troquel", ptype="write"):
+        frappe.throw("Permisos insuficientes")
+
+    force_b = bool(int(force))
+
+    if int(enqueue):
+        job = frappe.enqueue(
+            "igctools.api.die_pitch._pitch_job",
+            queue="long",
+            job_name="IGCTools: Precompute Die Pitch",
+            job_id="igctools_die_pitch",
+            deduplicate=True,
+            timeout=60 * 60 * 4,
+            batch_size=int(batch_size),
+            force=force_b,
+        )
+        return {
+            "enqueued": bool(job),
+            "job_name": job.get_id() if job else "igctools_die_pitch",
+            "progress_event": PITCH_PROGRESS_EVENT,
+        }
+    else:
+        return _pitch_job(batch_size=int(batch_size), force=force_b)
+
+
+@frappe.whitelist()
+def get_troquel_pitch(troquel: str, gap_y_mm: float = 0.0):
+    """
+    Pitch tête-bêche de un Troquel a PITCH_HEIGHT_FIELD. Lee el valor
+    precalculado si el hash de geometría coincide; si no (Troquel nuevo o
+    modificado) corre el solver en vivo (con su propio cache).
+    """
+    if not frappe.has_permission(doctype="Troquel", ptype="read"):
+        frappe.throw("Permisos insuficientes")
+
+    row = frappe.db.get_value(
+        "Troquel",
+        troquel,
+        ["name", "svg_plano_mecanico_individual", PITCH_HEIGHT_FIELD, *PITCH_FIELDS],
+        as_dict=True,
+    )
+    if not row:
+        frappe.throw(f"Troquel {troquel} no encontrado")
+
+    height_mm = row.get(PITCH_HEIGHT_FIELD)
+    if not row.svg_plano_mecanico_individual or not height_mm:
+        frappe.throw(f"El Troquel {troquel} no tiene SVG o alto de die")
+
+    gap_y_mm = float(gap_y_mm or 0.0)
+    geometry_hash = _pitch_cache_key(row.svg_plano_mecanico_individual, height_mm)
+
+    if row.igc_pitch_hash == geometry_hash:
+        source = "precomputed"
+        step_y, error_mm = row.igc_tetebeche_step_y, row.igc_pitch_error
+    else:
+        source = "live"
+        try:
+            step_y, error_mm, _stats, _cached = get_tetebeche_step_y_mm(row.svg_plano_mecanico_individual, height_mm)
+        except Exception as e:
+            frappe.log_error(frappe.utils.cstr(e), f"IGCTools: live die pitch failed for {troquel}")
+            step_y, error_mm = None, None
+
+    if not step_y:
+        # Sin pitch tête-bêche: grid al alto del die
+        source = "grid"
+        step_y, error_mm = height_mm, 0.0
+
+    return {
+        "troquel": row.name,
+        "height_mm": height_mm,
+        "step_y_mm": step_y + gap_y_mm,
+        "grid_step_y_mm": height_mm + gap_y_mm,
+        "error_mm": error_mm,
+        "source": source,
+    }
+
+
+@frappe.whitelist()
+def die_pitch_status():
+    filters = _pitch_filters()
+    return {
+        "total": frappe.db.count("Troquel", filters=filters),
+        "computed": frappe.db.count("Troquel", filters=[*filters, ["igc_pitch_hash", "is", "set"]]),
+        "pending": frappe.db.count("Troquel", filters=_pitch_filters(pending_only=True)),
+        "failed": frappe.db.count("Troquel", filters=[*filters, ["igc_pitch_status", "=", PITCH_STATUS_FAILED]]),
+    }
@@ -1,237 +1,45 @@
-import math
 import frappe
-import xml.etree.ElementTree as ET
-from shapely.geometry import Polygon
-from shapely.affinity import rotate, translate
-from shapely.ops import unary_union
-import pyclipper # Mantenemos esto solo por si lo necesitas para otras utilidades, aunque no lo usaremos para el cálculo principal.
-
-# Usamos una escala grande para mantener la precisión en los floats de Shapely.
-SCALE = 100000 
 
+from igctools.api.nesting import _parse_pitch_args, _resolve_strategy, get_tetebeche_step_y_mm
 
 # ---------------------------------------------------------
-# PARTE 1: utilidades para analizar el SVG y calcular pitch
+# PARTE 1: pitch tête-bêche (motor común de api/nesting.py)
 # ---------------------------------------------------------
 
-def _parse_svg_to_paths(svg_str):
-    """
-    Convierte un SVG en lista de paths (coordenadas flotantes).
-    Solo extrae polígonos y polilíneas simples que formarán el contorno.
-    """
-    root = ET.fromstring(svg_str)
-
-    def tag_name(el):
-        return el.tag.rsplit("}", 1)[-1].lower()
-
-    paths = []
-    min_y = float("inf")
-    max_y = float("-inf")
-
-    # Función auxiliar para añadir puntos y actualizar el Bounding Box (BBox)
-    def add_point(x, y, pts):
-        nonlocal min_y, max_y
-        pts.append((x, y))
-        min_y = min(min_y, y)
-        max_y = max(max_y, y)
-
-    def read_float(tok):
-        try:
-            return float(tok)
-        except Exception:
-            return None
-
-    # Iterar elementos
-    for el in root.iter():
-        t = tag_name(el)
-        
-        # Polygons y Polylines
-        if t in ("polygon", "polyline"):
-            pts_attr = el.get("points") or ""
-            if not pts_attr.strip(): continue
-            
-            coords = pts_attr.replace(",", " ").split()
-            pts = []
-            it = iter(coords)
-            for xs, ys in zip(it, it):
-                x = read_float(xs); y = read_float(ys)
-                if x is not None and y is not None:
-                    add_point(x, y, pts)
-            if pts: paths.append(pts)
-
-        # Paths (M, L, Z) - Versión robusta para extraer solo coordenadas
-        elif t == "path":
-            d = el.get("d") or ""
-            if not d.strip(): continue
-
-            # Simplificamos el parsing para extraer solo M, L, Z
-            tokens = []
-            num = ""
-            for ch in d:
-                if ch.upper() in "MLZ":
-                    if num: tokens.append(num); num = ""
-                    tokens.append(ch)
-                elif ch in " ,-\t\r\n":
-                    if num: tokens.append(num); num = ""
-                    if ch == '-': num += ch
-                else: num += ch
-            if num: tokens.append(num)
-
-            pts = []
-            i = 0
-            x = y = 0.0
-            cmd = None
-            
-            while i < len(tokens):
-                tkn = tokens[i]
-                i += 1
-                
-                if tkn.upper() in ("M", "L"):
-                    cmd = tkn
-                    continue
-                
-                if tkn.upper() == "Z":
-                    if pts and pts[0] != pts[-1]: pts.append(pts[0])
-                    if pts: paths.append(pts); pts = []
-                    continue
-
-                if i >= len(tokens): break
-                
-                nx = read_float(tkn)
-                ny = read_float(tokens[i])
-                i += 1
-                if nx is None or ny is None: continue
-
-                if cmd == "m" or cmd == "l": x += nx; y += ny
-                else: x = nx; y = ny
-
-                add_point(x, y, pts)
-                
-            if pts: paths.append(pts)
-
-    if min_y == float("inf"): min_y, max_y = 0.0, 0.0
-    return paths, min_y, max_y
-
-
-def _rotate_180(paths, min_y, max_y):
-    """Rota 180° alrededor del centro vertical del bbox."""
-    cy = (min_y + max_y) * 0.5
-    rotated = []
-    for path in paths:
-        new_path = []
-        for x, y in path:
-            nx = x
-            ny = 2 * cy - y
-            new_path.append((nx, ny))
-        rotated.append(new_path)
-    return rotated
-
-
-def _calculate_optimal_tetebeche_step(paths_normal, paths_inverted, gap_y_mm):
-    """
-    Calcula el Step Y mínimo para Tête-bêche usando Shapely.
-    
-    La estrategia es: Unir la Pieza Normal y la Pieza Invertida cuando están
-    perfectamente alineadas en X, y usar la altura del polígono resultante (Union).
-    Esto da el pitch mínimo garantizado.
-    """
-    
-    # 1. Convertir todas las paths a polígonos Shapely válidos
-    polygons_normal = []
-    polygons_inverted = []
-    
-    for path in paths_normal:
-        try:
-            poly = Polygon(path)
-            # Validar y limpiar geometrías inválidas (tolerancia a fallos)
-            if poly.is_valid:
-                polygons_normal.append(poly)
-        except Exception:
-            continue
-
-    for path in paths_inverted:
-        try:
-            poly = Polygon(path)
-            if poly.is_valid:
-                polygons_inverted.append(poly)
-        except Exception:
-            continue
-
-    if not polygons_normal or not polygons_inverted:
-        # Falla al convertir las líneas a polígonos cerrados (SVG no tiene áreas cerradas)
-        raise ValueError("El SVG no contiene contornos válidos para el análisis Shapely.")
-
-    # 2. Unión de todos los polígonos de cada pieza
-    piece_normal = unary_union(polygons_normal)
-    piece_inverted = unary_union(polygons_inverted)
-    
-    # 3. Alinear la pieza invertida horizontalmente (X) con la normal
-    #    para que los contornos se encajen perfectamente.
-    x_offset_align = piece_normal.centroid.x - piece_inverted.centroid.x
-    inverted_aligned_x = translate(piece_inverted, xoff=x_offset_align)
-    
-    # 4. Encontrar la distancia vertical (el Pitch)
-    #    La altura del Pitch es la Y_max de la pieza normal - la Y_min de la pieza invertida
-    #    cuando están unidas y encajadas.
-    
-    # Vamos a usar la Suma de la Unión, que nos da la figura más grande posible
-    # cuando están perfectamente apiladas para el anidamiento.
-    combined_union = unary_union([piece_normal, inverted_aligned_x])
-    
-    # El pitch óptimo es la altura total de la unión
-    step_y_vectorial_pitch = combined_union.bounds[3] - combined_union.bounds[1]
-
-    # La distancia final Step Y es el Pitch + Gap
-    final_step_y = step_y_vectorial_pitch + gap_y_mm
-    
-    return final_step_y
-
-
 @frappe.whitelist()
-def compute_tetebeche_pitch(svg, height_mm, width_mm, gap_y_mm=0.0, gap_x_mm=0.0, rotation_deg=0):
+def compute_tetebeche_pitch(svg, height_mm, width_mm, gap_y_mm=0.0, gap_x_mm=0.0, rotation_deg=0, strategy=None):
     """
     API: calcula el paso Y tête-bêche mínimo en mm (usando Shapely/GEOS).
+    Usa el mismo motor y cache que api.nesting.compute_tetebeche_pitch;
+    strategy elige la estrategia (la heurística de unión de antes sigue
+    como "union", solo como línea de base). Nunca devuelve más que el GRID:
+    ante cualquier error, incluida una strategy desconocida, devuelve el
+    GRID con solver "grid".
 
-    Devuelve: { "step_y_mm": <float>, "step_x_mm": <float> }
+    Devuelve: { "step_y_mm": <float>, "step_x_mm": <float>, "solver": <str> }
     """
-    
-    height_mm = float(height_mm)
+    height_mm, gap_y_mm = _parse_pitch_args(height_mm, gap_y_mm)
     width_mm = float(width_mm)
-    gap_y_mm = float(gap_y_mm)
     gap_x_mm = float(gap_x_mm)
-    
+
     # Valores de Respaldo (GRID)
     grid_step_y = height_mm + gap_y_mm
     grid_step_x = width_mm + gap_x_mm
-    
-    try:
-        paths, min_y, max_y = _parse_svg_to_paths(svg)
-        
-        if not paths:
-            frappe.throw("No se pudieron extraer contornos válidos del SVG.")
 
-        up_paths = paths
-        down_paths = _rotate_180(paths, min_y, max_y)
-        
-        # 💡 Cálculo del Step Y con Shapely (Lógica de anidamiento)
-        step_y_mm_calc = _calculate_optimal_tetebeche_step(up_paths, down_paths, gap_y_mm)
+    try:
+        strategy = _resolve_strategy(strategy)
+        step_y, _error_mm, _stats, _cached = get_tetebeche_step_y_mm(svg, height_mm, strategy)
+        step_y_mm_calc = step_y + gap_y_mm
 
-        # 4. Lógica de Respaldo y Verificación
+        # Lógica de Respaldo y Verificación: si el vectorial es peor o igual que GRID, usamos GRID.
         if step_y_mm_calc >= grid_step_y:
-            # Si el cálculo vectorial es peor o igual que GRID, usamos GRID.
-            final_step_y = grid_step_y
-        else:
-            final_step_y = step_y_mm_calc
-            
-        return {"step_y_mm": final_step_y, "step_x_mm": grid_step_x}
+            return {"step_y_mm": grid_step_y, "step_x_mm": grid_step_x, "solver": "grid"}
+        return {"step_y_mm": step_y_mm_calc, "step_x_mm": grid_step_x, "solver": strategy}
 
     except Exception as e:
-        # Fallback a GRID ante cualquier error de librería (PyClipper o Shapely)
+        # Fallback a GRID ante cualquier error de librería (Shapely/GEOS o SVG inválido)
         frappe.log_error(message=f"Fallo estructural en Nesting: {e}", title="GEOMETRY_FALLBACK_TO_GRID")
-        return {
-            "step_y_mm": grid_step_y,
-            "step_x_mm": grid_step_x
-        }
+        return {"step_y_mm": grid_step_y, "step_x_mm": grid_step_x, "solver": "grid"}
 
 
 # ---------------------------------------------------------
@@ -259,4 +67,4 @@ def get_papeles_para_material(material: str):
         order_by="sheet_width desc, sheet_height desc",
     )
 
-    return papeles
\ No newline at end of file
+    return papeles
@@ -1,17 +1,53 @@
 # igctools/api/nesting.py  (parte superior)
 
 import math
+import time
+
 import frappe
 import xml.etree.ElementTree as ET
 
-from shapely.geometry import LineString
-from shapely.ops import unary_union
+import numpy as np
+import shapely
 from shapely.affinity import rotate as shp_rotate, translate as shp_translate
 
+from igctools.igc_cache import cache_get, cache_set, content_hash, single_flight, svg_hash
+from igctools.igc_collision import CollisionEngine
+from igctools.igc_geometry import extract_svg_polylines
+
 # Parámetros de geometría
 TOOL_RADIUS_MM = 0.05   # “grosor” de cuchilla en mm (ajustable)
 CLEAR_TOL_MM   = 0.01   # tolerancia para considerar “sin solape”
 
+# Solver del pitch: "skyline" (perfiles por columna + refinado exacto),
+# "exact" (rayo vertical contra el NFP) o "bisect" (búsqueda binaria
+# original, queda para comparar)
+PITCH_SOLVER = "skyline"
+
+# Subirlo cuando cambie el resultado de algún solver (invalida el cache)
+PITCH_SOLVER_VERSION = 2
+
+# Elementos del SVG que forman el sólido. Sin <rect> ni <line>: marcos,
+# fondos y líneas de pliegue no son corte y agrandarían el pitch.
+NESTING_SVG_TAGS = frozenset(("path", "polygon", "polyline"))
+
+# Cache del pitch sin gap (namespace "nesting_pitch" de igc_cache)
+PITCH_CACHE_TTL = 7 * 24 * 60 * 60
+PITCH_CACHE_MAX_ENTRIES = 5000
+
+# Cálculo asíncrono: cola RQ, timeout por job (al vencer se publica el
+# grid) y evento realtime con el resultado
+PITCH_JOB_QUEUE = "long"
+PITCH_JOB_TIMEOUT = 120
+PITCH_DONE_EVENT = "igctools_tetebeche_pitch_done"
+
+# Grid publicado por un job que venció o falló: lo ve el polling un rato
+# (namespace "nesting_pitch_fallback", fuera del cache del pitch real)
+PITCH_FALLBACK_TTL = 10 * 60
+
+# Skyline: ancho de columna y error máximo aceptado sin refinar
+SKYLINE_RESOLUTION_MM = 0.5
+SKYLINE_TOLERANCE_MM = 0.05
+
 
 # ---------------------------------------------------------
 # 1) Parsear SVG → paths en unidades del SVG
@@ -20,132 +56,21 @@ CLEAR_TOL_MM   = 0.01   # tolerancia para considerar “sin solape”
 def _parse_svg_to_paths(svg_str):
     """
     Devuelve:
-        paths = [ [(x1,y1), (x2,y2), ...], ... ]
-        min_y, max_y   (en unidades tal cual del SVG)
-    Soporta <polygon>, <polyline> y <path> simple (M/L/Z).
-    """
-    root = ET.fromstring(svg_str)
-
-    def tag_name(el):
-        return el.tag.rsplit("}", 1)[-1].lower()
-
-    paths = []
-    min_y = float("inf")
-    max_y = float("-inf")
-
-    def add_path(pts):
-        nonlocal min_y, max_y
-        if len(pts) < 2:
-            return
-        paths.append(pts)
-        for _, y in pts:
-            if y < min_y:
-                min_y = y
-            if y > max_y:
-                max_y = y
-
-    for el in root.iter():
-        t = tag_name(el)
-
-        # --- polygon / polyline ---
-        if t in ("polygon", "polyline"):
-            pts_attr = el.get("points") or ""
-            if not pts_attr.strip():
-                continue
-            coords = pts_attr.replace(",", " ").split()
-            pts = []
-            it = iter(coords)
-            for xs, ys in zip(it, it):
-                try:
-                    x = float(xs)
-                    y = float(ys)
-                    pts.append((x, y))
-                except Exception:
-                    continue
-            add_path(pts)
-
-        # --- path (M/L/Z muy simple, absolutas) ---
-        elif t == "path":
-            d = el.get("d") or ""
-            if not d.strip():
-                continue
-
-            tokens = []
-            num = ""
-            for ch in d:
-                if ch.upper() in "MLZHV":
-                    if num:
-                        tokens.append(num)
-                        num = ""
-                    tokens.append(ch)
-                elif ch in " ,\t\r\n":
-                    if num:
-                        tokens.append(num)
-                        num = ""
-                else:
-                    num += ch
-            if num:
-                tokens.append(num)
-
-            pts = []
-            i = 0
-            x = y = 0.0
-            cmd = None
-
-            def read_float(tok):
-                try:
-                    return float(tok)
-                except Exception:
-                    return None
-
-            while i < len(tokens):
-                tk = tokens[i]
-
-                if tk.upper() in ("M", "L"):
-                    cmd = tk
-                    i += 1
-                    continue
-
-                if tk.upper() == "Z":
-                    # cerrar si hace falta
-                    if pts and pts[0] != pts[-1]:
-                        pts.append(pts[0])
-                    i += 1
-                    continue
-
-                if cmd is None:
-                    i += 1
-                    continue
-
-                if i + 1 >= len(tokens):
-                    break
-
-                nx = read_float(tokens[i])
-                ny = read_float(tokens[i + 1])
-                i += 2
-                if nx is None or ny is None:
-                    continue
-
-                if cmd == "m":
-                    x += nx
-                    y += ny
-                elif cmd == "l":
-                    x += nx
-                    y += ny
-                else:
-                    # M / L absolutas
-                    x = nx
-                    y = ny
-
-                pts.append((x, y))
-
-            add_path(pts)
-
-    if min_y == float("inf"):
-        min_y = 0.0
-        max_y = 0.0
-
-    return paths, min_y, max_y
+        paths = PolylineArrays (cada ítem es un array N x 2)
+        min_y, max_y   (en unidades del SVG, con transforms aplicados)
+    Usa el parser común de igc_geometry, con transforms aplicados, solo
+    sobre NESTING_SVG_TAGS: <path> completo (curvas y arcos aplanados),
+    <polygon> y <polyline>.
+    """
+    try:
+        _root_attrib, paths = extract_svg_polylines(svg_str, tags=NESTING_SVG_TAGS)
+    except ET.ParseError:
+        frappe.throw("SVG inválido para nesting.")
+
+    bounds = paths.bounds()
+    if bounds is None:
+        return paths, 0.0, 0.0
+    return paths, bounds[1], bounds[3]
 
 
 # ---------------------------------------------------------
@@ -166,33 +91,18 @@ def _svg_to_solid_mm(svg_str, height_mm):
     if bbox_h_units <= 0:
         bbox_h_units = 1.0
 
-    # factor unidadesSVG → mm (en vertical)
+    # factor unidadesSVG → mm (en vertical); bottom = 0 mm y X arrancando
+    # en 0 (no afecta al stepY), todo en bloque sobre las coordenadas
     factor = float(height_mm) / float(bbox_h_units)
+    coords_mm = (paths.coords - (paths.coords[:, 0].min(), min_y)) * factor
 
-    lines = []
-    min_x = float("inf")
-    for pts in paths:
-        pts_mm = []
-        for x, y in pts:
-            xx = x * factor
-            yy = (y - min_y) * factor  # bottom = 0 mm
-            pts_mm.append((xx, yy))
-            if xx < min_x:
-                min_x = xx
-        if len(pts_mm) >= 2:
-            lines.append(LineString(pts_mm))
-
-    if not lines:
-        frappe.throw("No se pudieron construir líneas del SVG.")
-
-    # Normalizar X para que arranque en 0 (no afecta al stepY)
-    shift_x = -min_x if min_x not in (float("inf"), float("-inf")) else 0.0
-    if shift_x:
-        lines = [shp_translate(ls, xoff=shift_x, yoff=0.0) for ls in lines]
-
-    # Buffer de cuchilla y unión
-    buffered = [ls.buffer(TOOL_RADIUS_MM, join_style=2) for ls in lines]
-    solid = unary_union(buffered)
+    # Todas las LineStrings, el buffer de cuchilla y la unión en llamadas
+    # de array de Shapely 2 (sin bucle Python por path)
+    lines = shapely.linestrings(
+        coords_mm, indices=np.repeat(np.arange(len(paths)), np.diff(paths.offsets))
+    )
+    buffered = shapely.buffer(lines, TOOL_RADIUS_MM, join_style="mitre")
+    solid = shapely.union_all(buffered)
 
     return solid
 
@@ -201,10 +111,10 @@ def _svg_to_solid_mm(svg_str, height_mm):
 # 3) Buscar stepY mínimo tête-bêche con Shapely
 # ---------------------------------------------------------
 
-def _min_step_y_tetebeche_mm(svg_str, height_mm, gap_y_mm):
+def _tetebeche_solids(svg_str, height_mm):
     """
-    Calcula el stepY mínimo (en mm) para patrón tête-bêche 180°,
-    de modo que no haya solape de sólidos (buffer de cuchilla).
+    (solid_up, solid_down, h): sólido normalizado a bbox con min=0 y su
+    copia rotada 180° sobre el centro del bbox.
     """
     solid_up = _svg_to_solid_mm(svg_str, height_mm)
 
@@ -214,51 +124,378 @@ def _min_step_y_tetebeche_mm(svg_str, height_mm, gap_y_mm):
     minx, miny, maxx, maxy = solid_up.bounds
     h = maxy - miny
 
-    if h <= 0:
-        # fallback: altura nominal + gap
-        return float(height_mm) + float(gap_y_mm)
-
     cx = (minx + maxx) * 0.5
     cy = (miny + maxy) * 0.5
 
     # Sólido invertido 180° sobre el centro
     solid_down = shp_rotate(solid_up, 180.0, origin=(cx, cy), use_radians=False)
+    return solid_up, solid_down, h
+
+
+def _boundary_edges(geom):
+    """Aristas (x1, y1, x2, y2) de todos los anillos (exteriores y huecos)."""
+    rings = shapely.get_rings(shapely.get_parts(geom))
+    coords, ring_idx = shapely.get_coordinates(rings, return_index=True)
+    same_ring = ring_idx[1:] == ring_idx[:-1]
+    return np.column_stack((coords[:-1][same_ring], coords[1:][same_ring]))
+
+
+def _envelope_at(edges, xs, upper):
+    """
+    Envolvente superior (upper=True) o inferior del borde en cada x de xs
+    (ordenado). NaN donde no hay borde. Cada arista se evalúa solo en los
+    xs que cubre; las verticales aportan su extremo más alto/bajo.
+    """
+    x1, y1, x2, y2 = edges.T
+    xmin = np.minimum(x1, x2)
+    xmax = np.maximum(x1, x2)
+    lo = np.searchsorted(xs, xmin, side="left")
+    hi = np.searchsorted(xs, xmax, side="right")
+    counts = hi - lo
+
+    env = np.full(xs.shape[0], -np.inf if upper else np.inf)
+    total = int(counts.sum())
+    if total:
+        edge_idx = np.repeat(np.arange(edges.shape[0]), counts)
+        starts = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+        x_idx = np.arange(total) + starts
+
+        ex1, ey1, ex2, ey2 = x1[edge_idx], y1[edge_idx], x2[edge_idx], y2[edge_idx]
+        dx = ex2 - ex1
+        vertical = dx == 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            t = np.where(vertical, 0.0, (xs[x_idx] - ex1) / np.where(vertical, 1.0, dx))
+        y = ey1 + t * (ey2 - ey1)
+        y = np.where(vertical, np.maximum(ey1, ey2) if upper else np.minimum(ey1, ey2), y)
+
+        if upper:
+            np.maximum.at(env, x_idx, y)
+        else:
+            np.minimum.at(env, x_idx, y)
+
+    env[np.isinf(env)] = np.nan
+    return env
+
+
+def _max_vertical_overlap(solid_a, solid_b):
+    """
+    Mayor dy con el que solid_b + (0, dy) todavía toca a solid_a:
+    max_x (techo_a(x) - piso_b(x)), que es el rayo vertical por el origen
+    contra el no-fit polygon A ⊕ (-B). Ambas envolventes son lineales por
+    tramos con quiebres en x de vértices, así que basta evaluarlas ahí.
+    None si no comparten ningún x.
+    """
+    edges_a = _boundary_edges(solid_a)
+    edges_b = _boundary_edges(solid_b)
+    if not edges_a.shape[0] or not edges_b.shape[0]:
+        return None
+
+    xs = np.unique(np.concatenate((edges_a[:, [0, 2]].ravel(), edges_b[:, [0, 2]].ravel())))
+    top_a = _envelope_at(edges_a, xs, upper=True)
+    bottom_b = _envelope_at(edges_b, xs, upper=False)
+
+    gap = top_a - bottom_b
+    if np.all(np.isnan(gap)):
+        return None
+    return float(np.nanmax(gap))
+
+
+def _column_extremes(edges, grid, upper):
+    """
+    Máximo (upper=True) o mínimo del borde dentro de cada columna
+    [grid[i], grid[i+1]]: el extremo de una envolvente lineal por tramos
+    está en un vértice o en los bordes de la columna. NaN si está vacía.
+    """
+    ncols = grid.shape[0] - 1
+    at_grid = _envelope_at(edges, grid, upper)
+    reduce = np.fmax if upper else np.fmin
+
+    cols = np.full(ncols, -np.inf if upper else np.inf)
+    vx = edges[:, 0]
+    vy = edges[:, 1]
+    col = np.minimum(np.searchsorted(grid, vx, side="right") - 1, ncols - 1)
+    inside = (vx >= grid[0]) & (vx <= grid[-1])
+    (np.maximum if upper else np.minimum).at(cols, col[inside], vy[inside])
+    cols[np.isinf(cols)] = np.nan
+
+    return reduce(cols, reduce(at_grid[:-1], at_grid[1:])), at_grid
+
+
+def _skyline_step_y_mm(shrunk_up, shrunk_down, resolution_mm):
+    """
+    Cota rápida de dy con perfiles por columna (techo del sólido derecho,
+    piso del invertido) muestreados cada resolution_mm sobre X.
+
+    Devuelve (dy, error_mm, grid, candidatos, aristas) o None si no
+    comparten X:
+    - dy = max por columna (techo - piso), nunca por debajo del real
+    - error_mm = dy - (mejor valor exacto en las líneas de la grilla)
+    - candidatos = columnas donde todavía puede estar el real
+    """
+    edges_a = _boundary_edges(shrunk_up)
+    edges_b = _boundary_edges(shrunk_down)
+    if not edges_a.shape[0] or not edges_b.shape[0]:
+        return None
 
-    # Si ya no se solapan con dy=0 (muy raro), devolvemos altura + gap
-    if solid_up.buffer(-CLEAR_TOL_MM).disjoint(
-        solid_down.buffer(-CLEAR_TOL_MM)
-    ):
-        return float(h) + float(gap_y_mm)
+    x_lo = max(edges_a[:, 0].min(), edges_b[:, 0].min())
+    x_hi = min(edges_a[:, 0].max(), edges_b[:, 0].max())
+    if x_hi <= x_lo:
+        return None
+
+    ncols = max(1, int(math.ceil((x_hi - x_lo) / resolution_mm)))
+    grid = np.linspace(x_lo, x_hi, ncols + 1)
+
+    top_cols, top_grid = _column_extremes(edges_a, grid, upper=True)
+    bottom_cols, bottom_grid = _column_extremes(edges_b, grid, upper=False)
+
+    upper_gap = top_cols - bottom_cols
+    lower_gap = top_grid - bottom_grid
+    if np.all(np.isnan(upper_gap)) or np.all(np.isnan(lower_gap)):
+        return None
+
+    dy_upper = float(np.nanmax(upper_gap))
+    dy_lower = float(np.nanmax(lower_gap))
+    candidates = np.flatnonzero(upper_gap >= dy_lower)
+    return dy_upper, dy_upper - dy_lower, grid, candidates, (edges_a, edges_b)
+
+
+def _refine_skyline_mm(grid, candidates, edges):
+    """
+    dy exacto evaluando las envolventes solo en las columnas candidatas:
+    sus bordes y los vértices que caen dentro.
+    """
+    edges_a, edges_b = edges
+    vx = np.concatenate((edges_a[:, 0], edges_b[:, 0]))
+    col = np.searchsorted(grid, vx, side="right") - 1
+    keep = np.zeros(grid.shape[0], dtype=bool)
+    keep[candidates] = True
+    in_candidate = (col >= 0) & (col < grid.shape[0] - 1) & keep[np.clip(col, 0, grid.shape[0] - 1)]
+
+    xs = np.unique(np.concatenate((grid[candidates], grid[candidates + 1], vx[in_candidate])))
+    gap = _envelope_at(edges_a, xs, upper=True) - _envelope_at(edges_b, xs, upper=False)
+    return float(np.nanmax(gap))
+
+
+def _min_step_y_skyline_mm(engine, h):
+    """
+    dy por skyline: (dy, error_mm). Si el error supera SKYLINE_TOLERANCE_MM
+    se refina exacto dentro de las columnas candidatas (error 0).
+    None si no se solapan en dy=0.
+    """
+    if not engine.collides(0.0, 0.0):
+        return None
+
+    sky = _skyline_step_y_mm(engine.static, engine.moving, SKYLINE_RESOLUTION_MM)
+    if sky is None:
+        return None
+    dy, error_mm, grid, candidates, edges = sky
+
+    if error_mm > SKYLINE_TOLERANCE_MM:
+        dy = _refine_skyline_mm(grid, candidates, edges)
+        error_mm = 0.0
+
+    dy = min(max(dy, 0.0), h)
+    return dy, error_mm
+
+
+def _min_step_y_bisect_mm(engine, h):
+    """
+    Búsqueda binaria original de dy (40 pasos, solo para validar el
+    solver exacto). Devuelve dy sin gap, o None si no se solapan en dy=0.
+    """
+    if not engine.collides(0.0, 0.0):
+        return None
 
     lo = 0.0
     hi = h  # cota máxima: una altura completa entre centros
 
-    # Búsqueda binaria en dy
+    # Búsqueda binaria en dy; el motor ya tiene los sólidos achicados
     for _ in range(40):  # precisión sub-micrón en la práctica
         mid = (lo + hi) * 0.5
-        test = shp_translate(solid_down, xoff=0.0, yoff=mid)
-        # Checamos intersección con un pequeño "shrink" para evitar ruido numérico
-        if solid_up.buffer(-CLEAR_TOL_MM).intersects(
-            test.buffer(-CLEAR_TOL_MM)
-        ):
+        if engine.collides(0.0, mid):
             lo = mid
         else:
             hi = mid
 
-    # hi ≈ mínimo dy sin solape; le sumamos gap_y_mm usuario
-    return hi + float(gap_y_mm)
+    return hi
+
+
+def _min_step_y_exact_mm(engine, h):
+    """
+    dy mínimo exacto: el último contacto del rayo vertical contra el NFP
+    de los sólidos achicados del motor.
+    Devuelve dy sin gap, o None si no se solapan en dy=0.
+    """
+    if not engine.collides(0.0, 0.0):
+        return None
+
+    dy = _max_vertical_overlap(engine.static, engine.moving)
+    if dy is None:
+        return None
+    # Igual que la bisección: nunca más de una altura completa
+    return min(max(dy, 0.0), h)
+
+
+def _pitch_engine(solid_up, solid_down):
+    """Motor de colisiones del par tête-bêche (ambos achicados CLEAR_TOL_MM)."""
+    return CollisionEngine(solid_up, solid_down, clearance_mm=CLEAR_TOL_MM)
+
+
+def _min_step_y_union_mm(engine, h):
+    """
+    Línea de base heredada, no es un solver: la heurística de unión que
+    tenía api/igc_nesting.py (pieza invertida alineada en X por centroide,
+    pitch = alto de la unión). No busca el encaje, así que da siempre
+    ~h, igual que el grid. Queda solo para comparar en el benchmark y
+    para pedidos viejos con strategy="union"; no usarla como default.
+    """
+    static, moving = engine.static, engine.moving
+    if static.is_empty or moving.is_empty:
+        return None
+    aligned = shp_translate(moving, xoff=static.centroid.x - moving.centroid.x)
+    minx, miny, maxx, maxy = shapely.union_all([static, aligned]).bounds
+    return min(maxy - miny, h), None
+
+
+def _strategy_bisect(engine, h):
+    dy = _min_step_y_bisect_mm(engine, h)
+    return None if dy is None else (dy, h / 2**40)
+
+
+def _strategy_exact(engine, h):
+    dy = _min_step_y_exact_mm(engine, h)
+    return None if dy is None else (dy, 0.0)
+
+
+# Estrategias de pitch: fn(engine, h) -> (dy, error_mm) sin gap, o None si
+# los sólidos no se solapan en dy=0. error_mm None = sin cota conocida.
+PITCH_STRATEGIES = {
+    "skyline": _min_step_y_skyline_mm,
+    "exact": _strategy_exact,
+    "bisect": _strategy_bisect,
+    "union": _min_step_y_union_mm,  # línea de base heredada (~h)
+}
+
+
+def _resolve_strategy(strategy=None):
+    strategy = strategy or PITCH_SOLVER
+    if strategy not in PITCH_STRATEGIES:
+        frappe.throw(f"Estrategia de pitch desconocida: {strategy}. Opciones: {', '.join(PITCH_STRATEGIES)}")
+    return strategy
+
+
+def _pitch_geometry(svg_str, height_mm):
+    """
+    Etapa común a todas las estrategias: parseo, sólido con buffer de
+    cuchilla, copia invertida y motor de colisiones (sólidos achicados).
+    Devuelve (engine, h); engine None si el sólido no tiene alto.
+    """
+    solid_up, solid_down, h = _tetebeche_solids(svg_str, height_mm)
+    if h <= 0:
+        return None, h
+    return _pitch_engine(solid_up, solid_down), h
+
+
+def _solve_step_y_mm(engine, h, strategy):
+    """(step_y, error_mm, stats) de una estrategia sobre geometría ya armada."""
+    solved = PITCH_STRATEGIES[strategy](engine, h)
+
+    # Si ya no se solapan con dy=0 (muy raro), devolvemos la altura
+    if solved is None:
+        return float(h), 0.0, engine.stats()
+
+    # dy = mínimo sin solape; el gap del usuario se suma afuera
+    dy, error_mm = solved
+    return dy, error_mm, engine.stats()
+
+
+def _min_step_y_tetebeche_mm(svg_str, height_mm, strategy=None):
+    """
+    Calcula el stepY mínimo (en mm, sin gap) para patrón tête-bêche 180°,
+    de modo que no haya solape de sólidos (buffer de cuchilla).
+    Devuelve (step_y, error_mm, stats): error_mm es la cota de cuánto
+    puede sobrar el stepY respecto del exacto (nunca queda corto) y stats
+    los contadores del motor de colisiones.
+    """
+    strategy = _resolve_strategy(strategy)
+    engine, h = _pitch_geometry(svg_str, height_mm)
+
+    if engine is None:
+        # fallback: altura nominal
+        return float(height_mm), 0.0, {}
+
+    return _solve_step_y_mm(engine, h, strategy)
+
+
+def compare_tetebeche_strategies(svg_str, height_mm, strategies=None):
+    """
+    Corre varias estrategias sobre la misma geometría (se arma una vez).
+    Devuelve {estrategia: {"step_y_mm", "error_mm", "elapsed_ms", "collision"}}.
+    """
+    strategies = [_resolve_strategy(s) for s in (strategies or PITCH_STRATEGIES)]
+    engine, h = _pitch_geometry(svg_str, height_mm)
+
+    out = {}
+    for strategy in strategies:
+        if engine is None:
+            out[strategy] = {"step_y_mm": float(height_mm), "error_mm": 0.0, "elapsed_ms": 0.0, "collision": {}}
+            continue
+        engine.reset_stats()
+        started = time.perf_counter()
+        step_y, error_mm, stats = _solve_step_y_mm(engine, h, strategy)
+        out[strategy] = {
+            "step_y_mm": step_y,
+            "error_mm": error_mm,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000.0, 3),
+            "collision": stats,
+        }
+    return out
+
+
+def _pitch_cache_key(svg_str, height_mm, strategy=None):
+    """
+    Clave del pitch geométrico: todo lo que cambia el resultado menos el
+    gap, que solo se suma al final.
+    """
+    return content_hash(
+        svg_hash(svg_str),
+        float(height_mm),
+        TOOL_RADIUS_MM,
+        CLEAR_TOL_MM,
+        strategy or PITCH_SOLVER,
+        PITCH_SOLVER_VERSION,
+        SKYLINE_RESOLUTION_MM,
+        SKYLINE_TOLERANCE_MM,
+    )
+
+
+def get_tetebeche_step_y_mm(svg_str, height_mm, strategy=None):
+    """
+    stepY geométrico (sin gap) cacheado en "nesting_pitch".
+    Devuelve (step_y, error_mm, stats, cached).
+    """
+    strategy = _resolve_strategy(strategy)
+
+    def compute():
+        step_y, error_mm, stats = _min_step_y_tetebeche_mm(svg_str, height_mm, strategy)
+        return {"step_y_mm": step_y, "error_mm": error_mm, "collision": stats}
+
+    # single-flight: el mismo SVG/alto pedido a la vez se calcula una vez
+    value, origin = single_flight(
+        "nesting_pitch",
+        _pitch_cache_key(svg_str, height_mm, strategy),
+        compute,
+        ttl=PITCH_CACHE_TTL,
+        max_entries=PITCH_CACHE_MAX_ENTRIES,
+    )
+    return value["step_y_mm"], value["error_mm"], value["collision"], origin != "computed"
 
 
 # ---------------------------------------------------------
 # 4) API pública que usa el client script
 # ---------------------------------------------------------
 
-@frappe.whitelist()
-def compute_tetebeche_pitch(svg, height_mm, gap_y_mm=0.0, rotation_deg=0):
-    """
-    Devuelve el pitch vertical (stepY) tête-bêche en mm, usando Shapely.
-    Firmas compatibes con el client script actual.
-    """
+def _parse_pitch_args(height_mm, gap_y_mm):
     try:
         height_mm = float(height_mm or 0.0)
         gap_y_mm = float(gap_y_mm or 0.0)
@@ -267,6 +504,179 @@ def compute_tetebeche_pitch(svg, height_mm, gap_y_mm=0.0, rotation_deg=0):
 
     if height_mm <= 0:
         frappe.throw("height_mm debe ser > 0")
+    return height_mm, gap_y_mm
+
+
+@frappe.whitelist()
+def compute_tetebeche_pitch(svg, height_mm, gap_y_mm=0.0, rotation_deg=0, strategy=None):
+    """
+    Devuelve el pitch vertical (stepY) tête-bêche en mm, usando Shapely.
+    Firmas compatibes con el client script actual.
+    El pitch sin gap se cachea: cambiar solo el gap no recalcula nada.
+    strategy: una de PITCH_STRATEGIES (default PITCH_SOLVER).
+    """
+    height_mm, gap_y_mm = _parse_pitch_args(height_mm, gap_y_mm)
+    strategy = _resolve_strategy(strategy)
 
-    step_y = _min_step_y_tetebeche_mm(svg, height_mm, gap_y_mm)
-    return {"step_y_mm": step_y}
+    step_y, error_mm, stats, cached = get_tetebeche_step_y_mm(svg, height_mm, strategy)
+    return {
+        "step_y_mm": step_y + gap_y_mm,
+        "error_mm": error_mm,
+        "solver": strategy,
+        "collision": stats,
+        "cached": cached,
+    }
+
+
+# ---------------------------------------------------------
+# 5) Cálculo asíncrono (no retiene al worker web)
+# ---------------------------------------------------------
+
+def _pitch_job_id(key):
+    return f"igctools_pitch_{key[:32]}"
+
+
+def _pitch_waiters_key(key):
+    # Usuarios (y su gap) esperando el mismo cálculo: "user|gap"
+    return f"igctools:nesting_pitch_waiters:{key}"
+
+
+def _publish_pitch_result(key, result):
+    """Publica el resultado a cada usuario que lo pidió, con su propio gap."""
+    waiters_key = _pitch_waiters_key(key)
+    waiters = [w.decode() if isinstance(w, bytes) else w for w in frappe.cache.smembers(waiters_key)]
+
+    for waiter in waiters:
+        user, _sep, gap = waiter.rpartition("|")
+        frappe.publish_realtime(
+            PITCH_DONE_EVENT,
+            {**result, "job_key": key, "step_y_mm": result["step_y_mm"] + float(gap or 0.0)},
+            user=user,
+        )
+    if waiters:
+        # srem y no delete: quien se sumó mientras publicábamos sigue en espera
+        frappe.cache.srem(waiters_key, *waiters)
+
+
+def _tetebeche_pitch_job(svg, height_mm, key, strategy=None):
+    """
+    Job RQ: calcula el pitch sin gap (queda en el cache) y lo publica. Si
+    vence el timeout del job o falla el solver se publica el grid.
+    """
+    from rq.timeouts import JobTimeoutException
+
+    try:
+        step_y, error_mm, stats, _cached = get_tetebeche_step_y_mm(svg, height_mm, strategy)
+        result = {"step_y_mm": step_y, "error_mm": error_mm, "solver": strategy or PITCH_SOLVER, "collision": stats}
+    except JobTimeoutException:
+        result = {"step_y_mm": height_mm, "error_mm": None, "solver": "grid", "timeout": True}
+    except Exception as e:
+        frappe.log_error(frappe.utils.cstr(e), "IGCTools: tetebeche pitch job")
+        result = {"step_y_mm": height_mm, "error_mm": None, "solver": "grid", "error": frappe.utils.cstr(e)}
+
+    if result["solver"] == "grid":
+        cache_set("nesting_pitch_fallback", key, result, ttl=PITCH_FALLBACK_TTL, max_entries=PITCH_CACHE_MAX_ENTRIES)
+    _publish_pitch_result(key, result)
+    return result
+
+
+@frappe.whitelist()
+def enqueue_tetebeche_pitch(svg, height_mm, gap_y_mm=0.0, rotation_deg=0, strategy=None):
+    """
+    Versión asíncrona de compute_tetebeche_pitch. Si el pitch ya está en
+    cache responde al instante; si no, encola el cálculo y devuelve el
+    job_key. El resultado llega por PITCH_DONE_EVENT (o el grid si vence
+    PITCH_JOB_TIMEOUT). Pedidos iguales en vuelo comparten un solo job.
+    """
+    height_mm, gap_y_mm = _parse_pitch_args(height_mm, gap_y_mm)
+    strategy = _resolve_strategy(strategy)
+    key = _pitch_cache_key(svg, height_mm, strategy)
+
+    cached = cache_get("nesting_pitch", key)
+    if cached is not None:
+        return {
+            "done": True,
+            "job_key": key,
+            "step_y_mm": cached["step_y_mm"] + gap_y_mm,
+            "error_mm": cached["error_mm"],
+            "solver": strategy,
+            "cached": True,
+        }
+
+    waiters_key = _pitch_waiters_key(key)
+    frappe.cache.sadd(waiters_key, f"{frappe.session.user}|{gap_y_mm}")
+    frappe.cache.expire(frappe.cache.make_key(waiters_key), PITCH_JOB_TIMEOUT * 10)
+
+    # deduplicate por job_id: si el mismo cálculo ya está en cola/ejecución
+    # no se encola otro, el pedido solo se suma a la lista de espera
+    job = frappe.enqueue(
+        "igctools.api.nesting._tetebeche_pitch_job",
+        queue=PITCH_JOB_QUEUE,
+        job_name="IGCTools: Tete-beche Pitch",
+        job_id=_pitch_job_id(key),
+        deduplicate=True,
+        timeout=PITCH_JOB_TIMEOUT,
+        svg=svg,
+        height_mm=height_mm,
+        key=key,
+        strategy=strategy,
+    )
+    return {
+        "done": False,
+        "job_key": key,
+        "coalesced": not job,
+        "done_event": PITCH_DONE_EVENT,
+        "grid_step_y_mm": height_mm + gap_y_mm,
+    }
+
+
+@frappe.whitelist()
+def get_tetebeche_pitch_result(job_key, gap_y_mm=0.0):
+    """
+    Consulta (polling) del resultado de enqueue_tetebeche_pitch. Si el job
+    venció o falló devuelve el grid (fallback=True) mientras dure
+    PITCH_FALLBACK_TTL; pedir de nuevo el pitch vuelve a encolarlo.
+    """
+    cached = cache_get("nesting_pitch", job_key)
+    fallback = cached is None
+    if fallback:
+        cached = cache_get("nesting_pitch_fallback", job_key)
+    if cached is None:
+        return {"done": False, "job_key": job_key}
+    return {
+        "done": True,
+        "job_key": job_key,
+        "step_y_mm": cached["step_y_mm"] + float(gap_y_mm or 0.0),
+        "error_mm": cached["error_mm"],
+        "fallback": fallback,
+    }
+
+
+@frappe.whitelist()
+def cancel_tetebeche_pitch(job_key, gap_y_mm=0.0):
+    """
+    Saca al usuario de la espera; si ya no queda nadie esperando se
+    cancela el job (en cola) o se le pide a RQ que lo detenga.
+    """
+    from frappe.utils.background_jobs import get_job
+
+    waiters_key = _pitch_waiters_key(job_key)
+    frappe.cache.srem(waiters_key, f"{frappe.session.user}|{float(gap_y_mm or 0.0)}")
+    if frappe.cache.smembers(waiters_key):
+        return {"cancelled": False, "waiting": True}
+
+    job = get_job(_pitch_job_id(job_key))
+    if not job:
+        return {"cancelled": False}
+
+    try:
+        if job.get_status() == "started":
+            from rq.command import send_stop_job_command
+
+            send_stop_job_command(job.connection, job.id)
+        else:
+            job.cancel()
+    except Exception as e:
+        frappe.log_error(frappe.utils.cstr(e), "IGCTools: cancel tetebeche pitch")
+        return {"cancelled": False}
+    return {"cancelled": True}
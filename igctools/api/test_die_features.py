@@ -0,0 +1,76 @@
+# Copyright (c) 2025, Ezequiel Sierra and Contributors
+# See license.txt
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from igctools.api import die_features
+from igctools.igc_die_matcher import DIE_FEATURES_VERSION, _stored_die_features, get_die_catalog_version
+from igctools.test_igc_die_search import DieCatalogTestCase
+
+
+class _Interrupted(Exception):
+    pass
+
+
+class TestDieReindex(DieCatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        for row in self.rows:
+            row.update(igc_die_features_version=0, igc_die_signature=None)
+
+        # Hilos en lugar de procesos: mismo camino de código, sin fork
+        patcher = patch.object(die_features, "ProcessPoolExecutor", ThreadPoolExecutor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _stale(self):
+        return sorted(r["name"] for r in self.rows if _stored_die_features(r) is None)
+
+    def test_interrupted_run_resumes_from_checkpoint(self):
+        # El job se corta después de guardar el primer lote
+        with patch.object(die_features, "_publish_progress", side_effect=_Interrupted):
+            with self.assertRaises(_Interrupted):
+                die_features._reindex_job(batch_size=4)
+
+        checkpoint = die_features._get_checkpoint()
+        self.assertEqual((checkpoint["processed"], checkpoint["last_name"]), (4, "TRQ-0003"))
+        self.assertEqual(self._stale(), [f"TRQ-{i:04d}" for i in range(4, len(self.rows))])
+
+        version = get_die_catalog_version()
+        with patch.object(die_features, "analyze_die_svg", wraps=die_features.analyze_die_svg) as analyze:
+            state = die_features._reindex_job(batch_size=4)
+
+        # Retoma: no vuelve a analizar el primer lote
+        self.assertEqual(analyze.call_count, len(self.rows) - 4)
+        self.assertTrue(state["resumed"])
+        self.assertEqual((state["processed"], state["total"], state["errors"]), (len(self.rows), len(self.rows), 0))
+        self.assertEqual(self._stale(), [])
+        self.assertIsNone(die_features._get_checkpoint())
+        self.assertNotEqual(get_die_catalog_version(), version)
+        self.assertEqual(die_features.die_features_status()["stale"], 0)
+
+    def test_restart_and_force_ignore_checkpoint(self):
+        die_features._set_checkpoint({"force": False, "last_name": "TRQ-0010", "processed": 11, "errors": 0})
+
+        state = die_features._reindex_job(batch_size=8, restart=True)
+        self.assertFalse(state["resumed"])
+        self.assertEqual(state["processed"], len(self.rows))
+
+        # Una corrida force no mezcla avances con una normal
+        die_features._set_checkpoint({"force": False, "last_name": "TRQ-0010", "processed": 11, "errors": 0})
+        state = die_features._reindex_job(batch_size=8, force=True)
+        self.assertFalse(state["resumed"])
+        self.assertEqual(state["processed"], len(self.rows))
+        self.assertTrue(all(r["igc_die_features_version"] == DIE_FEATURES_VERSION for r in self.rows))
+
+    def test_unreadable_svg_stores_zero_dimensions(self):
+        self.rows[0]["svg_plano_mecanico_individual"] = "<svg><path d="
+        die_features._reindex_job(batch_size=8)
+
+        # Columnas Float NOT NULL: 0 en lugar de None, y la fila queda al día
+        row = self.rows[0]
+        self.assertEqual((row["igc_die_width"], row["igc_die_height"]), (0.0, 0.0))
+        self.assertEqual(row["igc_die_features_version"], DIE_FEATURES_VERSION)
+        self.assertEqual(_stored_die_features(row)["width"], None)
+        self.assertEqual(self._stale(), [])
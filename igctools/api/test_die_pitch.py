@@ -0,0 +1,150 @@
+# Copyright (c) 2025, Ezequiel Sierra and Contributors
+# See license.txt
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from igctools.api import die_features, die_pitch
+from igctools.api.nesting import _pitch_cache_key
+from igctools.api.test_nesting import DIE_SVGS
+from igctools.tests.utils import use_frappe_sandbox
+
+
+def _troqueles():
+    return [
+        {"name": f"T-{i}", "svg_plano_mecanico_individual": svg, die_pitch.PITCH_HEIGHT_FIELD: height_mm}
+        for i, (svg, height_mm) in enumerate(DIE_SVGS)
+    ]
+
+
+class _Doc(dict):
+    """Lo mínimo de un Document para el before_save de Troquel."""
+
+    def __init__(self, changed=(), new=False, **fields):
+        super().__init__(fields)
+        self._changed = set(changed)
+        self._new = new
+
+    def is_new(self):
+        return self._new
+
+    def has_value_changed(self, fieldname):
+        return fieldname in self._changed
+
+    def set(self, fieldname, value):
+        self[fieldname] = value
+
+
+class TestDiePitch(FrappeTestCase):
+    def setUp(self):
+        self.rows = _troqueles()
+        self.catalog, _cache = use_frappe_sandbox(self, self.rows)
+
+        # Hilos en lugar de procesos: mismo camino de código, sin fork
+        patcher = patch.object(die_pitch, "ProcessPoolExecutor", MagicMock(side_effect=ThreadPoolExecutor))
+        self.pool_cls = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _save(self, name, changed):
+        """Guarda con el before_save de pitch, como haría doc.save()."""
+        row = self.catalog.rows[name]
+        doc = _Doc(changed=changed, **row)
+        die_pitch.mark_pitch_pending(doc)
+        row.update(doc)
+
+    def test_job_computes_pending_rows_only(self):
+        state = die_pitch._pitch_job(batch_size=2)
+
+        self.assertEqual((state["scanned"], state["computed"], state["errors"]), (3, 3, 0))
+        for row in self.rows:
+            height_mm = row[die_pitch.PITCH_HEIGHT_FIELD]
+            self.assertEqual(row["igc_pitch_hash"], _pitch_cache_key(row["svg_plano_mecanico_individual"], height_mm))
+            self.assertEqual(row["igc_grid_step_y"], height_mm)
+            self.assertGreater(row["igc_tetebeche_step_y"], 0)
+            self.assertEqual(row["igc_pitch_status"], die_pitch.PITCH_STATUS_DONE)
+
+        # Nada pendiente: no se lee ningún SVG y el pool ni se crea
+        self.pool_cls.reset_mock()
+        with patch.object(die_pitch, "_pitch_cache_key", side_effect=AssertionError("no debía hashear")):
+            state = die_pitch._pitch_job(batch_size=2)
+        self.assertEqual((state["scanned"], state["computed"]), (0, 0))
+        self.pool_cls.assert_not_called()
+
+        # Cambia el alto de uno: el before_save lo marca y solo ese se recalcula
+        self.catalog.rows["T-1"][die_pitch.PITCH_HEIGHT_FIELD] += 10.0
+        self._save("T-1", changed=[die_pitch.PITCH_HEIGHT_FIELD])
+        self.assertEqual(die_pitch.die_pitch_status()["pending"], 1)
+        state = die_pitch._pitch_job(batch_size=2)
+        self.assertEqual((state["scanned"], state["computed"]), (1, 1))
+
+        # Guardado sin cambios de geometría: no queda pendiente
+        self._save("T-2", changed=["descripcion"])
+        self.assertEqual(
+            die_pitch.die_pitch_status(), {"total": 3, "computed": 3, "pending": 0, "failed": 0}
+        )
+
+    def test_pending_row_with_current_hash_is_not_recomputed(self):
+        die_pitch._pitch_job()
+        self._save("T-0", changed=["svg_plano_mecanico_individual"])
+
+        state = die_pitch._pitch_job()
+        self.assertEqual((state["scanned"], state["computed"]), (1, 0))
+        self.assertEqual(self.rows[0]["igc_pitch_status"], die_pitch.PITCH_STATUS_DONE)
+
+    def test_solver_version_change_rescans_every_row(self):
+        die_pitch._pitch_job()
+        with patch.object(die_pitch, "PITCH_SOLVER_VERSION", die_pitch.PITCH_SOLVER_VERSION + 1):
+            state = die_pitch._pitch_job()
+            self.assertEqual(state["scanned"], 3)
+            self.assertEqual(die_pitch._pitch_job()["scanned"], 0)
+
+    def test_die_reindex_marks_changed_heights_pending(self):
+        die_pitch._pitch_job()
+        # El reindex de features escribe con set_value (sin before_save)
+        with patch.object(die_features, "ProcessPoolExecutor", ThreadPoolExecutor):
+            die_features._reindex_job(force=True)
+            pending = {r["name"] for r in self.rows if r["igc_pitch_status"] == die_pitch.PITCH_STATUS_PENDING}
+            die_features._reindex_job(force=True)
+
+        heights = {r["name"]: r[die_pitch.PITCH_HEIGHT_FIELD] for r in self.rows}
+        self.assertEqual(pending, {name for name, (_svg, h) in zip(heights, DIE_SVGS, strict=True) if heights[name] != h})
+        self.assertTrue(pending)
+        # Alto sin cambios en la segunda corrida: nada nuevo pendiente
+        self.assertEqual(die_pitch._pitch_job()["computed"], len(pending))
+
+    def test_failed_solver_stores_zero_and_status(self):
+        with patch.object(die_pitch, "_min_step_y_tetebeche_mm", side_effect=ValueError("boom")):
+            state = die_pitch._pitch_job()
+
+        self.assertEqual(state["errors"], 3)
+        row = self.rows[0]
+        self.assertEqual((row["igc_tetebeche_step_y"], row["igc_pitch_error"]), (0, 0))
+        self.assertEqual(row["igc_pitch_status"], die_pitch.PITCH_STATUS_FAILED)
+        self.assertEqual(die_pitch.die_pitch_status()["failed"], 3)
+        # Con el precálculo fallido la consulta cae al grid
+        self.assertEqual(die_pitch.get_troquel_pitch("T-0")["source"], "grid")
+
+    def test_get_troquel_pitch_prefers_precomputed_value(self):
+        live = die_pitch.get_troquel_pitch("T-0", gap_y_mm=1.0)
+        self.assertEqual(live["source"], "live")
+
+        die_pitch._pitch_job()
+        precomputed = die_pitch.get_troquel_pitch("T-0", gap_y_mm=1.0)
+        self.assertEqual(precomputed["source"], "precomputed")
+        self.assertAlmostEqual(precomputed["step_y_mm"], live["step_y_mm"])
+        self.assertAlmostEqual(precomputed["step_y_mm"], self.rows[0]["igc_tetebeche_step_y"] + 1.0)
+
+        # SVG modificado después del precálculo: hash viejo, vuelve al solver
+        self.catalog.rows["T-0"]["svg_plano_mecanico_individual"] = DIE_SVGS[1][0]
+        self.assertEqual(die_pitch.get_troquel_pitch("T-0")["source"], "live")
+
+    def test_get_troquel_pitch_falls_back_to_grid(self):
+        with patch.object(die_pitch, "get_tetebeche_step_y_mm", side_effect=ValueError("boom")):
+            res = die_pitch.get_troquel_pitch("T-2", gap_y_mm=2.0)
+
+        height_mm = self.rows[2][die_pitch.PITCH_HEIGHT_FIELD]
+        self.assertEqual(res["source"], "grid")
+        self.assertEqual(res["step_y_mm"], height_mm + 2.0)
+        self.assertEqual(res["grid_step_y_mm"], height_mm + 2.0)
@@ -0,0 +1,230 @@
+# Copyright (c) 2025, Ezequiel Sierra and Contributors
+# See license.txt
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from igctools.api import igc_nesting, nesting
+from igctools.tests.utils import use_frappe_sandbox
+
+# Cruz + media luna: no convexo, con hueco (ventana) y curvas
+DIE_SVGS = [
+    (
+        '<svg xmlns="http://www.w3.org/2000/svg">'
+        '<path d="M0 0 H40 V60 H0 Z"/>'
+        '<path d="M0 60 L20 80 L40 60"/>'
+        '<path d="M10 20 h20 v15 h-20 z"/>'
+        "</svg>",
+        80.0,
+    ),
+    (
+        '<svg xmlns="http://www.w3.org/2000/svg">'
+        '<path d="M0 0 L30 0 L30 30 Q15 60 0 30 Z"/>'
+        '<line x1="5" y1="5" x2="25" y2="5"/>'
+        "</svg>",
+        120.0,
+    ),
+    (
+        '<svg xmlns="http://www.w3.org/2000/svg">'
+        '<path d="M0 10 A10 10 0 0 1 20 10 L20 40 L0 40 Z"/>'
+        '<polyline points="20,40 35,55 20,70 0,70 0,40"/>'
+        "</svg>",
+        70.0,
+    ),
+]
+
+
+class TestTetebechePitch(FrappeTestCase):
+    def test_exact_matches_bisection(self):
+        for svg, height_mm in DIE_SVGS:
+            solid_up, solid_down, h = nesting._tetebeche_solids(svg, height_mm)
+
+            bisect = nesting._min_step_y_bisect_mm(nesting._pitch_engine(solid_up, solid_down), h)
+            exact = nesting._min_step_y_exact_mm(nesting._pitch_engine(solid_up, solid_down), h)
+
+            self.assertIsNotNone(bisect)
+            # 40 pasos sobre h dejan un error de h / 2**40
+            self.assertAlmostEqual(exact, bisect, delta=h / 2**39)
+            self.assertLessEqual(exact, h)
+
+    def test_exact_pitch_clears_shrunk_solids(self):
+        svg, height_mm = DIE_SVGS[0]
+        solid_up, solid_down, h = nesting._tetebeche_solids(svg, height_mm)
+        engine = nesting._pitch_engine(solid_up, solid_down)
+        dy = nesting._min_step_y_exact_mm(engine, h)
+
+        self.assertFalse(engine.collides(0.0, dy + 1e-6))
+        self.assertTrue(engine.collides(0.0, dy - 1e-3))
+
+    def test_gap_is_added_to_pitch(self):
+        svg, height_mm = DIE_SVGS[1]
+        base = nesting.compute_tetebeche_pitch(svg, height_mm)["step_y_mm"]
+        with_gap = nesting.compute_tetebeche_pitch(svg, height_mm, gap_y_mm=2.5)["step_y_mm"]
+
+        self.assertAlmostEqual(with_gap - base, 2.5)
+
+    def test_skyline_bound_brackets_exact(self):
+        for svg, height_mm in DIE_SVGS:
+            solid_up, solid_down, h = nesting._tetebeche_solids(svg, height_mm)
+            engine = nesting._pitch_engine(solid_up, solid_down)
+            exact = nesting._min_step_y_exact_mm(engine, h)
+
+            dy, error_mm, grid, candidates, edges = nesting._skyline_step_y_mm(
+                engine.static, engine.moving, resolution_mm=2.0
+            )
+
+            # La cota nunca queda corta y el error reportado la acota
+            self.assertGreaterEqual(dy + 1e-9, exact)
+            self.assertLessEqual(dy - error_mm, exact + 1e-9)
+            self.assertAlmostEqual(nesting._refine_skyline_mm(grid, candidates, edges), exact, places=9)
+
+    def test_pitch_is_cached_independently_of_gap(self):
+        svg, height_mm = DIE_SVGS[2]
+        first = nesting.compute_tetebeche_pitch(svg, height_mm, gap_y_mm=1.0)
+        second = nesting.compute_tetebeche_pitch(svg, height_mm, gap_y_mm=4.0)
+
+        self.assertTrue(second["cached"])
+        self.assertAlmostEqual(second["step_y_mm"] - first["step_y_mm"], 3.0)
+        self.assertNotEqual(
+            nesting._pitch_cache_key(svg, height_mm), nesting._pitch_cache_key(svg, height_mm + 1)
+        )
+
+    def test_frame_and_crease_lines_do_not_change_pitch(self):
+        svg, height_mm = DIE_SVGS[0]
+        # Mismo die con marco, fondo y pliegues (<rect>/<line>) alrededor
+        framed = svg.replace(
+            "</svg>",
+            '<rect x="-20" y="-20" width="80" height="120" fill="none"/>'
+            '<rect x="-10" y="-10" width="60" height="100" fill="#eee"/>'
+            '<line x1="0" y1="60" x2="40" y2="60" class="creasing"/>'
+            '<line x1="-30" y1="90" x2="70" y2="90"/>'
+            "</svg>",
+        )
+
+        plain = nesting.compute_tetebeche_pitch(svg, height_mm)
+        with_frame = nesting.compute_tetebeche_pitch(framed, height_mm)
+
+        self.assertAlmostEqual(with_frame["step_y_mm"], plain["step_y_mm"])
+        self.assertEqual(
+            nesting._parse_svg_to_paths(framed)[0].bounds(), nesting._parse_svg_to_paths(svg)[0].bounds()
+        )
+
+    def test_strategies_share_geometry_and_never_undershoot(self):
+        svg, height_mm = DIE_SVGS[0]
+        results = nesting.compare_tetebeche_strategies(svg, height_mm)
+
+        self.assertEqual(set(results), set(nesting.PITCH_STRATEGIES))
+        exact = results["exact"]["step_y_mm"]
+        for strategy, res in results.items():
+            self.assertGreaterEqual(res["step_y_mm"] + 1e-9, exact, strategy)
+
+        self.assertEqual(
+            nesting.compute_tetebeche_pitch(svg, height_mm, strategy="exact")["solver"], "exact"
+        )
+        with self.assertRaises(Exception):
+            nesting.compute_tetebeche_pitch(svg, height_mm, strategy="nope")
+
+    def test_legacy_endpoint_falls_back_to_grid_on_unknown_strategy(self):
+        svg, height_mm = DIE_SVGS[0]
+        with patch.object(frappe, "log_error", create=True) as log_error:
+            res = igc_nesting.compute_tetebeche_pitch(svg, height_mm, 40.0, gap_y_mm=1.0, strategy="nope")
+
+        self.assertEqual(res, {"step_y_mm": height_mm + 1.0, "step_x_mm": 40.0, "solver": "grid"})
+        log_error.assert_called_once()
+
+        # Una estrategia válida no pasa por el fallback de error
+        with patch.object(frappe, "log_error", create=True) as log_error:
+            igc_nesting.compute_tetebeche_pitch(svg, height_mm, 40.0, strategy="exact")
+        log_error.assert_not_called()
+
+
+class TestTetebechePitchJob(FrappeTestCase):
+    def setUp(self):
+        # Cache, BD y realtime en memoria; enqueue no llega a RQ
+        use_frappe_sandbox(self)
+
+        self.jobs = []
+        self.published = []
+        for attr, value in {
+            "enqueue": self._enqueue,
+            "publish_realtime": lambda event, message, user=None: self.published.append((user, message)),
+            "session": SimpleNamespace(user="a@example.com"),
+        }.items():
+            patcher = patch.object(frappe, attr, value, create=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _enqueue(self, method, job_id=None, deduplicate=False, **kwargs):
+        # Como frappe.enqueue con deduplicate: None si el job_id ya está en vuelo
+        if deduplicate and any(job["job_id"] == job_id for job in self.jobs):
+            return None
+        self.jobs.append({"job_id": job_id, **kwargs})
+        return MagicMock(id=job_id)
+
+    def _run_job(self, index=0):
+        job = self.jobs[index]
+        return nesting._tetebeche_pitch_job(job["svg"], job["height_mm"], job["key"], job["strategy"])
+
+    def test_enqueue_coalesces_and_publishes_each_gap(self):
+        svg, height_mm = DIE_SVGS[0]
+        first = nesting.enqueue_tetebeche_pitch(svg, height_mm, gap_y_mm=1.0)
+        frappe.session.user = "b@example.com"
+        second = nesting.enqueue_tetebeche_pitch(svg, height_mm, gap_y_mm=3.0)
+
+        self.assertFalse(first["done"])
+        self.assertFalse(first["coalesced"])
+        self.assertTrue(second["coalesced"])
+        self.assertEqual(first["job_key"], second["job_key"])
+        self.assertEqual(len(self.jobs), 1)
+        self.assertEqual(nesting.get_tetebeche_pitch_result(first["job_key"]), {"done": False, "job_key": first["job_key"]})
+
+        result = self._run_job()
+        published = {user: message["step_y_mm"] for user, message in self.published}
+        self.assertAlmostEqual(published["a@example.com"], result["step_y_mm"] + 1.0)
+        self.assertAlmostEqual(published["b@example.com"], result["step_y_mm"] + 3.0)
+
+        polled = nesting.get_tetebeche_pitch_result(first["job_key"], gap_y_mm=2.0)
+        self.assertTrue(polled["done"])
+        self.assertFalse(polled["fallback"])
+        self.assertAlmostEqual(polled["step_y_mm"], result["step_y_mm"] + 2.0)
+
+        # Ya en cache: responde sin encolar
+        again = nesting.enqueue_tetebeche_pitch(svg, height_mm)
+        self.assertTrue(again["done"])
+        self.assertEqual(len(self.jobs), 1)
+
+    def test_failed_job_leaves_grid_for_polling(self):
+        svg, height_mm = DIE_SVGS[1]
+        key = nesting.enqueue_tetebeche_pitch(svg, height_mm)["job_key"]
+
+        with patch.object(nesting, "get_tetebeche_step_y_mm", side_effect=ValueError("boom")):
+            result = self._run_job()
+
+        self.assertEqual(result["solver"], "grid")
+        polled = nesting.get_tetebeche_pitch_result(key, gap_y_mm=1.5)
+        self.assertTrue(polled["done"])
+        self.assertTrue(polled["fallback"])
+        self.assertAlmostEqual(polled["step_y_mm"], height_mm + 1.5)
+        # El grid no queda como pitch real
+        self.assertIsNone(nesting.cache_get("nesting_pitch", key))
+
+    def test_cancel_waits_for_other_users_then_cancels_job(self):
+        svg, height_mm = DIE_SVGS[2]
+        key = nesting.enqueue_tetebeche_pitch(svg, height_mm, gap_y_mm=1.0)["job_key"]
+        frappe.session.user = "b@example.com"
+        nesting.enqueue_tetebeche_pitch(svg, height_mm)
+
+        job = MagicMock()
+        job.get_status.return_value = "queued"
+        with patch("frappe.utils.background_jobs.get_job", return_value=job) as get_job:
+            self.assertEqual(nesting.cancel_tetebeche_pitch(key), {"cancelled": False, "waiting": True})
+            job.cancel.assert_not_called()
+
+            frappe.session.user = "a@example.com"
+            self.assertEqual(nesting.cancel_tetebeche_pitch(key, gap_y_mm=1.0), {"cancelled": True})
+
+        get_job.assert_called_once_with(nesting._pitch_job_id(key))
+        job.cancel.assert_called_once()
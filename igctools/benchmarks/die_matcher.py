@@ -0,0 +1,204 @@
+# apps/igctools/igctools/benchmarks/die_matcher.py
+#
+# Micro-benchmarks de igc_die_matcher sin site de Frappe.
+#
+#   python -m igctools.benchmarks.die_matcher --catalog-sizes 500,5000,50000 --output bench.json
+#
+# Mide analyze_die_svg, _compute_signature, compare_die_features y la
+# consulta completa (índice en memoria y prefiltro SQL) y deja un JSON con
+# p50/p95 y pico de memoria para seguir regresiones entre commits.
+#
+# En modo "sql_prefilter" el get_all corre sobre el catálogo en memoria
+# (escaneo lineal): sirve para comparar commits, no como latencia de MariaDB.
+
+import argparse
+import random
+import time
+import xml.etree.ElementTree as ET
+
+from igctools.benchmarks.harness import peak_memory_kib, report, summarize, time_calls, write_report
+from igctools.benchmarks.synthetic_dies import STYLES, die_svg, random_die_specs
+from igctools.tests.utils import ensure_frappe, frappe_sandbox
+
+ensure_frappe()
+
+from igctools import igc_die_matcher as matcher
+from igctools.benchmarks.legacy_svg import die_matcher_compute_signature, die_matcher_extract_segments
+from igctools.igc_cache import cache_clear
+from igctools.igc_geometry import extract_svg_segments
+
+DEFAULT_CATALOG_SIZES = (500, 5000, 50000)
+
+# (nombre, segmentos de ruido, textos) por tamaño de die
+DIE_SIZES = (
+    ("small", 0, 0),
+    ("medium", 2000, 200),
+    ("large", 20000, 2000),
+)
+
+
+def _catalog_rows(n, templates, seed=0):
+    """
+    Filas de Troquel con features guardadas. Se reusan las firmas de unas
+    pocas plantillas analizadas y se varían las dimensiones (analizar 50k
+    SVGs no es lo que se mide aquí).
+    """
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(n):
+        feats = dict(rnd.choice(templates))
+        scale_w = rnd.uniform(0.6, 1.6)
+        scale_h = rnd.uniform(0.6, 1.6)
+        feats["width"] = round(feats["width"] * scale_w, 2)
+        feats["height"] = round(feats["height"] * scale_h, 2)
+        row = {
+            "name": f"TRQ-{i:06d}",
+            "tipo_producto": rnd.choice(("Caja", "Estuche", "Manga")),
+            "svg_plano_mecanico_individual": "<svg/>",
+        }
+        row.update(matcher._die_features_to_values(feats))
+        rows.append(row)
+    return rows
+
+
+def bench_analyze(dies_per_size=10):
+    results = []
+    for label, segments, texts in DIE_SIZES:
+        svgs = [
+            die_svg(style, length, width, depth, segments=segments, texts=texts, seed=i)
+            for i, (style, length, width, depth) in enumerate(random_die_specs(dies_per_size, seed=1))
+        ]
+        samples = time_calls(matcher.analyze_die_svg, [(s,) for s in svgs])
+        results.append(summarize(
+            "analyze_die_svg", samples,
+            die_size=label,
+            svg_bytes=len(svgs[0]),
+            peak_kib=peak_memory_kib(matcher.analyze_die_svg, svgs[0]),
+        ))
+    return results
+
+
+def bench_signature(dies=20):
+    svgs = [
+        die_svg(style, length, width, depth, segments=2000, seed=i)
+        for i, (style, length, width, depth) in enumerate(random_die_specs(dies, seed=2))
+    ]
+
+    # Entrada de _compute_signature: lista de dicts del recorrido clásico
+    legacy = []
+    arrays = []
+    for svg in svgs:
+        root = ET.fromstring(svg)
+        width, height = matcher._parse_svg_bbox_from_root(root)
+        legacy.append((die_matcher_extract_segments(root), width, height))
+        arrays.append((extract_svg_segments(svg, classify=matcher._segment_kind)[1], width, height))
+
+    return [
+        summarize("_compute_signature", time_calls(die_matcher_compute_signature, legacy), segments=len(legacy[0][0])),
+        summarize("_compute_signature_arrays", time_calls(matcher._compute_signature_arrays, arrays), segments=len(arrays[0][0])),
+    ]
+
+
+def bench_compare(templates, pairs=20000):
+    rnd = random.Random(3)
+    rows = _catalog_rows(2000, templates, seed=3)
+    feats = [matcher._stored_die_features(r) for r in rows]
+    args = [(rnd.choice(feats), rnd.choice(feats), 3.0) for _ in range(pairs)]
+    return [summarize("compare_die_features", time_calls(matcher.compare_die_features, args), pairs=pairs)]
+
+
+def bench_queries(templates, catalog_sizes, queries=30):
+    results = []
+    rnd = random.Random(4)
+    query_svgs = [
+        die_svg(style, length, width, depth, seed=i)
+        for i, (style, length, width, depth) in enumerate(random_die_specs(queries, seed=4))
+    ]
+
+    for size in catalog_sizes:
+        rows = _catalog_rows(size, templates, seed=size)
+        # Consultas que sí encuentran algo: dies del catálogo con algo de ruido
+        cliente_feats = []
+        for _ in range(queries):
+            f = dict(matcher._stored_die_features(rnd.choice(rows)))
+            f["width"] += rnd.uniform(-2.0, 2.0)
+            f["height"] += rnd.uniform(-2.0, 2.0)
+            cliente_feats.append(f)
+
+        for use_index in (True, False):
+            mode = "index" if use_index else "sql_prefilter"
+            with frappe_sandbox(rows):
+                matcher.USE_DIE_INDEX = use_index
+                try:
+                    build_s = 0.0
+                    if use_index:
+                        from igctools.igc_die_index import clear_die_indexes, get_die_index
+
+                        clear_die_indexes()
+                        t0 = time.perf_counter()
+                        get_die_index(None)
+                        build_s = time.perf_counter() - t0
+
+                    samples = time_calls(matcher._match_similar_dies, [(f, 3.0, 30) for f in cliente_feats])
+                    results.append(summarize(
+                        "match_similar_dies", samples,
+                        mode=mode, catalog_size=size,
+                        index_build_ms=round(build_s * 1000.0, 3) if use_index else None,
+                    ))
+
+                    def end_to_end(svg):
+                        # Sin aciertos de cache (la versión del catálogo se
+                        # conserva para no reconstruir el índice en cada consulta)
+                        cache_clear("die_match")
+                        cache_clear("die_client_features")
+                        return matcher.find_similar_dies_from_svg(svg, 3.0, 30)
+
+                    samples = time_calls(end_to_end, [(s,) for s in query_svgs])
+                    results.append(summarize(
+                        "find_similar_dies_from_svg", samples,
+                        mode=mode, catalog_size=size,
+                        peak_kib=peak_memory_kib(end_to_end, query_svgs[0]),
+                    ))
+                finally:
+                    matcher.USE_DIE_INDEX = True
+                    if use_index:
+                        clear_die_indexes()
+    return results
+
+
+def run(catalog_sizes=DEFAULT_CATALOG_SIZES, queries=30, dies_per_size=10):
+    templates = [
+        matcher.analyze_die_svg(die_svg(style, length, width, depth))
+        for style, length, width, depth in random_die_specs(200, seed=0)
+    ]
+
+    with frappe_sandbox():
+        results = []
+        results += bench_analyze(dies_per_size)
+        results += bench_signature()
+        results += bench_compare(templates)
+    results += bench_queries(templates, catalog_sizes, queries)
+
+    return report("igc_die_matcher", results, params={
+        "catalog_sizes": list(catalog_sizes),
+        "queries": queries,
+        "dies_per_size": dies_per_size,
+        "styles": list(STYLES),
+        "features_version": matcher.DIE_FEATURES_VERSION,
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de igc_die_matcher")
+    parser.add_argument("--catalog-sizes", default=",".join(str(s) for s in DEFAULT_CATALOG_SIZES))
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--dies-per-size", type=int, default=10)
+    parser.add_argument("--output", default="-", help="archivo JSON (default: stdout)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.catalog_sizes.split(",") if s.strip()]
+    write_report(run(sizes, args.queries, args.dies_per_size), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# apps/igctools/igctools/benchmarks/geometry.py
+#
+# Throughput del parser común de igc_geometry contra los parsers anteriores
+# (copiados en benchmarks/legacy_svg.py) sobre dies grandes.
+#
+#   python -m igctools.benchmarks.geometry --segments 2000,20000,100000 --output geometry.json
+#
+# Los parsers viejos solo entienden M/L/Z (H/V en nesting.py), así que la
+# comparación usa paths rectos; los dies con curvas se miden solo con el
+# parser nuevo (los viejos los leen mal, no tiene sentido compararlos).
+
+import argparse
+import xml.etree.ElementTree as ET
+
+from igctools.benchmarks.harness import peak_memory_kib, report, summarize, time_calls, write_report
+from igctools.benchmarks.synthetic_dies import die_svg
+from igctools.tests.utils import ensure_frappe
+
+ensure_frappe()
+
+from igctools.benchmarks.legacy_svg import (
+    die_matcher_extract_segments,
+    igc_nesting_parse_svg_to_paths,
+    nesting_parse_svg_to_paths,
+)
+from igctools.igc_geometry import extract_svg_polylines, extract_svg_segments
+
+DEFAULT_SEGMENTS = (2000, 20000, 100000)
+
+
+def _legacy_segments(svg):
+    return die_matcher_extract_segments(ET.fromstring(svg))
+
+
+def _point_count(result):
+    # Parsers viejos: (paths, min_y, max_y); igc_geometry: (root_attrib, PolylineArrays)
+    if hasattr(result[1], "coords"):
+        return int(result[1].coords.shape[0])
+    return sum(len(p) for p in result[0])
+
+
+def _bench(name, fn, svg, repeat, points=None, **extra):
+    samples = time_calls(fn, [(svg,)] * repeat)
+    row = summarize(name, samples, svg_bytes=len(svg), **extra)
+    p50_s = (row["p50_ms"] or 0) / 1000.0
+    if p50_s:
+        row["mb_per_s"] = round(len(svg) / p50_s / 1e6, 2)
+        if points:
+            row["points_per_s"] = int(points / p50_s)
+    row["points"] = points
+    row["peak_kib"] = peak_memory_kib(fn, svg)
+    return row
+
+
+def run(segment_counts=DEFAULT_SEGMENTS, repeat=5):
+    results = []
+    for segments in segment_counts:
+        paths_svg = die_svg("tuck_end", 120, 60, 200, segments=segments, seed=1, as_path=True)
+        lines_svg = die_svg("tuck_end", 120, 60, 200, segments=segments, seed=1)
+        curves_svg = die_svg("tuck_end", 120, 60, 200, segments=segments // 2, curves=segments // 2, seed=1, as_path=True)
+
+        for name, fn in (
+            ("legacy nesting._parse_svg_to_paths", nesting_parse_svg_to_paths),
+            ("legacy igc_nesting._parse_svg_to_paths", igc_nesting_parse_svg_to_paths),
+            ("igc_geometry.extract_svg_polylines", extract_svg_polylines),
+        ):
+            points = _point_count(fn(paths_svg))
+            results.append(_bench(name, fn, paths_svg, repeat, points, input="paths", segments=segments))
+
+        results.append(_bench(
+            "legacy igc_die_matcher._extract_segments", _legacy_segments, lines_svg, repeat,
+            input="lines", segments=segments,
+        ))
+        results.append(_bench(
+            "igc_geometry.extract_svg_segments", extract_svg_segments, lines_svg, repeat,
+            input="lines", segments=segments,
+        ))
+
+        points = _point_count(extract_svg_polylines(curves_svg))
+        results.append(_bench(
+            "igc_geometry.extract_svg_polylines", extract_svg_polylines, curves_svg, repeat, points,
+            input="paths+curves", segments=segments,
+        ))
+
+    return report("igc_geometry", results, params={
+        "segments": list(segment_counts),
+        "repeat": repeat,
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks del parser SVG común")
+    parser.add_argument("--segments", default=",".join(str(s) for s in DEFAULT_SEGMENTS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="-", help="archivo JSON (default: stdout)")
+    args = parser.parse_args(argv)
+
+    counts = [int(s) for s in args.segments.split(",") if s.strip()]
+    write_report(run(counts, args.repeat), args.output)
+
+
+if __name__ == "__main__":
+    main()
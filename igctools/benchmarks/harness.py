@@ -0,0 +1,87 @@
+# apps/igctools/igctools/benchmarks/harness.py
+#
+# Utilidades comunes de los benchmarks de igctools:
+# medición de latencias (p50/p95) y pico de memoria (tracemalloc).
+# El frappe en memoria para correr sin site vive en igctools.tests.utils.
+
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+
+# =======================
+# Medición
+# =======================
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(name, samples_s, **extra):
+    """Resumen en ms de una lista de duraciones en segundos."""
+    ms = sorted(s * 1000.0 for s in samples_s)
+    return {
+        "name": name,
+        "runs": len(ms),
+        "p50_ms": round(percentile(ms, 50), 4) if ms else None,
+        "p95_ms": round(percentile(ms, 95), 4) if ms else None,
+        "mean_ms": round(sum(ms) / len(ms), 4) if ms else None,
+        "max_ms": round(ms[-1], 4) if ms else None,
+        **extra,
+    }
+
+
+def time_calls(fn, args_list):
+    """Ejecuta fn(*args) para cada args y devuelve las duraciones (s)."""
+    samples = []
+    for args in args_list:
+        t0 = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def peak_memory_kib(fn, *args, **kwargs):
+    """Pico de memoria Python (KiB) durante fn(...). Corre aparte del timing."""
+    tracemalloc.start()
+    try:
+        fn(*args, **kwargs)
+        return round(tracemalloc.get_traced_memory()[1] / 1024.0, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def report(suite, results, params=None):
+    return {
+        "suite": suite,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "numpy": _version_of("numpy"),
+        "shapely": _version_of("shapely"),
+        "params": params or {},
+        "results": results,
+    }
+
+
+def write_report(data, output=None):
+    text = json.dumps(data, indent=2, default=str)
+    if output and output != "-":
+        with open(output, "w") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+
+
+def _version_of(module):
+    try:
+        return __import__(module).__version__
+    except Exception:
+        return None
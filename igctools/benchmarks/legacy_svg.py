@@ -0,0 +1,438 @@
+# apps/igctools/igctools/benchmarks/legacy_svg.py
+#
+# Parsers de SVG anteriores al módulo común igc_geometry, copiados tal cual
+# de api/nesting.py, api/igc_nesting.py e igc_die_matcher.py. Solo sirven de
+# línea de base en los benchmarks y en los tests de equivalencia; no se usan
+# en ningún otro lado.
+
+import math
+import xml.etree.ElementTree as ET
+
+from igctools.igc_die_matcher import _signature_from_positions
+
+
+def nesting_parse_svg_to_paths(svg_str):
+    """
+    Devuelve:
+        paths = [ [(x1,y1), (x2,y2), ...], ... ]
+        min_y, max_y   (en unidades tal cual del SVG)
+    Soporta <polygon>, <polyline> y <path> simple (M/L/Z).
+    """
+    root = ET.fromstring(svg_str)
+
+    def tag_name(el):
+        return el.tag.rsplit("}", 1)[-1].lower()
+
+    paths = []
+    min_y = float("inf")
+    max_y = float("-inf")
+
+    def add_path(pts):
+        nonlocal min_y, max_y
+        if len(pts) < 2:
+            return
+        paths.append(pts)
+        for _, y in pts:
+            if y < min_y:
+                min_y = y
+            if y > max_y:
+                max_y = y
+
+    for el in root.iter():
+        t = tag_name(el)
+
+        # --- polygon / polyline ---
+        if t in ("polygon", "polyline"):
+            pts_attr = el.get("points") or ""
+            if not pts_attr.strip():
+                continue
+            coords = pts_attr.replace(",", " ").split()
+            pts = []
+            it = iter(coords)
+            for xs, ys in zip(it, it, strict=False):
+                try:
+                    x = float(xs)
+                    y = float(ys)
+                    pts.append((x, y))
+                except Exception:
+                    continue
+            add_path(pts)
+
+        # --- path (M/L/Z muy simple, absolutas) ---
+        elif t == "path":
+            d = el.get("d") or ""
+            if not d.strip():
+                continue
+
+            tokens = []
+            num = ""
+            for ch in d:
+                if ch.upper() in "MLZHV":
+                    if num:
+                        tokens.append(num)
+                        num = ""
+                    tokens.append(ch)
+                elif ch in " ,\t\r\n":
+                    if num:
+                        tokens.append(num)
+                        num = ""
+                else:
+                    num += ch
+            if num:
+                tokens.append(num)
+
+            pts = []
+            i = 0
+            x = y = 0.0
+            cmd = None
+
+            def read_float(tok):
+                try:
+                    return float(tok)
+                except Exception:
+                    return None
+
+            while i < len(tokens):
+                tk = tokens[i]
+
+                if tk.upper() in ("M", "L"):
+                    cmd = tk
+                    i += 1
+                    continue
+
+                if tk.upper() == "Z":
+                    # cerrar si hace falta
+                    if pts and pts[0] != pts[-1]:
+                        pts.append(pts[0])
+                    i += 1
+                    continue
+
+                if cmd is None:
+                    i += 1
+                    continue
+
+                if i + 1 >= len(tokens):
+                    break
+
+                nx = read_float(tokens[i])
+                ny = read_float(tokens[i + 1])
+                i += 2
+                if nx is None or ny is None:
+                    continue
+
+                if cmd == "m":
+                    x += nx
+                    y += ny
+                elif cmd == "l":
+                    x += nx
+                    y += ny
+                else:
+                    # M / L absolutas
+                    x = nx
+                    y = ny
+
+                pts.append((x, y))
+
+            add_path(pts)
+
+    if min_y == float("inf"):
+        min_y = 0.0
+        max_y = 0.0
+
+    return paths, min_y, max_y
+
+
+def igc_nesting_parse_svg_to_paths(svg_str):
+    """
+    Convierte un SVG en lista de paths (coordenadas flotantes).
+    Solo extrae polígonos y polilíneas simples que formarán el contorno.
+    """
+    root = ET.fromstring(svg_str)
+
+    def tag_name(el):
+        return el.tag.rsplit("}", 1)[-1].lower()
+
+    paths = []
+    min_y = float("inf")
+    max_y = float("-inf")
+
+    # Función auxiliar para añadir puntos y actualizar el Bounding Box (BBox)
+    def add_point(x, y, pts):
+        nonlocal min_y, max_y
+        pts.append((x, y))
+        min_y = min(min_y, y)
+        max_y = max(max_y, y)
+
+    def read_float(tok):
+        try:
+            return float(tok)
+        except Exception:
+            return None
+
+    # Iterar elementos
+    for el in root.iter():
+        t = tag_name(el)
+
+        # Polygons y Polylines
+        if t in ("polygon", "polyline"):
+            pts_attr = el.get("points") or ""
+            if not pts_attr.strip():
+                continue
+
+            coords = pts_attr.replace(",", " ").split()
+            pts = []
+            it = iter(coords)
+            for xs, ys in zip(it, it, strict=False):
+                x = read_float(xs)
+                y = read_float(ys)
+                if x is not None and y is not None:
+                    add_point(x, y, pts)
+            if pts:
+                paths.append(pts)
+
+        # Paths (M, L, Z) - Versión robusta para extraer solo coordenadas
+        elif t == "path":
+            d = el.get("d") or ""
+            if not d.strip():
+                continue
+
+            # Simplificamos el parsing para extraer solo M, L, Z
+            tokens = []
+            num = ""
+            for ch in d:
+                if ch.upper() in "MLZ":
+                    if num:
+                        tokens.append(num)
+                        num = ""
+                    tokens.append(ch)
+                elif ch in " ,-\t\r\n":
+                    if num:
+                        tokens.append(num)
+                        num = ""
+                    if ch == "-":
+                        num += ch
+                else:
+                    num += ch
+            if num:
+                tokens.append(num)
+
+            pts = []
+            i = 0
+            x = y = 0.0
+            cmd = None
+
+            while i < len(tokens):
+                tkn = tokens[i]
+                i += 1
+
+                if tkn.upper() in ("M", "L"):
+                    cmd = tkn
+                    continue
+
+                if tkn.upper() == "Z":
+                    if pts and pts[0] != pts[-1]:
+                        pts.append(pts[0])
+                    if pts:
+                        paths.append(pts)
+                        pts = []
+                    continue
+
+                if i >= len(tokens):
+                    break
+
+                nx = read_float(tkn)
+                ny = read_float(tokens[i])
+                i += 1
+                if nx is None or ny is None:
+                    continue
+
+                if cmd == "m" or cmd == "l":
+                    x += nx
+                    y += ny
+                else:
+                    x = nx
+                    y = ny
+
+                add_point(x, y, pts)
+
+            if pts:
+                paths.append(pts)
+
+    if min_y == float("inf"):
+        min_y, max_y = 0.0, 0.0
+    return paths, min_y, max_y
+
+
+# ---------------------------------------------------------
+# igc_die_matcher: recorrido recursivo de <line> y firma sobre dicts
+# ---------------------------------------------------------
+
+def _matrix_multiply(m1, m2):
+    a1, c1, e1, b1, d1, f1 = m1
+    a2, c2, e2, b2, d2, f2 = m2
+    a = a1 * a2 + c1 * b2
+    c = a1 * c2 + c1 * d2
+    e = a1 * e2 + c1 * f2 + e1
+    b = b1 * a2 + d1 * b2
+    d = b1 * c2 + d1 * d2
+    f = b1 * e2 + d1 * f2 + f1
+    return [a, c, e, b, d, f]
+
+
+def _parse_transform(transform_str):
+    if not transform_str:
+        return [1.0, 0.0, 0.0, 0.0, 1.0, 0.0]
+
+    s = transform_str.strip()
+    if not s:
+        return [1.0, 0.0, 0.0, 0.0, 1.0, 0.0]
+
+    current = [1.0, 0.0, 0.0, 0.0, 1.0, 0.0]
+
+    i = 0
+    length = len(s)
+    while i < length:
+        ch = s[i]
+        if ch.isalpha():
+            start = i
+            while i < length and s[i] != "(":
+                i += 1
+            name = s[start:i].strip().lower()
+            if i >= length or s[i] != "(":
+                break
+            i += 1
+            start_params = i
+            depth = 1
+            while i < length and depth > 0:
+                if s[i] == "(":
+                    depth += 1
+                elif s[i] == ")":
+                    depth -= 1
+                i += 1
+            params_str = s[start_params : i - 1]
+            parts = params_str.replace(",", " ").split()
+            nums = []
+            for p in parts:
+                try:
+                    nums.append(float(p))
+                except Exception:
+                    pass
+
+            local = [1.0, 0.0, 0.0, 0.0, 1.0, 0.0]
+            if name == "translate":
+                tx = nums[0] if len(nums) >= 1 else 0.0
+                ty = nums[1] if len(nums) >= 2 else 0.0
+                local = [1.0, 0.0, tx, 0.0, 1.0, ty]
+            elif name == "scale":
+                sx = nums[0] if len(nums) >= 1 else 1.0
+                sy = nums[1] if len(nums) >= 2 else sx
+                local = [sx, 0.0, 0.0, 0.0, sy, 0.0]
+
+            current = _matrix_multiply(current, local)
+        else:
+            i += 1
+
+    return current
+
+
+def _apply_matrix(m, x, y):
+    a, c, e, b, d, f = m
+    x_new = a * x + c * y + e
+    y_new = b * x + d * y + f
+    return x_new, y_new
+
+
+def _local_tag(node):
+    tag = node.tag
+    if "}" in tag:
+        tag = tag.split("}", 1)[1]
+    return tag
+
+
+def _line_segment(node, matrix):
+    try:
+        x1 = float(node.get("x1", "0") or "0")
+        y1 = float(node.get("y1", "0") or "0")
+        x2 = float(node.get("x2", "0") or "0")
+        y2 = float(node.get("y2", "0") or "0")
+    except Exception:
+        x1 = y1 = x2 = y2 = 0.0
+
+    x1t, y1t = _apply_matrix(matrix, x1, y1)
+    x2t, y2t = _apply_matrix(matrix, x2, y2)
+
+    style_ev = (node.get("ev-style") or "").lower()
+    seg_type = "other"
+    if "cut" in style_ev:
+        seg_type = "cut"
+    elif "creas" in style_ev:
+        seg_type = "crease"
+
+    dx = x2t - x1t
+    dy = y2t - y1t
+    length = math.hypot(dx, dy)
+
+    return {
+        "x1": x1t,
+        "y1": y1t,
+        "x2": x2t,
+        "y2": y2t,
+        "length": length,
+        "type": seg_type
+    }
+
+
+def _node_matrix(node, parent_matrix):
+    transform_str = node.get("transform")
+    local_matrix = _parse_transform(transform_str) if transform_str else [1.0, 0.0, 0.0, 0.0, 1.0, 0.0]
+    if parent_matrix is not None:
+        return _matrix_multiply(parent_matrix, local_matrix)
+    return local_matrix
+
+
+def die_matcher_extract_segments(root):
+    """<line> del árbol con su matriz acumulada (recorrido recursivo)."""
+    segments = []
+
+    def walk(node, parent_matrix):
+        matrix = _node_matrix(node, parent_matrix)
+
+        if _local_tag(node) == "line":
+            segments.append(_line_segment(node, matrix))
+
+        for child in node:
+            walk(child, matrix)
+
+    walk(root, None)
+    return segments
+
+
+def die_matcher_compute_signature(segments, width, height):
+    """Firma dx/dy a partir de la lista de dicts de die_matcher_extract_segments."""
+    vertical_positions = []
+    horizontal_positions = []
+
+    for seg in segments:
+        if seg.get("type") != "crease":
+            continue
+
+        length = seg["length"]
+        if length <= 0.1:
+            continue
+
+        x1 = seg["x1"]
+        x2 = seg["x2"]
+        y1 = seg["y1"]
+        y2 = seg["y2"]
+
+        dx = abs(x2 - x1)
+        dy = abs(y2 - y1)
+
+        if dx < 0.05 and length > 5.0:
+            x_mid = 0.5 * (x1 + x2)
+            vertical_positions.append(x_mid)
+        elif dy < 0.05 and length > 5.0:
+            y_mid = 0.5 * (y1 + y2)
+            horizontal_positions.append(y_mid)
+
+    return _signature_from_positions(vertical_positions, horizontal_positions, width, height)
@@ -0,0 +1,134 @@
+# apps/igctools/igctools/benchmarks/nesting.py
+#
+# Estrategias de pitch tête-bêche de api/nesting.py (PITCH_STRATEGIES)
+# sobre un corpus de dies sintéticos y, opcionalmente, dies reales
+# exportados como .svg (alto nominal = alto del bbox en mm).
+#
+#   python -m igctools.benchmarks.nesting --dies 40 --svg-dir ./troqueles --output nesting.json
+#
+# Por estrategia reporta latencia (p50/p95, sin contar el armado de la
+# geometría, que es común) y el desvío del pitch contra "exact":
+# medio, máximo y cuántas veces queda por debajo (eso sería solape).
+# "union" es la heurística vieja de igc_nesting.py y sale marcada como
+# legacy_baseline: da ~h siempre, su desvío mide lo que se gana con el resto.
+
+import argparse
+import os
+import time
+
+from igctools.benchmarks.harness import report, summarize, write_report
+from igctools.benchmarks.synthetic_dies import die_svg, random_die_specs
+from igctools.tests.utils import ensure_frappe
+
+ensure_frappe()
+
+from igctools.api import nesting
+
+# Desvío por debajo del exacto que ya cuenta como solape (mm)
+UNDERSHOOT_TOL_MM = 1e-6
+
+# Estrategias que no son solvers sino la línea de base heredada
+LEGACY_BASELINES = ("union",)
+
+
+def _nominal_height_mm(svg):
+    # Mismos elementos que el sólido de nesting (sin marcos ni pliegues)
+    _paths, min_y, max_y = nesting._parse_svg_to_paths(svg)
+    return max_y - min_y
+
+
+def _corpus(n_dies, svg_dir=None, seed=0):
+    """Lista de (nombre, svg, alto_mm)."""
+    dies = []
+    for i, (style, length, width, depth) in enumerate(random_die_specs(n_dies, seed=seed)):
+        # Un tercio con curvas/arcos para que el skyline tenga que refinar
+        curves = 12 if i % 3 == 0 else 0
+        svg = die_svg(style, length, width, depth, seed=seed + i, as_path=bool(curves), curves=curves)
+        dies.append((f"synthetic:{style}:{i}", svg, _nominal_height_mm(svg)))
+
+    if svg_dir:
+        for fname in sorted(os.listdir(svg_dir)):
+            if not fname.lower().endswith(".svg"):
+                continue
+            with open(os.path.join(svg_dir, fname), encoding="utf-8", errors="replace") as fh:
+                svg = fh.read()
+            try:
+                height = _nominal_height_mm(svg)
+            except Exception:
+                continue
+            if height > 0:
+                dies.append((f"real:{fname}", svg, height))
+    return dies
+
+
+def run(n_dies=30, svg_dir=None, strategies=None, seed=0):
+    strategies = list(strategies or nesting.PITCH_STRATEGIES)
+    if "exact" not in strategies:
+        strategies.append("exact")
+
+    samples = {s: [] for s in strategies}
+    deviations = {s: [] for s in strategies}
+    probes = {s: 0 for s in strategies}
+    geometry_s = []
+    failed = []
+
+    for name, svg, height in _corpus(n_dies, svg_dir, seed):
+        try:
+            t0 = time.perf_counter()
+            engine, h = nesting._pitch_geometry(svg, height)
+            geometry_s.append(time.perf_counter() - t0)
+        except Exception as e:
+            failed.append({"die": name, "error": str(e)})
+            continue
+        if engine is None:
+            continue
+
+        pitches = {}
+        for strategy in strategies:
+            engine.reset_stats()
+            t0 = time.perf_counter()
+            step_y, _error_mm, stats = nesting._solve_step_y_mm(engine, h, strategy)
+            samples[strategy].append(time.perf_counter() - t0)
+            probes[strategy] += stats.get("probes", 0)
+            pitches[strategy] = step_y
+
+        for strategy in strategies:
+            deviations[strategy].append(pitches[strategy] - pitches["exact"])
+
+    results = [summarize("shared geometry (parse + solids + engine)", geometry_s)]
+    for strategy in strategies:
+        devs = deviations[strategy]
+        results.append(summarize(
+            strategy,
+            samples[strategy],
+            mean_dev_mm=round(sum(abs(d) for d in devs) / len(devs), 6) if devs else None,
+            max_dev_mm=round(max((abs(d) for d in devs), default=0.0), 6),
+            undershoots=sum(1 for d in devs if d < -UNDERSHOOT_TOL_MM),
+            probes=probes[strategy],
+            legacy_baseline=strategy in LEGACY_BASELINES,
+        ))
+
+    return report("nesting_pitch", results, params={
+        "dies": n_dies,
+        "svg_dir": svg_dir,
+        "strategies": strategies,
+        "seed": seed,
+        "failed": failed,
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de estrategias de pitch tête-bêche")
+    parser.add_argument("--dies", type=int, default=30, help="dies sintéticos")
+    parser.add_argument("--svg-dir", default=None, help="carpeta con dies reales (.svg)")
+    parser.add_argument("--strategies", default=",".join(nesting.PITCH_STRATEGIES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="-", help="archivo JSON (default: stdout)")
+    args = parser.parse_args(argv)
+
+    strategies = [s.strip() for s in args.strategies.split(",") if s.strip()]
+    write_report(run(args.dies, args.svg_dir, strategies, args.seed), args.output)
+
+
+if __name__ == "__main__":
+    main()
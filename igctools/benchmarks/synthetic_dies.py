@@ -0,0 +1,153 @@
+# apps/igctools/igctools/benchmarks/synthetic_dies.py
+#
+# Generador de dies sintéticos al estilo de un export de ArtiosCAD:
+# <line> con ev-style "cut"/"creasing" dentro de grupos con transform,
+# más ruido opcional (cotas y textos) para llegar a N segmentos.
+
+import random
+import re
+from itertools import pairwise
+
+STYLES = ("tuck_end", "crash_lock", "sleeve")
+
+SVG_NS = "http://www.w3.org/2000/svg"
+
+
+def _line(out, x1, y1, x2, y2, style):
+    out.append(f'<line x1="{x1:.3f}" y1="{y1:.3f}" x2="{x2:.3f}" y2="{y2:.3f}" ev-style="{style}"/>')
+
+
+def _rect_outline(out, x0, y0, x1, y1, style="cut", open_side=None):
+    if open_side != "top":
+        _line(out, x0, y0, x1, y0, style)
+    _line(out, x1, y0, x1, y1, style)
+    if open_side != "bottom":
+        _line(out, x1, y1, x0, y1, style)
+    _line(out, x0, y1, x0, y0, style)
+
+
+def die_lines(style, length, width, depth, glue=15.0):
+    """
+    Líneas (lista de strings <line>) y tamaño total (w, h) en mm de un die
+    plano con paneles L, W, L, W + solapa de pegado.
+    """
+    out = []
+    xs = [0.0, glue, glue + length, glue + length + width, glue + 2 * length + width, glue + 2 * length + 2 * width]
+    top_flap = 0.0 if style == "sleeve" else width
+    tuck = 0.0 if style == "sleeve" else min(15.0, width * 0.5)
+    bottom_flap = {"tuck_end": width, "crash_lock": width * 0.75, "sleeve": 0.0}[style]
+
+    y_body0 = tuck + top_flap
+    y_body1 = y_body0 + depth
+    total_w = xs[-1]
+    total_h = y_body1 + bottom_flap + (tuck if style == "tuck_end" else 0.0)
+
+    # Cuerpo: pliegues verticales entre paneles y horizontales arriba/abajo
+    _line(out, xs[0], y_body0 + 5.0, xs[0], y_body1 - 5.0, "cut")
+    for x in xs[1:-1]:
+        _line(out, x, y_body0, x, y_body1, "creasing")
+    _line(out, xs[-1], y_body0, xs[-1], y_body1, "cut")
+    _line(out, xs[0], y_body0 + 5.0, xs[1], y_body0, "cut")
+    _line(out, xs[0], y_body1 - 5.0, xs[1], y_body1, "cut")
+
+    if style != "sleeve":
+        for x0, x1 in pairwise(xs[1:]):
+            _line(out, x0, y_body0, x1, y_body0, "creasing")
+            _line(out, x0, y_body1, x1, y_body1, "creasing")
+
+        # Tapa con lengüeta (tuck) sobre el panel L, solapas guardapolvo en W
+        _rect_outline(out, xs[1], tuck, xs[2], y_body0, open_side="bottom")
+        _line(out, xs[1] + 2.0, tuck, xs[2] - 2.0, tuck, "creasing")
+        _rect_outline(out, xs[1] + 3.0, 0.0, xs[2] - 3.0, tuck, open_side="bottom")
+        for x0, x1 in ((xs[2], xs[3]), (xs[4], xs[5])):
+            _line(out, x0, y_body0, x0 + 3.0, y_body0 - top_flap * 0.6, "cut")
+            _line(out, x0 + 3.0, y_body0 - top_flap * 0.6, x1 - 3.0, y_body0 - top_flap * 0.6, "cut")
+            _line(out, x1 - 3.0, y_body0 - top_flap * 0.6, x1, y_body0, "cut")
+
+    if style == "tuck_end":
+        y_end = y_body1 + bottom_flap
+        _rect_outline(out, xs[3], y_body1, xs[4], y_end, open_side="top")
+        _line(out, xs[3] + 2.0, y_end, xs[4] - 2.0, y_end, "creasing")
+        _rect_outline(out, xs[3] + 3.0, y_end, xs[4] - 3.0, y_end + tuck, open_side="top")
+    elif style == "crash_lock":
+        # Fondo automático: cuatro solapas con pliegue diagonal de pegado
+        y_end = y_body1 + bottom_flap
+        for x0, x1 in pairwise(xs[1:]):
+            _line(out, x0, y_body1, x0, y_end, "cut")
+            _line(out, x0, y_end, x1, y_end, "cut")
+            _line(out, x0, y_body1, x0 + min(x1 - x0, bottom_flap), y_end, "creasing")
+    else:
+        _line(out, xs[0], y_body0, xs[-1], y_body0, "cut")
+        _line(out, xs[0], y_body1, xs[-1], y_body1, "cut")
+
+    return out, total_w, total_h
+
+
+def die_svg(style="tuck_end", length=80.0, width=40.0, depth=150.0, segments=0, texts=0, seed=0, as_path=False,
+            curves=0):
+    """
+    SVG completo de un die sintético.
+    - segments: líneas extra de cotas/ruido (ev-style vacío) para escalar el tamaño
+    - texts: cantidad de <text> de anotación
+    - as_path: emite pliegues, cortes y ruido como <path> en lugar de <line>
+    - curves: paths extra con curvas C/Q y arcos A (esquinas redondeadas)
+    """
+    rnd = random.Random(seed)
+    lines, total_w, total_h = die_lines(style, length, width, depth)
+
+    if as_path:
+        lines = [_line_to_path(ln) for ln in lines]
+
+    parts = [
+        f'<svg xmlns="{SVG_NS}" width="{total_w:.3f}mm" height="{total_h:.3f}mm" '
+        f'viewBox="0 0 {total_w:.3f} {total_h:.3f}">',
+        '<g transform="translate(0,0) scale(1)">',
+        '<g id="die" transform="translate(0,0)">',
+    ]
+    parts.extend(lines)
+    parts.append("</g>")
+
+    if segments:
+        parts.append('<g id="dims" transform="translate(0.5,0.5)">')
+        for _ in range(segments):
+            x1, y1 = rnd.uniform(0, total_w), rnd.uniform(0, total_h)
+            x2, y2 = x1 + rnd.uniform(-20, 20), y1 + rnd.uniform(-20, 20)
+            line = f'<line x1="{x1:.3f}" y1="{y1:.3f}" x2="{x2:.3f}" y2="{y2:.3f}" ev-style="dimension"/>'
+            parts.append(_line_to_path(line) if as_path else line)
+        parts.append("</g>")
+
+    if curves:
+        parts.append('<g id="curves">')
+        for _ in range(curves):
+            x, y = rnd.uniform(5, total_w - 5), rnd.uniform(5, total_h - 5)
+            r = rnd.uniform(1.0, 5.0)
+            parts.append(
+                f'<path d="M{x:.3f} {y:.3f} c{r:.3f} 0 {r:.3f} {r:.3f} {r:.3f} {2 * r:.3f} '
+                f'q0 {r:.3f} {-r:.3f} {r:.3f} a{r:.3f} {r:.3f} 0 0 1 {-r:.3f} {-r:.3f} z" ev-style="cut"/>'
+            )
+        parts.append("</g>")
+
+    for i in range(texts):
+        parts.append(f'<text x="{rnd.uniform(0, total_w):.2f}" y="{rnd.uniform(0, total_h):.2f}">Cota {i} {rnd.uniform(1, 500):.1f} mm</text>')
+
+    parts.append("</g></svg>")
+    return "\n".join(parts)
+
+
+def _line_to_path(line_xml):
+    attrs = dict(re.findall(r'([\w-]+)="([^"]*)"', line_xml))
+    return f'<path d="M{attrs["x1"]} {attrs["y1"]} L{attrs["x2"]} {attrs["y2"]}" ev-style="{attrs["ev-style"]}"/>'
+
+
+def random_die_specs(n, seed=0):
+    """n especificaciones (style, length, width, depth) realistas y variadas."""
+    rnd = random.Random(seed)
+    specs = []
+    for _ in range(n):
+        specs.append((
+            rnd.choice(STYLES),
+            round(rnd.uniform(40.0, 250.0), 1),
+            round(rnd.uniform(20.0, 150.0), 1),
+            round(rnd.uniform(40.0, 300.0), 1),
+        ))
+    return specs
@@ -11,9 +11,28 @@ app_license = "mit"
 doc_events = {
     "Project": {
         "before_save": "igctools.api.printcard_svg.auto_svg_from_printcard"
+    },
+    "Troquel": {
+        "before_save": [
+            "igctools.igc_die_matcher.update_troquel_die_features",
+            "igctools.api.die_pitch.mark_pitch_pending"
+        ],
+        "on_update": "igctools.igc_die_matcher.bump_die_catalog_version",
+        "on_trash": "igctools.igc_die_matcher.bump_die_catalog_version",
+        "after_rename": "igctools.igc_die_matcher.bump_die_catalog_version"
     }
 }
 
+# Custom fields de Troquel (features de die matching)
+after_migrate = "igctools.install.after_migrate"
+
+# Pitch tête-bêche precalculado de los Troqueles pendientes (nuevos/modificados)
+scheduler_events = {
+    "daily_long": [
+        "igctools.api.die_pitch.precompute_stale_pitches"
+    ]
+}
+
 
 app_include_js = [
     "/assets/igctools/js/igc_broadcast_global.js",
@@ -0,0 +1,190 @@
+# apps/igctools/igctools/igc_cache.py
+#
+# Cache acotado sobre frappe.cache (Redis) para resultados caros de igctools.
+# Cada namespace tiene TTL por entrada y un máximo de entradas: un sorted set
+# guarda el último acceso de cada clave y al pasarse del máximo se expulsan
+# las menos usadas (LRU).
+
+import hashlib
+import re
+import time
+
+import frappe
+
+# Single-flight: cuánto espera un worker el resultado de otro que ya lo
+# está calculando, cada cuánto mira y cuánto vive el lock como máximo
+SINGLE_FLIGHT_WAIT_SEC = 10.0
+SINGLE_FLIGHT_POLL_SEC = 0.05
+SINGLE_FLIGHT_LOCK_TTL = 120
+
+# Hash de Redis con los contadores "<namespace>:<evento>"
+SINGLE_FLIGHT_STATS_KEY = "igctools:single_flight:stats"
+
+
+def content_hash(*parts):
+    """sha256 de las partes (str/bytes/números) separadas por un byte nulo."""
+    h = hashlib.sha256()
+    for part in parts:
+        if part is None:
+            part = ""
+        if not isinstance(part, bytes):
+            part = str(part).encode("utf-8")
+        h.update(part)
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def normalize_svg_text(svg_text):
+    """Normaliza espacios entre tags para que el mismo SVG dé el mismo hash."""
+    if isinstance(svg_text, bytes):
+        svg_text = svg_text.decode("utf-8", errors="replace")
+    return re.sub(r">\s+<", "><", (svg_text or "").strip())
+
+
+def svg_hash(svg_text):
+    return content_hash(normalize_svg_text(svg_text))
+
+
+def _entry_key(namespace, key):
+    return f"igctools:{namespace}:{key}"
+
+
+def _lru_key(namespace):
+    return frappe.cache.make_key(f"igctools:{namespace}:__lru__")
+
+
+def cache_get(namespace, key):
+    """Valor cacheado o None. Un acierto renueva su posición en el LRU."""
+    # expires=True: sin el memo de frappe.local.cache, que guarda también los
+    # misses y ocultaría un valor escrito por otro worker durante el request
+    value = frappe.cache.get_value(_entry_key(namespace, key), expires=True)
+    if value is not None:
+        try:
+            frappe.cache.zadd(_lru_key(namespace), {key: time.time()})
+        except Exception:
+            pass
+    return value
+
+
+def cache_set(namespace, key, value, ttl=3600, max_entries=1000):
+    """Guarda value con TTL y expulsa las entradas menos usadas si sobran."""
+    frappe.cache.set_value(_entry_key(namespace, key), value, expires_in_sec=int(ttl))
+    try:
+        lru = _lru_key(namespace)
+        frappe.cache.zadd(lru, {key: time.time()})
+        frappe.cache.expire(lru, int(ttl) * 2)
+
+        overflow = frappe.cache.zcard(lru) - int(max_entries)
+        if overflow > 0:
+            evicted = [k.decode() if isinstance(k, bytes) else k for k, _ts in frappe.cache.zpopmin(lru, overflow)]
+            frappe.cache.delete_value([_entry_key(namespace, k) for k in evicted])
+    except Exception as e:
+        frappe.log_error(frappe.utils.cstr(e), f"IGCTools: cache eviction failed ({namespace})")
+
+
+def cache_clear(namespace):
+    lru = _lru_key(namespace)
+    keys = [k.decode() if isinstance(k, bytes) else k for k in frappe.cache.zrange(lru, 0, -1)]
+    if keys:
+        frappe.cache.delete_value([_entry_key(namespace, k) for k in keys])
+    frappe.cache.delete(lru)
+
+
+# Borra el lock solo si sigue siendo nuestro (GET + DEL atómico)
+_RELEASE_LOCK_LUA = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def _raw_redis():
+    """
+    Cliente Redis sin las capas de RedisWrapper (algunos métodos como
+    exists/hgetall vuelven a prefijar la clave o despicklean el valor).
+    Lock y contadores usan siempre este cliente con make_key explícito.
+    Un cache en memoria (benchmarks) se usa tal cual.
+    """
+    pool = getattr(frappe.cache, "connection_pool", None)
+    if pool is None:
+        return frappe.cache
+    import redis
+
+    return redis.Redis(connection_pool=pool)
+
+
+def _lock_key(namespace, key):
+    return frappe.cache.make_key(f"igctools:{namespace}:__lock__:{key}")
+
+
+def _single_flight_count(namespace, event):
+    try:
+        _raw_redis().hincrby(frappe.cache.make_key(SINGLE_FLIGHT_STATS_KEY), f"{namespace}:{event}", 1)
+    except Exception:
+        pass
+
+
+def single_flight(namespace, key, compute, ttl=3600, max_entries=1000,
+                  wait_sec=SINGLE_FLIGHT_WAIT_SEC, lock_ttl=SINGLE_FLIGHT_LOCK_TTL):
+    """
+    cache_get/cache_set con un solo cálculo en vuelo por clave: el primer
+    worker toma un lock en Redis y calcula; los demás esperan (hasta
+    wait_sec) a que el resultado aparezca en el cache. Si el dueño del
+    lock muere o la espera vence, calculan por su cuenta.
+
+    Devuelve (valor, origen) con origen "cache", "computed" o "coalesced".
+    compute() no debe devolver None (no se puede distinguir de un miss).
+    """
+    value = cache_get(namespace, key)
+    if value is not None:
+        _single_flight_count(namespace, "cache")
+        return value, "cache"
+
+    client = _raw_redis()
+    lock_key = _lock_key(namespace, key)
+    token = frappe.generate_hash(length=16)
+
+    if not client.set(lock_key, token, nx=True, ex=int(lock_ttl)):
+        deadline = time.monotonic() + float(wait_sec)
+        while time.monotonic() < deadline:
+            time.sleep(SINGLE_FLIGHT_POLL_SEC)
+            value = cache_get(namespace, key)
+            if value is not None:
+                _single_flight_count(namespace, "coalesced")
+                return value, "coalesced"
+            if client.get(lock_key) is None:
+                break
+        # El otro worker no terminó a tiempo (o falló): calcular sin lock
+        _single_flight_count(namespace, "wait_expired")
+        token = None
+
+    try:
+        value = compute()
+        cache_set(namespace, key, value, ttl=ttl, max_entries=max_entries)
+    finally:
+        if token is not None:
+            client.eval(_RELEASE_LOCK_LUA, 1, lock_key, token)
+
+    _single_flight_count(namespace, "computed")
+    return value, "computed"
+
+
+def single_flight_stats():
+    """Contadores por namespace: cache, computed, coalesced, wait_expired."""
+    raw = _raw_redis().hgetall(frappe.cache.make_key(SINGLE_FLIGHT_STATS_KEY)) or {}
+    stats = {}
+    for field, count in raw.items():
+        field = field.decode() if isinstance(field, bytes) else field
+        namespace, _sep, event = field.rpartition(":")
+        stats.setdefault(namespace, {})[event] = int(count)
+    for counts in stats.values():
+        # Cálculos duplicados que se evitaron por esperar al dueño del lock
+        counts["duplicates_avoided"] = counts.get("coalesced", 0)
+    return stats
+
+
+@frappe.whitelist()
+def get_single_flight_stats():
+    frappe.only_for("System Manager")
+    return single_flight_stats()
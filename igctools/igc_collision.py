@@ -0,0 +1,77 @@
+# apps/igctools/igctools/igc_collision.py
+#
+# Motor de colisiones para pruebas de ubicación (nesting, pitch, etc.).
+# Cada sólido se achica una sola vez por la holgura; el fijo queda en un
+# STRtree de sus partes (predicados preparados) y cada prueba solo traslada
+# las coordenadas del móvil. Lleva contadores de pruebas y tiempo.
+
+import time
+
+import numpy as np
+import shapely
+
+
+class CollisionEngine:
+    def __init__(self, static, moving, clearance_mm=0.0):
+        """
+        static: geometría fija; moving: geometría que se traslada en cada prueba.
+        clearance_mm: ambos se achican esa distancia, así un roce menor que
+        la holgura no cuenta como colisión.
+        """
+        self.clearance_mm = float(clearance_mm or 0.0)
+        if self.clearance_mm:
+            static = static.buffer(-self.clearance_mm)
+            moving = moving.buffer(-self.clearance_mm)
+        self.static = static
+        self.moving = moving
+
+        self._static_parts = shapely.get_parts(static)
+        self._moving_parts = shapely.get_parts(moving)
+        self._tree = shapely.STRtree(self._static_parts)
+        self._static_bounds = static.bounds
+        self._moving_bounds = moving.bounds
+
+        self.reset_stats()
+
+    @property
+    def empty(self):
+        return self.static.is_empty or self.moving.is_empty
+
+    def _bbox_overlaps(self, dx, dy):
+        sminx, sminy, smaxx, smaxy = self._static_bounds
+        mminx, mminy, mmaxx, mmaxy = self._moving_bounds
+        return not (
+            mminx + dx > smaxx or mmaxx + dx < sminx or mminy + dy > smaxy or mmaxy + dy < sminy
+        )
+
+    def translated(self, dx=0.0, dy=0.0):
+        """Partes del móvil trasladadas (dx, dy); la geometría base no cambia."""
+        offset = np.array((dx, dy), dtype=np.float64)
+        return shapely.transform(self._moving_parts, lambda coords: coords + offset)
+
+    def collides(self, dx=0.0, dy=0.0):
+        """True si el móvil trasladado (dx, dy) toca al fijo."""
+        started = time.perf_counter()
+        self.probes += 1
+
+        hit = False
+        if not self.empty and self._bbox_overlaps(dx, dy):
+            hits = self._tree.query(self.translated(dx, dy), predicate="intersects")
+            hit = bool(hits.shape[1])
+
+        if hit:
+            self.hits += 1
+        self.elapsed += time.perf_counter() - started
+        return hit
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.elapsed = 0.0
+
+    def stats(self):
+        return {
+            "probes": self.probes,
+            "hits": self.hits,
+            "elapsed_ms": round(self.elapsed * 1000.0, 3),
+        }
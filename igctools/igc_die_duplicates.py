@@ -0,0 +1,144 @@
+# apps/igctools/igctools/igc_die_duplicates.py
+#
+# Detección de troqueles casi duplicados en todo el catálogo sin comparar
+# todos contra todos.
+#
+# Bucketing sensible a la localidad sobre las features cuantizadas:
+# - (ancho, alto) en grids de celda 2·tol con 2 desplazamientos por eje
+#   (0 y tol). Dos dies a ≤ tol en ambos ejes comparten celda en al menos
+#   una de las 4 combinaciones, así que no se pierden pares por borde.
+# - Cada die entra con su orientación directa y la rotada (alto, ancho).
+# - La cantidad de paneles (len dx, len dy) es parte de la clave; al
+#   sondear se prueban ±1, que es lo que admite compare_die_features.
+# Dentro de cada bucket la confirmación es compare_die_features con sus
+# mismos umbrales, y los pares confirmados se agrupan con union-find.
+
+import math
+
+from igctools.igc_die_matcher import compare_die_features
+
+# Tolerancia por defecto para considerar dos dies físicamente iguales (mm)
+DUPLICATE_TOLERANCE_MM = 1.0
+
+# Desplazamientos del grid en unidades de tol
+_GRID_OFFSETS = ((0, 0), (0, 1), (1, 0), (1, 1))
+
+_PANEL_PROBES = tuple((a, b) for a in (-1, 0, 1) for b in (-1, 0, 1))
+
+
+def _cell(v, offset, cell_mm):
+    return int(math.floor((v + offset) / cell_mm))
+
+
+def duplicate_bucket_keys(feats, tolerance_mm, rotated=False):
+    """Claves de bucket de un die (una por desplazamiento del grid)."""
+    w = feats.get("width")
+    h = feats.get("height")
+    if not w or not h:
+        return []
+    if rotated:
+        w, h = h, w
+
+    tol = max(float(tolerance_mm), 1e-6)
+    cell_mm = 2.0 * tol * (1.0 + 1e-9)
+    ndx = len(feats.get("dx_list") or [])
+    ndy = len(feats.get("dy_list") or [])
+    return [
+        (ox, oy, _cell(w, ox * tol, cell_mm), _cell(h, oy * tol, cell_mm), ndx, ndy)
+        for ox, oy in _GRID_OFFSETS
+    ]
+
+
+class _UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return
+        # La raíz es siempre el troquel que viene antes en el catálogo
+        if rb < ra:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+
+
+def find_duplicate_clusters(entries, tolerance_mm=DUPLICATE_TOLERANCE_MM):
+    """
+    entries: lista de (name, features) como los del índice de dimensiones.
+
+    Devuelve (clusters, stats):
+    - clusters: [{"troqueles": [...], "pairs": [...], "width", "height"}]
+      con 2 o más troqueles, los más grandes primero
+    - stats: cantidad de dies, buckets y comparaciones hechas; "skipped"
+      cuenta los dies sin ancho/alto (SVG ilegible), que no se comparan
+    """
+    tol = DUPLICATE_TOLERANCE_MM if tolerance_mm is None else float(tolerance_mm)
+
+    buckets = {}
+    for idx, (_name, feats) in enumerate(entries):
+        keys = set(duplicate_bucket_keys(feats, tol))
+        keys.update(duplicate_bucket_keys(feats, tol, rotated=True))
+        for key in keys:
+            buckets.setdefault(key, []).append(idx)
+
+    uf = _UnionFind(len(entries))
+    pairs = []
+    comparisons = 0
+
+    for i, (_name, feats) in enumerate(entries):
+        candidates = set()
+        for ox, oy, cw, ch, ndx, ndy in duplicate_bucket_keys(feats, tol):
+            for pdx, pdy in _PANEL_PROBES:
+                for j in buckets.get((ox, oy, cw, ch, ndx + pdx, ndy + pdy), ()):
+                    if j > i:
+                        candidates.add(j)
+
+        for j in sorted(candidates):
+            comparisons += 1
+            cmp_res, ok = compare_die_features(feats, entries[j][1], tol)
+            if not ok:
+                continue
+            uf.union(i, j)
+            pairs.append((i, j, cmp_res))
+
+    groups = {}
+    for i, j, cmp_res in pairs:
+        root = uf.find(i)
+        group = groups.setdefault(root, {"members": set(), "pairs": []})
+        group["members"].update((i, j))
+        group["pairs"].append({
+            "troquel_a": entries[i][0],
+            "troquel_b": entries[j][0],
+            "rotated": cmp_res["rotated"],
+            "total_score": cmp_res["total_score"],
+        })
+
+    clusters = []
+    for root, group in groups.items():
+        members = sorted(group["members"])
+        feats = entries[root][1]
+        clusters.append({
+            "troqueles": [entries[m][0] for m in members],
+            "width": feats.get("width"),
+            "height": feats.get("height"),
+            "pairs": sorted(group["pairs"], key=lambda p: p["total_score"]),
+        })
+    clusters.sort(key=lambda c: (-len(c["troqueles"]), c["troqueles"][0]))
+
+    stats = {
+        "dies": len(entries),
+        "skipped": sum(1 for _name, feats in entries if not feats.get("width") or not feats.get("height")),
+        "buckets": len(buckets),
+        "max_bucket": max((len(b) for b in buckets.values()), default=0),
+        "comparisons": comparisons,
+        "duplicate_pairs": len(pairs),
+    }
+    return clusters, stats
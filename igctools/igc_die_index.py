@@ -0,0 +1,217 @@
+# apps/igctools/igctools/igc_die_index.py
+#
+# Índice espacial en memoria (por worker) sobre las dimensiones de Troquel.
+# Cada troquel aporta dos puntos: (ancho, alto) y el rotado (alto, ancho),
+# en un grid uniforme. Una consulta solo visita las celdas que tocan la
+# caja ±tolerancia y el top-k se arma con branch-and-bound sobre delta_w+delta_h.
+
+import heapq
+import math
+import threading
+
+import frappe
+
+from igctools.igc_die_matcher import (
+    DIE_FEATURE_FIELDS,
+    _analyze_troquel_svg,
+    _stored_die_features,
+    compare_die_features,
+    get_die_catalog_version,
+)
+from igctools.igc_die_vectorized import DieFeatureMatrix
+
+# Tamaño de celda del grid (mm). Con tolerancias típicas de 3-10 mm una
+# consulta visita entre 4 y 9 celdas.
+GRID_CELL_MM = 10.0
+
+# A partir de cuántos candidatos en la caja conviene puntuar en bloque con
+# NumPy en lugar del branch-and-bound escalar
+VECTORIZE_MIN_CANDIDATES = 64
+
+# Índices cargados en este worker: (site, tipo_producto) -> DieDimensionIndex
+_INDEXES = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+class DieDimensionIndex:
+    def __init__(self, entries, catalog_version=None, cell_mm=GRID_CELL_MM):
+        """
+        entries: lista de (name, features) con features al estilo analyze_die_svg.
+        """
+        self.entries = entries
+        self.catalog_version = catalog_version
+        self.cell_mm = float(cell_mm)
+        self.grid = {}
+        self._matrix = None
+
+        for idx, (_name, feats) in enumerate(entries):
+            w = feats.get("width")
+            h = feats.get("height")
+            if not w or not h:
+                continue
+            self._add_point(w, h, idx)
+            if w != h:
+                self._add_point(h, w, idx)
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def matrix(self):
+        """DieFeatureMatrix del mismo catálogo (se arma al primer uso)."""
+        if self._matrix is None:
+            self._matrix = DieFeatureMatrix(self.entries)
+        return self._matrix
+
+    def _cell(self, v):
+        return int(math.floor(v / self.cell_mm))
+
+    def _add_point(self, w, h, idx):
+        self.grid.setdefault((self._cell(w), self._cell(h)), []).append((w, h, idx))
+
+    def query_box(self, cw, ch, tolerance_mm):
+        """
+        Devuelve {idx: cota_dimensional} de los troqueles con algún punto
+        (directo o rotado) dentro de la caja [cw±tol] x [ch±tol].
+        La cota es el menor delta_w+delta_h entre las orientaciones que
+        caen en la caja, que es justo el dim_score de compare_die_features.
+        """
+        tol = tolerance_mm
+        i0, i1 = self._cell(cw - tol), self._cell(cw + tol)
+        j0, j1 = self._cell(ch - tol), self._cell(ch + tol)
+
+        found = {}
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                for w, h, idx in self.grid.get((i, j), ()):
+                    dw = abs(cw - w)
+                    dh = abs(ch - h)
+                    if dw > tol or dh > tol:
+                        continue
+                    bound = dw + dh
+                    prev = found.get(idx)
+                    if prev is None or bound < prev:
+                        found[idx] = bound
+        return found
+
+    def candidates(self, cliente, tolerance_mm):
+        """(name, features) dentro de la caja ±tolerancia, en orden de catálogo."""
+        cw = cliente.get("width")
+        ch = cliente.get("height")
+        if not cw or not ch:
+            return []
+        return [self.entries[idx] for idx in sorted(self.query_box(cw, ch, tolerance_mm))]
+
+    def top_k(self, cliente, tolerance_mm, k):
+        """
+        Top-k por total_score con branch-and-bound:
+        los candidatos salen de un heap ordenados por su cota dimensional
+        (total_score >= delta_w + delta_h) y se corta en cuanto la cota
+        supera al k-ésimo mejor score ya encontrado.
+
+        Devuelve [(name, features, cmp_res), ...] ordenado por score.
+        """
+        cw = cliente.get("width")
+        ch = cliente.get("height")
+        if not cw or not ch or k <= 0:
+            return []
+
+        tol = tolerance_mm if tolerance_mm is not None else 3.0
+        found = self.query_box(cw, ch, tol)
+
+        if len(found) >= VECTORIZE_MIN_CANDIDATES:
+            ranked = self.matrix.top_k(cliente, tol, k, rows=sorted(found))
+            return [(self.entries[idx][0], self.entries[idx][1], cmp_res) for idx, cmp_res in ranked]
+
+        pending = [(bound, idx) for idx, bound in found.items()]
+        heapq.heapify(pending)
+
+        # max-heap de tamaño k sobre (score, idx): a igual score gana el
+        # troquel que venía antes en el catálogo, como el sort estable original
+        best = []
+        while pending:
+            bound, idx = heapq.heappop(pending)
+            if len(best) >= k and bound > -best[0][0]:
+                break
+
+            feats = self.entries[idx][1]
+            cmp_res, ok = compare_die_features(cliente, feats, tol)
+            if not ok:
+                continue
+
+            item = (-cmp_res["total_score"], -idx, cmp_res)
+            if len(best) < k:
+                heapq.heappush(best, item)
+            elif item > best[0]:
+                heapq.heapreplace(best, item)
+
+        best.sort(reverse=True)
+        return [(self.entries[-neg_idx][0], self.entries[-neg_idx][1], cmp_res) for _s, neg_idx, cmp_res in best]
+
+    def shape_top_k(self, cliente, k, max_shape_score=None):
+        """
+        Top-k solo por forma (ver DieFeatureMatrix.shape_top_k).
+        Devuelve [(name, features, shape_score), ...].
+        """
+        if max_shape_score is None:
+            ranked = self.matrix.shape_top_k(cliente, k)
+        else:
+            ranked = self.matrix.shape_top_k(cliente, k, max_shape_score=max_shape_score)
+        return [(self.entries[idx][0], self.entries[idx][1], score) for idx, score in ranked]
+
+
+def _load_die_index_entries(tipo_producto=None):
+    filters = [["svg_plano_mecanico_individual", "is", "set"]]
+    if tipo_producto:
+        filters.append(["tipo_producto", "=", tipo_producto])
+
+    entries = []
+    stale = 0
+    for t in frappe.get_all("Troquel", filters=filters, fields=["name", *DIE_FEATURE_FIELDS]):
+        feats = _stored_die_features(t)
+        if feats is None:
+            # Features faltantes u obsoletas → análisis al vuelo, como en
+            # el escaneo sin índice: el troquel sigue siendo candidato
+            stale += 1
+            feats = _analyze_troquel_svg(t["name"])
+            if feats is None:
+                continue
+        entries.append((t["name"], feats))
+
+    if stale:
+        # Se guardan en segundo plano; al terminar, el reindex cambia la
+        # versión del catálogo y el próximo build ya no los analiza.
+        from igctools.api.die_features import enqueue_die_reindex
+
+        try:
+            enqueue_die_reindex()
+        except Exception as e:
+            frappe.log_error(frappe.utils.cstr(e), "IGCTools: die index reindex enqueue failed")
+    return entries
+
+
+def get_die_index(tipo_producto=None):
+    """
+    Índice del worker para tipo_producto (None = todo el catálogo).
+    Se reconstruye cuando cambia la versión del catálogo de Troqueles.
+    Los Troqueles sin features vigentes se analizan al armarlo
+    (ver _load_die_index_entries).
+    """
+    key = (getattr(frappe.local, "site", None), tipo_producto or None)
+    version = get_die_catalog_version()
+
+    index = _INDEXES.get(key)
+    if index is not None and index.catalog_version == version:
+        return index
+
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(key)
+        if index is None or index.catalog_version != version:
+            index = DieDimensionIndex(_load_die_index_entries(tipo_producto), catalog_version=version)
+            _INDEXES[key] = index
+    return index
+
+
+def clear_die_indexes():
+    with _INDEXES_LOCK:
+        _INDEXES.clear()
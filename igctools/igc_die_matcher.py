@@ -1,6 +1,62 @@
-import math
+import hashlib
+import heapq
+import io
+import json
 import frappe
-import xml.etree.ElementTree as ET
+
+import numpy as np
+from frappe.utils import cint, flt
+
+from igctools.igc_cache import cache_get, cache_set, content_hash, single_flight, svg_hash
+from igctools.igc_geometry import extract_svg_segments
+
+
+# Versión del algoritmo de features (analyze_die_svg / _compute_signature).
+# Subirla cuando cambie el cálculo: las filas de Troquel con otra versión
+# se consideran obsoletas y se recalculan al vuelo hasta reindexar.
+DIE_FEATURES_VERSION = 3
+
+# Tipos de segmento (ev-style de ArtiosCAD)
+SEGMENT_OTHER = 0
+SEGMENT_CUT = 1
+SEGMENT_CREASE = 2
+
+# Decimales con los que se guarda la firma normalizada (dx/dy relativos)
+DIE_SIGNATURE_DECIMALS = 6
+
+# Holgura extra (mm) del prefiltro SQL por redondeo de los Float en BD
+_SQL_TOL_EPS = 1e-6
+
+# True: consultas contra el índice en memoria del worker (igc_die_index).
+# False: prefiltro SQL + scan de los candidatos en cada consulta.
+USE_DIE_INDEX = True
+
+# Filas por página en el scan de respaldo (sin índice)
+DIE_SCAN_PAGE_SIZE = 500
+
+# Bandas intermedias del ensanchamiento adaptativo de tolerancia (mm)
+DIE_TOLERANCE_BANDS = (3.0, 5.0, 8.0, 10.0)
+
+# Máximo de ítems por llamada a find_similar_dies_batch
+MAX_BATCH_ITEMS = 200
+
+# Cache de resultados (por SVG + parámetros + versión de catálogo) y de
+# features del SVG cliente (independiente del catálogo y de la tolerancia)
+DIE_MATCH_CACHE_TTL = 6 * 60 * 60
+DIE_MATCH_CACHE_MAX_ENTRIES = 2000
+CLIENT_FEATURES_CACHE_TTL = 24 * 60 * 60
+CLIENT_FEATURES_CACHE_MAX_ENTRIES = 5000
+
+# Clave en cache de la versión del catálogo de Troqueles
+DIE_CATALOG_VERSION_KEY = "igctools:die_catalog_version"
+
+# Custom fields de Troquel (ver igctools.install)
+DIE_FEATURE_FIELDS = [
+    "igc_die_width",
+    "igc_die_height",
+    "igc_die_signature",
+    "igc_die_features_version",
+]
 
 
 def _parse_dim_attr(raw):
@@ -82,162 +138,19 @@ def _parse_svg_bbox_from_root(root):
     return width, height
 
 
-def _matrix_multiply(m1, m2):
-    a1, c1, e1, b1, d1, f1 = m1
-    a2, c2, e2, b2, d2, f2 = m2
-    a = a1 * a2 + c1 * b2
-    c = a1 * c2 + c1 * d2
-    e = a1 * e2 + c1 * f2 + e1
-    b = b1 * a2 + d1 * b2
-    d = b1 * c2 + d1 * d2
-    f = b1 * e2 + d1 * f2 + f1
-    return [a, c, e, b, d, f]
-
-
-def _parse_transform(transform_str):
-    if not transform_str:
-        return [1.0, 0.0, 0.0, 0.0, 1.0, 0.0]
-
-    s = transform_str.strip()
-    if not s:
-        return [1.0, 0.0, 0.0, 0.0, 1.0, 0.0]
-
-    current = [1.0, 0.0, 0.0, 0.0, 1.0, 0.0]
-
-    i = 0
-    length = len(s)
-    while i < length:
-        ch = s[i]
-        if ch.isalpha():
-            start = i
-            while i < length and s[i] != "(":
-                i += 1
-            name = s[start:i].strip().lower()
-            if i >= length or s[i] != "(":
-                break
-            i += 1
-            start_params = i
-            depth = 1
-            while i < length and depth > 0:
-                if s[i] == "(":
-                    depth += 1
-                elif s[i] == ")":
-                    depth -= 1
-                i += 1
-            params_str = s[start_params : i - 1]
-            parts = params_str.replace(",", " ").split()
-            nums = []
-            for p in parts:
-                try:
-                    nums.append(float(p))
-                except Exception:
-                    pass
-
-            local = [1.0, 0.0, 0.0, 0.0, 1.0, 0.0]
-            if name == "translate":
-                tx = nums[0] if len(nums) >= 1 else 0.0
-                ty = nums[1] if len(nums) >= 2 else 0.0
-                local = [1.0, 0.0, tx, 0.0, 1.0, ty]
-            elif name == "scale":
-                sx = nums[0] if len(nums) >= 1 else 1.0
-                sy = nums[1] if len(nums) >= 2 else sx
-                local = [sx, 0.0, 0.0, 0.0, sy, 0.0]
-
-            current = _matrix_multiply(current, local)
-        else:
-            i += 1
-
-    return current
-
-
-def _apply_matrix(m, x, y):
-    a, c, e, b, d, f = m
-    x_new = a * x + c * y + e
-    y_new = b * x + d * y + f
-    return x_new, y_new
+def _compute_signature_arrays(segs, width, height):
+    """_compute_signature sobre SegmentArrays (mismos filtros, en bloque)."""
+    crease = (segs.kind == SEGMENT_CREASE) & (segs.length > 0.1) & (segs.length > 5.0)
+    vertical = crease & (np.abs(segs.x2 - segs.x1) < 0.05)
+    horizontal = crease & ~vertical & (np.abs(segs.y2 - segs.y1) < 0.05)
 
+    vertical_positions = (0.5 * (segs.x1[vertical] + segs.x2[vertical])).tolist()
+    horizontal_positions = (0.5 * (segs.y1[horizontal] + segs.y2[horizontal])).tolist()
 
-def _extract_segments(root):
-    segments = []
+    return _signature_from_positions(vertical_positions, horizontal_positions, width, height)
 
-    def walk(node, parent_matrix):
-        transform_str = node.get("transform")
-        local_matrix = _parse_transform(transform_str) if transform_str else [1.0, 0.0, 0.0, 0.0, 1.0, 0.0]
-        if parent_matrix is not None:
-            matrix = _matrix_multiply(parent_matrix, local_matrix)
-        else:
-            matrix = local_matrix
-
-        tag = node.tag
-        if "}" in tag:
-            tag = tag.split("}", 1)[1]
-
-        if tag == "line":
-            try:
-                x1 = float(node.get("x1", "0") or "0")
-                y1 = float(node.get("y1", "0") or "0")
-                x2 = float(node.get("x2", "0") or "0")
-                y2 = float(node.get("y2", "0") or "0")
-            except Exception:
-                x1 = y1 = x2 = y2 = 0.0
-
-            x1t, y1t = _apply_matrix(matrix, x1, y1)
-            x2t, y2t = _apply_matrix(matrix, x2, y2)
-
-            style_ev = (node.get("ev-style") or "").lower()
-            seg_type = "other"
-            if "cut" in style_ev:
-                seg_type = "cut"
-            elif "creas" in style_ev:
-                seg_type = "crease"
-
-            dx = x2t - x1t
-            dy = y2t - y1t
-            length = math.hypot(dx, dy)
-
-            segments.append({
-                "x1": x1t,
-                "y1": y1t,
-                "x2": x2t,
-                "y2": y2t,
-                "length": length,
-                "type": seg_type
-            })
-
-        for child in node:
-            walk(child, matrix)
-
-    walk(root, None)
-    return segments
-
-
-def _compute_signature(segments, width, height):
-    vertical_positions = []
-    horizontal_positions = []
-
-    for seg in segments:
-        if seg.get("type") != "crease":
-            continue
-
-        length = seg["length"]
-        if length <= 0.1:
-            continue
-
-        x1 = seg["x1"]
-        x2 = seg["x2"]
-        y1 = seg["y1"]
-        y2 = seg["y2"]
-
-        dx = abs(x2 - x1)
-        dy = abs(y2 - y1)
-
-        if dx < 0.05 and length > 5.0:
-            x_mid = 0.5 * (x1 + x2)
-            vertical_positions.append(x_mid)
-        elif dy < 0.05 and length > 5.0:
-            y_mid = 0.5 * (y1 + y2)
-            horizontal_positions.append(y_mid)
 
+def _signature_from_positions(vertical_positions, horizontal_positions, width, height):
     vertical_positions.sort()
     horizontal_positions.sort()
 
@@ -281,9 +194,23 @@ def _compute_signature(segments, width, height):
     return dx_list, dy_list
 
 
+def _segment_kind(node):
+    style_ev = (node.get("ev-style") or "").lower()
+    if "cut" in style_ev:
+        return SEGMENT_CUT
+    if "creas" in style_ev:
+        return SEGMENT_CREASE
+    return SEGMENT_OTHER
+
+
 def analyze_die_svg(svg_text):
+    """
+    Features de un die (width, height, dx_list, dy_list).
+    svg_text puede ser str, bytes o un file-like (se parsea en streaming).
+    Toma <line>, <path>, <polyline>, <polygon> y <rect>.
+    """
     try:
-        root = ET.fromstring(svg_text)
+        root_attrib, segs = extract_svg_segments(svg_text, classify=_segment_kind)
     except Exception:
         return {
             "width": None,
@@ -292,28 +219,18 @@ def analyze_die_svg(svg_text):
             "dy_list": []
         }
 
-    width, height = _parse_svg_bbox_from_root(root)
-    segments = _extract_segments(root)
-
-    if (width is None or height is None) and segments:
-        xs = []
-        ys = []
-        for seg in segments:
-            xs.append(seg["x1"])
-            xs.append(seg["x2"])
-            ys.append(seg["y1"])
-            ys.append(seg["y2"])
-        if xs and ys:
-            min_x = min(xs)
-            max_x = max(xs)
-            min_y = min(ys)
-            max_y = max(ys)
+    width, height = _parse_svg_bbox_from_root(root_attrib)
+
+    if width is None or height is None:
+        bounds = segs.bounds()
+        if bounds:
+            min_x, min_y, max_x, max_y = bounds
             if width is None:
                 width = max_x - min_x
             if height is None:
                 height = max_y - min_y
 
-    dx_list, dy_list = _compute_signature(segments, width or 0.0, height or 0.0)
+    dx_list, dy_list = _compute_signature_arrays(segs, width or 0.0, height or 0.0)
 
     return {
         "width": width,
@@ -406,11 +323,277 @@ def compare_die_features(cliente, troq, tolerance_mm):
     }, True
 
 
-@frappe.whitelist()
-def find_similar_dies_from_svg(svg_text, tolerance_mm=3.0, max_results=30, tipo_producto=None):
-    if not svg_text:
+# ---------------------------------------------------------
+# Features almacenadas en Troquel
+# ---------------------------------------------------------
+
+def _pack_die_signature(dx_list, dy_list):
+    """Serializa dx/dy como JSON compacto: [[dx...],[dy...]]."""
+    nd = DIE_SIGNATURE_DECIMALS
+    return json.dumps(
+        [[round(d, nd) for d in (dx_list or [])], [round(d, nd) for d in (dy_list or [])]],
+        separators=(",", ":")
+    )
+
+
+def _unpack_die_signature(raw):
+    if not raw:
+        return [], []
+    try:
+        dx_list, dy_list = json.loads(raw)
+        return [float(d) for d in dx_list], [float(d) for d in dy_list]
+    except Exception:
+        return None
+
+
+def _die_features_to_values(feats):
+    """
+    Features de analyze_die_svg → valores de los custom fields de Troquel.
+    Un SVG sin dimensiones guarda 0 (las columnas Float son NOT NULL) con
+    la versión vigente: _stored_die_features lo lee como "sin medidas".
+    """
+    return {
+        "igc_die_width": flt(feats.get("width")),
+        "igc_die_height": flt(feats.get("height")),
+        "igc_die_signature": _pack_die_signature(feats.get("dx_list"), feats.get("dy_list")),
+        "igc_die_features_version": DIE_FEATURES_VERSION,
+    }
+
+
+def _stored_die_features(row):
+    """
+    Reconstruye las features desde una fila de Troquel.
+    Devuelve None si faltan o fueron calculadas con otra versión.
+    """
+    if cint(row.get("igc_die_features_version")) != DIE_FEATURES_VERSION:
+        return None
+
+    signature = _unpack_die_signature(row.get("igc_die_signature"))
+    if signature is None:
+        return None
+
+    dx_list, dy_list = signature
+    return {
+        "width": row.get("igc_die_width") or None,
+        "height": row.get("igc_die_height") or None,
+        "dx_list": dx_list,
+        "dy_list": dy_list
+    }
+
+
+def _analyze_troquel_svg(troquel_name):
+    """Fallback: analiza al vuelo el SVG de un Troquel sin features vigentes."""
+    svg_t = frappe.db.get_value("Troquel", troquel_name, "svg_plano_mecanico_individual")
+    svg_t = (svg_t or "").strip()
+    if not svg_t:
+        return None
+    return analyze_die_svg(svg_t)
+
+
+def _iter_troquel_pages(filters, fields, page_size=None):
+    """Recorre Troquel en páginas de tamaño fijo (keyset por name)."""
+    page_size = page_size or DIE_SCAN_PAGE_SIZE
+    last = ""
+    while True:
+        rows = frappe.get_all(
+            "Troquel",
+            filters=[*filters, ["name", ">", last]],
+            fields=fields,
+            order_by="name asc",
+            page_length=page_size,
+        )
+        if not rows:
+            return
+        yield from rows
+        last = rows[-1]["name"]
+
+
+def _fetch_candidate_troqueles(cw, ch, tolerance_mm, tipo_producto=None):
+    """
+    Genera los Troqueles dimensionalmente plausibles, página a página:
+    - features vigentes dentro de ±tolerance_mm en orientación directa
+      o rotada 90° (una consulta por orientación),
+    - más los que no tienen features vigentes (se analizan al vuelo).
+    Nunca trae el SVG: solo name + features guardadas.
+    """
+    base_filters = [["svg_plano_mecanico_individual", "is", "set"]]
+    if tipo_producto:
+        base_filters.append(["tipo_producto", "=", tipo_producto])
+
+    # Holgura mínima para que el redondeo decimal de la BD no deje fuera
+    # casos en el borde; compare_die_features hace el chequeo exacto.
+    tol = tolerance_mm + _SQL_TOL_EPS
+
+    orientations = [(cw, ch)]
+    if abs(cw - ch) > _SQL_TOL_EPS:
+        orientations.append((ch, cw))
+
+    for pos, (w, h) in enumerate(orientations):
+        filters = [
+            *base_filters,
+            ["igc_die_features_version", "=", DIE_FEATURES_VERSION],
+            ["igc_die_width", ">=", w - tol],
+            ["igc_die_width", "<=", w + tol],
+            ["igc_die_height", ">=", h - tol],
+            ["igc_die_height", "<=", h + tol],
+        ]
+        for t in _iter_troquel_pages(filters, ["name", *DIE_FEATURE_FIELDS]):
+            # En la ventana rotada se saltan los que ya salieron en la directa
+            # (sin guardar un set de nombres del tamaño del catálogo)
+            if pos and abs((t.get("igc_die_width") or 0) - cw) <= tol and abs((t.get("igc_die_height") or 0) - ch) <= tol:
+                continue
+            yield t
+
+    # Sin features vigentes: no sabemos sus dimensiones, van todos
+    yield from _iter_troquel_pages(
+        [*base_filters, ["igc_die_features_version", "!=", DIE_FEATURES_VERSION]],
+        ["name"],
+    )
+
+
+def update_troquel_die_features(doc, method=None):
+    """
+    before_save en Troquel:
+    - Recalcula width/height/dx_list/dy_list si el SVG cambió o las
+      features guardadas son de otra versión.
+    - Solo asigna campos en doc (no hace .save() aquí)
+    """
+    try:
+        stale = cint(doc.get("igc_die_features_version")) != DIE_FEATURES_VERSION
+        if not doc.is_new() and not stale and not doc.has_value_changed("svg_plano_mecanico_individual"):
+            return
+
+        svg_t = (doc.get("svg_plano_mecanico_individual") or "").strip()
+        if svg_t:
+            feats = analyze_die_svg(svg_t)
+        else:
+            feats = {"width": None, "height": None, "dx_list": [], "dy_list": []}
+
+        doc.update(_die_features_to_values(feats))
+    except Exception as e:
+        frappe.log_error(frappe.utils.cstr(e), "IGCTools: update_troquel_die_features")
+
+
+def get_die_catalog_version():
+    """Versión actual del catálogo de Troqueles (compartida entre workers)."""
+    version = frappe.cache.get_value(DIE_CATALOG_VERSION_KEY)
+    if not version:
+        version = bump_die_catalog_version()
+    return version
+
+
+def bump_die_catalog_version(doc=None, method=None, *args, **kwargs):
+    """
+    on_update / on_trash / after_rename en Troquel: invalida índices y caches
+    derivados del catálogo en todos los workers.
+    """
+    version = frappe.generate_hash(length=12)
+    frappe.cache.set_value(DIE_CATALOG_VERSION_KEY, version)
+    return version
+
+
+def _die_match_row(name, cmp_res, cliente, troq):
+    return {
+        "name": name,
+        "score": cmp_res["total_score"],
+        "delta_w": cmp_res["delta_w"],
+        "delta_h": cmp_res["delta_h"],
+        "rotated": cmp_res["rotated"],
+        "shape_score": cmp_res["shape_score"],
+        "cliente_width": cliente.get("width"),
+        "cliente_height": cliente.get("height"),
+        "troquel_width": troq.get("width"),
+        "troquel_height": troq.get("height")
+    }
+
+
+def _iter_candidate_features(cliente, tol, tipo_producto=None):
+    """(name, features) de los Troqueles del prefiltro SQL."""
+    for t in _fetch_candidate_troqueles(cliente["width"], cliente["height"], tol, tipo_producto):
+        troq = _stored_die_features(t)
+        if troq is None:
+            # Features faltantes u obsoletas → análisis al vuelo
+            troq = _analyze_troquel_svg(t["name"])
+            if troq is None:
+                continue
+        yield t["name"], troq
+
+
+def _push_bounded(heap, k, item):
+    """Mantiene en heap (max-heap por -clave) los k ítems de menor clave."""
+    if len(heap) < k:
+        heapq.heappush(heap, item)
+    elif item > heap[0]:
+        heapq.heapreplace(heap, item)
+
+
+def _scan_similar_dies(cliente, tol, max_res, tipo_producto=None):
+    """
+    Prefiltro SQL + comparación de cada candidato (sin índice en memoria).
+    Los candidatos llegan por páginas y solo se conserva un heap de
+    max_res resultados: la memoria no depende del tamaño del catálogo.
+    """
+    best = []
+    if max_res <= 0:
         return []
 
+    for pos, (name, troq) in enumerate(_iter_candidate_features(cliente, tol, tipo_producto)):
+        cmp_res, ok = compare_die_features(cliente, troq, tol)
+        if not ok:
+            continue
+
+        # A igual score gana el que llegó antes, como el sort estable original
+        _push_bounded(best, max_res, (-cmp_res["total_score"], -pos, name, cmp_res, troq))
+
+    best.sort(reverse=True)
+    return [(name, troq, cmp_res) for _s, _p, name, cmp_res, troq in best]
+
+
+def _tolerance_bands(tol, max_tol):
+    """Bandas de tolerancia crecientes entre tol y max_tol (ambas incluidas)."""
+    bands = {tol, max_tol}
+    bands.update(b for b in DIE_TOLERANCE_BANDS if tol < b < max_tol)
+    return sorted(bands)
+
+
+def _rank_by_tolerance_bands(candidates, cliente, bands, min_results, max_res):
+    """
+    Ensanchamiento adaptativo en una sola pasada.
+
+    candidates: (name, features) plausibles para la banda más ancha.
+    Cada candidato se compara en todas las bandas; la elegida es la menor
+    que junta min_results aciertos (o la última). Los resultados son los
+    aciertos en esa banda, ordenados por la banda en la que aparecen por
+    primera vez y después por score, igual que llamar a
+    compare_die_features con cada tolerancia por separado.
+
+    Devuelve (banda elegida, [(name, features, cmp_res, banda), ...]).
+    """
+    # Un heap acotado por banda: memoria n_bandas x max_res
+    heaps = [[] for _b in bands]
+    counts = [0] * len(bands)
+    for pos, (name, troq) in enumerate(candidates):
+        first = None
+        for i, b in enumerate(bands):
+            cmp_res, ok = compare_die_features(cliente, troq, b)
+            if not ok:
+                continue
+            if first is None:
+                first = i
+            counts[i] += 1
+            if max_res > 0:
+                _push_bounded(heaps[i], max_res, (-first, -cmp_res["total_score"], -pos, name, troq, cmp_res))
+
+    chosen = next((i for i, c in enumerate(counts) if c >= min_results), len(bands) - 1)
+
+    best = sorted(heaps[chosen], reverse=True)
+    return bands[chosen], [
+        (name, troq, cmp_res, bands[-neg_first])
+        for neg_first, _s, _p, name, troq, cmp_res in best
+    ]
+
+
+def _parse_match_args(tolerance_mm, max_results):
     try:
         tol = float(tolerance_mm)
     except Exception:
@@ -421,60 +604,297 @@ def find_similar_dies_from_svg(svg_text, tolerance_mm=3.0, max_results=30, tipo_
     except Exception:
         max_res = 30
 
-    cliente = analyze_die_svg(svg_text)
-    cw = cliente.get("width")
-    ch = cliente.get("height")
+    return tol, max_res
+
+
+def _stream_md5(fh, chunk_size=1 << 16):
+    h = hashlib.md5()
+    for chunk in iter(lambda: fh.read(chunk_size), b""):
+        h.update(chunk)
+    return h.hexdigest()
+
+
+def _file_svg_source(file_url=None, file_name=None):
+    """
+    (digest, opener) de un File del sistema, por name o file_url.
+    El digest sale del content_hash del File (md5, el mismo que calcula
+    Frappe al subirlo): si ya está en cache el archivo no se lee.
+    opener() abre el contenido para analizarlo en streaming.
+    """
+    if file_name:
+        file_doc = frappe.get_doc("File", file_name)
+    else:
+        file_doc = frappe.get_doc("File", {"file_url": file_url})
+
+    file_doc.check_permission("read")
+
+    if (file_doc.file_url or "").startswith(("http://", "https://")):
+        content = file_doc.get_content() or b""
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        digest = file_doc.content_hash or hashlib.md5(content).hexdigest()
+        return f"file:{digest}", lambda: io.BytesIO(content)
+
+    path = file_doc.get_full_path()
+    digest = file_doc.content_hash
+    if not digest:
+        with open(path, "rb") as fh:
+            digest = _stream_md5(fh)
+    return f"file:{digest}", lambda: open(path, "rb")
+
+
+def _uploaded_svg_source(fieldname="file"):
+    """
+    (digest, opener) del archivo subido en el request (multipart), o None.
+    Se hashea por bloques y se analiza desde el stream: el SVG nunca se
+    arma como string ni viaja url-encoded.
+    """
+    request = getattr(frappe, "request", None)
+    files = getattr(request, "files", None) if request else None
+    upload = files.get(fieldname) if files else None
+    if not upload:
+        return None
+
+    stream = upload.stream
+    if not stream.seekable():
+        stream = io.BytesIO(stream.read())
+    digest = _stream_md5(stream)
+    stream.seek(0)
+    return f"file:{digest}", lambda: stream
+
+
+def _client_die_features(svg_text, digest=None, opener=None):
+    """
+    analyze_die_svg del SVG cliente, cacheado por hash de contenido.
+    Con opener (ver _file_svg_source) el SVG se lee recién en un miss.
+    """
+    digest = digest or svg_hash(svg_text)
+    key = f"{digest}:{DIE_FEATURES_VERSION}"
+
+    cliente = cache_get("die_client_features", key)
+    if cliente is None:
+        if opener is not None:
+            with opener() as fh:
+                cliente = analyze_die_svg(fh)
+        else:
+            cliente = analyze_die_svg(svg_text)
+        cache_set("die_client_features", key, cliente,
+                  ttl=CLIENT_FEATURES_CACHE_TTL, max_entries=CLIENT_FEATURES_CACHE_MAX_ENTRIES)
+    return cliente
+
+
+def _svg_source(svg_text=None, file_url=None, file_name=None):
+    """(digest, opener) para texto, File o archivo subido; None si no hay SVG."""
+    if svg_text:
+        return svg_hash(svg_text), None
+    if file_name or file_url:
+        return _file_svg_source(file_url, file_name)
+    return _uploaded_svg_source()
+
+
+def _match_similar_dies(cliente, tol, max_res, tipo_producto=None):
+    if USE_DIE_INDEX:
+        from igctools.igc_die_index import get_die_index
+
+        matches = get_die_index(tipo_producto).top_k(cliente, tol, max_res)
+    else:
+        matches = _scan_similar_dies(cliente, tol, max_res, tipo_producto)
+
+    return [_die_match_row(name, cmp_res, cliente, troq) for name, troq, cmp_res in matches]
+
+
+def _match_similar_dies_banded(cliente, tol, max_tol, min_results, max_res, tipo_producto=None):
+    bands = _tolerance_bands(tol, max_tol)
+
+    index = None
+    if USE_DIE_INDEX:
+        from igctools.igc_die_index import get_die_index
+
+        index = get_die_index(tipo_producto)
 
-    if not cw or not ch:
+    # Un solo recorrido de los candidatos de la banda más ancha
+    if index is not None:
+        candidates = index.candidates(cliente, bands[-1])
+    else:
+        candidates = _iter_candidate_features(cliente, bands[-1], tipo_producto)
+
+    chosen, matches = _rank_by_tolerance_bands(candidates, cliente, bands, min_results, max_res)
+    results = []
+    for name, troq, cmp_res, band in matches:
+        row = _die_match_row(name, cmp_res, cliente, troq)
+        row["band_mm"] = band
+        results.append(row)
+    return {"tolerance_mm": chosen, "bands": bands, "results": results}
+
+
+def _parse_band_args(tol, min_results, max_tolerance_mm):
+    """(min_results, max_tol) o None si no se pidió ensanchamiento."""
+    try:
+        min_res = int(min_results or 0)
+        max_tol = float(max_tolerance_mm) if max_tolerance_mm not in (None, "") else None
+    except Exception:
+        return None
+    if min_res <= 0 or max_tol is None or max_tol <= tol:
+        return None
+    return min_res, max_tol
+
+
+def _cached_die_match(digest, tol, max_res, tipo_producto, banded, client_features):
+    """
+    Resultado de la búsqueda para el SVG identificado por digest, con el
+    cache "die_match". client_features() da las features del SVG cliente
+    y solo se llama en un miss.
+    """
+    # La versión de catálogo va en la clave: al cambiar un Troquel las
+    # entradas viejas quedan inalcanzables y las expulsa el LRU/TTL
+    cache_key = content_hash(digest, tol, max_res, tipo_producto or "", banded or "", DIE_FEATURES_VERSION,
+                             get_die_catalog_version())
+
+    def compute():
+        cliente = client_features()
+        if not cliente.get("width") or not cliente.get("height"):
+            return []
+        if banded:
+            return _match_similar_dies_banded(cliente, tol, banded[1], banded[0], max_res, tipo_producto)
+        return _match_similar_dies(cliente, tol, max_res, tipo_producto)
+
+    # Pedidos idénticos simultáneos (doble click, varios cotizadores)
+    # esperan el resultado del primero en lugar de repetir la búsqueda
+    out, _origin = single_flight("die_match", cache_key, compute,
+                                 ttl=DIE_MATCH_CACHE_TTL, max_entries=DIE_MATCH_CACHE_MAX_ENTRIES)
+    return out
+
+
+@frappe.whitelist()
+def find_similar_dies_from_svg(svg_text=None, tolerance_mm=3.0, max_results=30, tipo_producto=None,
+                               min_results=0, max_tolerance_mm=None, file_name=None, file_url=None):
+    """
+    El SVG cliente puede venir como svg_text, como referencia a un File ya
+    subido (file_name / file_url) o como archivo en el request (campo
+    "file", multipart). Con File/archivo, resultados y features se
+    cachean por el hash de contenido del archivo.
+
+    Con min_results y max_tolerance_mm (> tolerance_mm) la búsqueda se
+    ensancha sola: devuelve {"tolerance_mm", "bands", "results"} con la
+    menor banda que junta min_results aciertos y cada resultado marcado
+    con band_mm. Sin ellos devuelve la lista de siempre.
+    """
+    source = _svg_source(svg_text, file_url, file_name)
+    if not source:
         return []
+    digest, opener = source
 
-    troquel_filters = {
-        "svg_plano_mecanico_individual": ["is", "set"]
+    tol, max_res = _parse_match_args(tolerance_mm, max_results)
+    banded = _parse_band_args(tol, min_results, max_tolerance_mm)
+    return _cached_die_match(digest, tol, max_res, tipo_producto, banded,
+                             lambda: _client_die_features(svg_text, digest, opener))
+
+
+def _shape_match_row(name, shape_score, cliente, troq):
+    cw, ch = cliente.get("width"), cliente.get("height")
+    tw, th = troq.get("width"), troq.get("height")
+    return {
+        "name": name,
+        "shape_score": shape_score,
+        # Factor de escala cliente / troquel por eje (1.0 = mismo tamaño)
+        "scale_w": (cw / tw) if cw and tw else None,
+        "scale_h": (ch / th) if ch and th else None,
+        "cliente_width": cw,
+        "cliente_height": ch,
+        "troquel_width": tw,
+        "troquel_height": th
     }
 
-    if tipo_producto:
-        troquel_filters["tipo_producto"] = tipo_producto
 
-    troqueles = frappe.get_all(
-        "Troquel",
-        filters=troquel_filters,
-        fields=["name", "svg_plano_mecanico_individual"],
-        limit=500
-    )
+@frappe.whitelist()
+def find_similar_shapes_from_svg(svg_text=None, max_results=30, max_shape_score=1.0, tipo_producto=None,
+                                 file_name=None, file_url=None):
+    """
+    Troqueles con la misma estructura de paneles que el SVG, a cualquier
+    tamaño (p.ej. para escalar un diseño existente). Usa solo las firmas
+    normalizadas dx/dy, sin el filtro de dimensiones absolutas.
+    Acepta las mismas entradas que find_similar_dies_from_svg.
+    """
+    source = _svg_source(svg_text, file_url, file_name)
+    if not source:
+        return []
+    digest, opener = source
 
-    candidatos = []
+    _tol, max_res = _parse_match_args(None, max_results)
+    try:
+        max_shape = float(max_shape_score)
+    except Exception:
+        max_shape = 1.0
 
-    for t in troqueles:
-        svg_t = (t.get("svg_plano_mecanico_individual") or "").strip()
-        if not svg_t:
-            continue
+    cache_key = content_hash("shape", digest, max_res, max_shape, tipo_producto or "", DIE_FEATURES_VERSION,
+                             get_die_catalog_version())
+    cached = cache_get("die_match", cache_key)
+    if cached is not None:
+        return cached
 
-        troq = analyze_die_svg(svg_t)
-        cmp_res, ok = compare_die_features(cliente, troq, tol)
-        if not ok:
-            continue
+    cliente = _client_die_features(svg_text, digest, opener)
+    if not cliente.get("dx_list") and not cliente.get("dy_list"):
+        return []
+
+    from igctools.igc_die_index import get_die_index
+
+    matches = get_die_index(tipo_producto).shape_top_k(cliente, max_res, max_shape)
+    out = [_shape_match_row(name, score, cliente, troq) for name, troq, score in matches]
+    cache_set("die_match", cache_key, out, ttl=DIE_MATCH_CACHE_TTL, max_entries=DIE_MATCH_CACHE_MAX_ENTRIES)
+    return out
 
-        candidatos.append({
-            "name": t["name"],
-            "score": cmp_res["total_score"],
-            "delta_w": cmp_res["delta_w"],
-            "delta_h": cmp_res["delta_h"],
-            "rotated": cmp_res["rotated"],
-            "shape_score": cmp_res["shape_score"],
-            "cliente_width": cw,
-            "cliente_height": ch,
-            "troquel_width": troq.get("width"),
-            "troquel_height": troq.get("height")
-        })
-
-    candidatos.sort(key=lambda c: c["score"])
 
+@frappe.whitelist()
+def find_similar_dies_batch(items):
+    """
+    Búsqueda de troqueles para varios dies de cliente en una sola llamada.
+
+    items: lista (o JSON) de dicts con:
+        svg_text | file_url | file_name, tolerance_mm, max_results, tipo_producto, key
+        (opcional: min_results, max_tolerance_mm, ver find_similar_dies_from_svg)
+    Devuelve una lista en el mismo orden:
+        [{"key": ..., "results": [...]} | {"key": ..., "error": "..."}]
+    (con ensanchamiento, además "tolerance_mm" y "bands" en el ítem)
+    Cada ítem sigue el camino de find_similar_dies_from_svg (USE_DIE_INDEX
+    y cache "die_match"); un SVG repetido en el lote se analiza una vez.
+    """
+    items = frappe.parse_json(items) if isinstance(items, str) else items
+    if not isinstance(items, list):
+        frappe.throw("items debe ser una lista.")
+    if len(items) > MAX_BATCH_ITEMS:
+        frappe.throw(f"Máximo {MAX_BATCH_ITEMS} ítems por llamada.")
+
+    analyzed = {}
     out = []
-    count = 0
-    for c in candidatos:
-        if count >= max_res:
-            break
-        out.append(c)
-        count += 1
+
+    for pos, item in enumerate(items):
+        item = item or {}
+        key = item.get("key", pos)
+        try:
+            svg_text = item.get("svg_text")
+            source = None
+            if svg_text or item.get("file_url") or item.get("file_name"):
+                source = _svg_source(svg_text, item.get("file_url"), item.get("file_name"))
+            if not source:
+                out.append({"key": key, "results": []})
+                continue
+            digest, opener = source
+
+            tol, max_res = _parse_match_args(item.get("tolerance_mm", 3.0), item.get("max_results", 30))
+
+            def client_features(svg_text=svg_text, digest=digest, opener=opener):
+                # Mismo SVG repetido en el lote → se analiza una vez
+                cliente = analyzed.get(digest)
+                if cliente is None:
+                    cliente = analyzed[digest] = _client_die_features(svg_text, digest, opener)
+                return cliente
+
+            banded = _parse_band_args(tol, item.get("min_results"), item.get("max_tolerance_mm"))
+            res = _cached_die_match(digest, tol, max_res, item.get("tipo_producto") or None, banded,
+                                    client_features)
+            out.append({"key": key, **res} if isinstance(res, dict) else {"key": key, "results": res})
+        except Exception as e:
+            frappe.log_error(frappe.utils.cstr(e), "IGCTools: find_similar_dies_batch")
+            out.append({"key": key, "error": frappe.utils.cstr(e)})
 
     return out
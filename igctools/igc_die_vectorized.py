@@ -0,0 +1,202 @@
+# apps/igctools/igctools/igc_die_vectorized.py
+#
+# Comparación de un die cliente contra muchos troqueles a la vez con NumPy.
+# Reproduce compare_die_features operación por operación (mismo orden de
+# sumas en float64), así que el ranking es idéntico al del código escalar.
+
+import numpy as np
+
+# _compute_signature recorta dx/dy a 10 paneles
+MAX_PANELS = 10
+
+# Mismos umbrales que compare_die_features
+ASPECT_REL_TOL = 0.05
+PENALTY_PER_MISSING = 0.5
+MAX_SHAPE_SCORE = 1.0
+SHAPE_WEIGHT = 10.0
+
+
+def _pad_lists(lists):
+    """Listas de largo variable → (matriz n x MAX_PANELS rellenada con 0, largos)."""
+    mat = np.zeros((len(lists), MAX_PANELS), dtype=np.float64)
+    lens = np.zeros(len(lists), dtype=np.int64)
+    for i, values in enumerate(lists):
+        values = (values or [])[:MAX_PANELS]
+        lens[i] = len(values)
+        if values:
+            mat[i, : len(values)] = values
+    return mat, lens
+
+
+def _signature_distance(a_list, b_mat, b_lens):
+    """signature_distance(a, b) de compare_die_features para cada fila de b_mat."""
+    a_list = list(a_list or [])[:MAX_PANELS]
+    la = len(a_list)
+    n = np.minimum(la, b_lens)
+
+    # Suma secuencial columna a columna: mismo orden que el for escalar
+    # (np.sum usa suma por pares y cambiaría el último bit)
+    dist = np.zeros(b_mat.shape[0], dtype=np.float64)
+    for i in range(min(la, MAX_PANELS)):
+        dist = dist + np.where(i < n, np.abs(a_list[i] - b_mat[:, i]), 0.0)
+
+    dist = dist + (la - n) * PENALTY_PER_MISSING
+    dist = dist + (b_lens - n) * PENALTY_PER_MISSING
+    return dist
+
+
+class DieFeatureMatrix:
+    """
+    Catálogo de features en matrices rellenadas:
+    width[n], height[n], dx[n, 10], dy[n, 10], dx_len[n], dy_len[n].
+    """
+
+    def __init__(self, entries):
+        """entries: lista de (name, features) al estilo analyze_die_svg."""
+        self.names = [name for name, _f in entries]
+        self.width = np.array([_dim(f.get("width")) for _n, f in entries], dtype=np.float64)
+        self.height = np.array([_dim(f.get("height")) for _n, f in entries], dtype=np.float64)
+        self.dx, self.dx_len = _pad_lists([f.get("dx_list") for _n, f in entries])
+        self.dy, self.dy_len = _pad_lists([f.get("dy_list") for _n, f in entries])
+
+    def __len__(self):
+        return len(self.names)
+
+    def compare(self, cliente, tolerance_mm, rows=None):
+        """
+        compare_die_features(cliente, troq, tolerance_mm) para todo el catálogo
+        (o solo para los índices en rows).
+
+        Devuelve dict de arrays: ok, delta_w, delta_h, rotated, shape_score,
+        total_score y rows (índices evaluados). Los valores de filas con
+        ok=False no tienen significado.
+        """
+        if rows is None:
+            rows = np.arange(len(self.names))
+        else:
+            rows = np.asarray(rows, dtype=np.int64)
+
+        n = rows.shape[0]
+        cw = _dim(cliente.get("width"))
+        ch = _dim(cliente.get("height"))
+        tw = self.width[rows]
+        th = self.height[rows]
+
+        out = {
+            "rows": rows,
+            "ok": np.zeros(n, dtype=bool),
+            "delta_w": np.zeros(n),
+            "delta_h": np.zeros(n),
+            "rotated": np.zeros(n, dtype=bool),
+            "shape_score": np.zeros(n),
+            "total_score": np.zeros(n),
+        }
+        if n == 0 or np.isnan(cw) or np.isnan(ch) or cw == 0 or ch == 0:
+            return out
+
+        tol = tolerance_mm if tolerance_mm is not None else 3.0
+        valid = ~np.isnan(tw) & ~np.isnan(th) & (tw != 0) & (th != 0)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            dw1 = np.abs(cw - tw)
+            dh1 = np.abs(ch - th)
+            dw2 = np.abs(cw - th)
+            dh2 = np.abs(ch - tw)
+
+            ok1 = (dw1 <= tol) & (dh1 <= tol)
+            ok2 = (dw2 <= tol) & (dh2 <= tol)
+
+            # Ambas válidas: gana la de menor suma (empate → directa)
+            rotated = np.where(ok1 & ok2, (dw1 + dh1) > (dw2 + dh2), ~ok1)
+            best_dw = np.where(rotated, dw2, dw1)
+            best_dh = np.where(rotated, dh2, dh1)
+
+            aspect_c = cw / ch
+            aspect_t = np.where(rotated, th / tw, tw / th)
+            aspect_ok = ~(np.abs(aspect_c - aspect_t) > ASPECT_REL_TOL * aspect_c)
+
+        c_dx = cliente.get("dx_list") or []
+        c_dy = cliente.get("dy_list") or []
+        t_dx_len = self.dx_len[rows]
+        t_dy_len = self.dy_len[rows]
+        count_ok = (np.abs(len(c_dx) - t_dx_len) <= 1) & (np.abs(len(c_dy) - t_dy_len) <= 1)
+
+        shape_dx = _signature_distance(c_dx, self.dx[rows], t_dx_len)
+        shape_dy = _signature_distance(c_dy, self.dy[rows], t_dy_len)
+        shape_score = shape_dx + shape_dy
+
+        dim_score = best_dw + best_dh
+        total_score = dim_score + shape_score * SHAPE_WEIGHT
+
+        out["ok"] = valid & (ok1 | ok2) & aspect_ok & count_ok & ~(shape_score > MAX_SHAPE_SCORE)
+        out["delta_w"] = best_dw
+        out["delta_h"] = best_dh
+        out["rotated"] = rotated
+        out["shape_score"] = shape_score
+        out["total_score"] = total_score
+        return out
+
+    def top_k(self, cliente, tolerance_mm, k, rows=None):
+        """
+        Ranking por total_score (empates en orden de catálogo, como el sort
+        estable original). Devuelve [(idx, cmp_res), ...].
+        """
+        res = self.compare(cliente, tolerance_mm, rows=rows)
+        hits = np.flatnonzero(res["ok"])
+        if hits.size == 0 or k <= 0:
+            return []
+
+        order = np.lexsort((res["rows"][hits], res["total_score"][hits]))[:k]
+        out = []
+        for j in hits[order]:
+            out.append((int(res["rows"][j]), {
+                "delta_w": float(res["delta_w"][j]),
+                "delta_h": float(res["delta_h"][j]),
+                "rotated": bool(res["rotated"][j]),
+                "shape_score": float(res["shape_score"][j]),
+                "total_score": float(res["total_score"][j])
+            }))
+        return out
+
+    def shape_top_k(self, cliente, k, max_shape_score=MAX_SHAPE_SCORE):
+        """
+        Búsqueda solo por forma: ranking por shape_score (la misma distancia
+        de firmas de compare_die_features) sin filtro de dimensiones ni de
+        aspecto, así que encuentra el mismo diseño a cualquier escala.
+
+        Cada troquel es un vector fijo (dx[10], dy[10], largos) y la consulta
+        es fuerza bruta vectorizada sobre todo el catálogo.
+        Devuelve [(idx, shape_score), ...] (empates en orden de catálogo).
+        """
+        c_dx = cliente.get("dx_list") or []
+        c_dy = cliente.get("dy_list") or []
+        if (not c_dx and not c_dy) or k <= 0 or not len(self.names):
+            return []
+
+        shape_score = _signature_distance(c_dx, self.dx, self.dx_len) + _signature_distance(c_dy, self.dy, self.dy_len)
+        ok = (
+            (np.abs(len(c_dx) - self.dx_len) <= 1)
+            & (np.abs(len(c_dy) - self.dy_len) <= 1)
+            & ((self.dx_len + self.dy_len) > 0)
+            & ~(shape_score > max_shape_score)
+        )
+        hits = np.flatnonzero(ok)
+        if hits.size == 0:
+            return []
+
+        if hits.size > k:
+            # Recorte previo al sort: todo lo que empata con el k-ésimo se conserva
+            kth = np.partition(shape_score[hits], k - 1)[k - 1]
+            hits = hits[shape_score[hits] <= kth]
+
+        order = np.lexsort((hits, shape_score[hits]))[:k]
+        return [(int(i), float(shape_score[i])) for i in hits[order]]
+
+
+def _dim(value):
+    if value is None:
+        return np.nan
+    try:
+        return float(value)
+    except Exception:
+        return np.nan
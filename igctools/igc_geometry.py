@@ -0,0 +1,659 @@
+# apps/igctools/igctools/igc_geometry.py
+#
+# Motor de extracción de geometría SVG:
+# - transforms parseados y compuestos con memo (en un die el mismo
+#   "translate(...)" se repite miles de veces)
+# - coordenadas crudas agrupadas por matriz y transformadas en bloque con NumPy
+# - <line>, <path>, <polyline>, <polygon> y <rect>; paths con la gramática
+#   completa (curvas y arcos aplanados a una tolerancia)
+# - salida compacta: segmentos (SegmentArrays) o polilíneas (PolylineArrays)
+# - recorrido en streaming (target de XMLParser), sin árbol ni recursión
+
+import io
+import math
+import re
+import xml.etree.ElementTree as ET
+from functools import lru_cache
+
+import numpy as np
+
+# Matriz afín como tupla (a, c, e, b, d, f):
+#   x' = a*x + c*y + e
+#   y' = b*x + d*y + f
+IDENTITY = (1.0, 0.0, 0.0, 0.0, 1.0, 0.0)
+
+SEGMENT_TAGS = frozenset(("line", "path", "polyline", "polygon", "rect"))
+
+_NUMBER_RE = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_TRANSFORM_RE = re.compile(r"([A-Za-z]+)\s*\(([^)]*)\)")
+# Comando de path + sus argumentos (texto hasta el próximo comando)
+_PATH_CMD_RE = re.compile(r"([MmLlHhVvZzCcSsQqTtAa])([^MmLlHhVvZzCcSsQqTtAa]*)")
+
+# Cualquier comando que no sea M/L absoluto
+_NOT_ABS_ML_RE = re.compile(r"[mlHhVvZzCcSsQqTtAa]")
+
+# Argumentos de arco: las banderas son un solo dígito y pueden venir pegadas ("0 011 10 0")
+_NUM = r"([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)"
+_SEP = r"[\s,]*"
+_ARC_ARGS_RE = re.compile(_SEP.join(("", _NUM, _NUM, _NUM, "([01])", "([01])", _NUM, _NUM)))
+
+# Cantidad de parámetros por comando de path
+_PATH_ARITY = {"M": 2, "L": 2, "H": 1, "V": 1, "C": 6, "S": 4, "Q": 4, "T": 2, "A": 7, "Z": 0}
+
+# Desvío máximo (unidades del SVG) de las cuerdas al aplanar curvas y arcos
+PATH_FLATTEN_TOLERANCE = 0.05
+
+# Tope de tramos por curva (curvas enormes o tolerancias ridículas)
+MAX_CURVE_STEPS = 256
+
+
+# ---------------------------------------------------------
+# Transforms
+# ---------------------------------------------------------
+
+def matrix_multiply(m1, m2):
+    a1, c1, e1, b1, d1, f1 = m1
+    a2, c2, e2, b2, d2, f2 = m2
+    return (
+        a1 * a2 + c1 * b2,
+        a1 * c2 + c1 * d2,
+        a1 * e2 + c1 * f2 + e1,
+        b1 * a2 + d1 * b2,
+        b1 * c2 + d1 * d2,
+        b1 * e2 + d1 * f2 + f1,
+    )
+
+
+def _local_transform(name, nums):
+    if name == "translate":
+        tx = nums[0] if len(nums) >= 1 else 0.0
+        ty = nums[1] if len(nums) >= 2 else 0.0
+        return (1.0, 0.0, tx, 0.0, 1.0, ty)
+
+    if name == "scale":
+        sx = nums[0] if len(nums) >= 1 else 1.0
+        sy = nums[1] if len(nums) >= 2 else sx
+        return (sx, 0.0, 0.0, 0.0, sy, 0.0)
+
+    if name == "matrix" and len(nums) >= 6:
+        # SVG: matrix(a, b, c, d, e, f)
+        a, b, c, d, e, f = nums[:6]
+        return (a, c, e, b, d, f)
+
+    if name == "rotate" and nums:
+        ang = math.radians(nums[0])
+        cos_a, sin_a = math.cos(ang), math.sin(ang)
+        rot = (cos_a, -sin_a, 0.0, sin_a, cos_a, 0.0)
+        if len(nums) >= 3:
+            cx, cy = nums[1], nums[2]
+            rot = matrix_multiply(matrix_multiply((1.0, 0.0, cx, 0.0, 1.0, cy), rot), (1.0, 0.0, -cx, 0.0, 1.0, -cy))
+        return rot
+
+    if name == "skewx" and nums:
+        return (1.0, math.tan(math.radians(nums[0])), 0.0, 0.0, 1.0, 0.0)
+
+    if name == "skewy" and nums:
+        return (1.0, 0.0, 0.0, math.tan(math.radians(nums[0])), 1.0, 0.0)
+
+    return IDENTITY
+
+
+@lru_cache(maxsize=4096)
+def parse_transform(transform_str):
+    """Atributo transform → matriz (tupla). Memoizado por string."""
+    current = IDENTITY
+    for name, params in _TRANSFORM_RE.findall(transform_str or ""):
+        nums = [float(n) for n in _NUMBER_RE.findall(params)]
+        current = matrix_multiply(current, _local_transform(name.strip().lower(), nums))
+    return current
+
+
+@lru_cache(maxsize=8192)
+def compose_transform(parent, transform_str):
+    """Matriz del padre x transform local. Memoizado por (padre, string)."""
+    if not transform_str:
+        return parent
+    return matrix_multiply(parent, parse_transform(transform_str))
+
+
+# ---------------------------------------------------------
+# Elementos → polilíneas en coordenadas locales
+# ---------------------------------------------------------
+
+def _attr_float(node, name):
+    return float(node.get(name, "0") or "0")
+
+
+def parse_points(points_attr):
+    nums = [float(n) for n in _NUMBER_RE.findall(points_attr or "")]
+    # Un número suelto al final (points impar) se descarta
+    return list(zip(nums[0::2], nums[1::2], strict=False))
+
+
+def _bezier_steps(dd, tolerance):
+    """Tramos para que la cuerda no se aparte más de tolerance de la curva."""
+    if dd <= 0 or tolerance <= 0:
+        return 1
+    return max(1, min(MAX_CURVE_STEPS, int(math.ceil(math.sqrt(dd / tolerance)))))
+
+
+def _flatten_cubic(pts, x0, y0, x1, y1, x2, y2, x3, y3, tolerance):
+    # |B''| <= 6·max(|p0-2p1+p2|, |p1-2p2+p3|); error de la cuerda <= |B''|/(8n²)
+    dd = max(math.hypot(x0 - 2 * x1 + x2, y0 - 2 * y1 + y2), math.hypot(x1 - 2 * x2 + x3, y1 - 2 * y2 + y3))
+    n = _bezier_steps(0.75 * dd, tolerance)
+    for k in range(1, n):
+        t = k / n
+        mt = 1.0 - t
+        a, b, c, d = mt * mt * mt, 3 * mt * mt * t, 3 * mt * t * t, t * t * t
+        pts.append((a * x0 + b * x1 + c * x2 + d * x3, a * y0 + b * y1 + c * y2 + d * y3))
+    pts.append((x3, y3))
+
+
+def _flatten_quad(pts, x0, y0, x1, y1, x2, y2, tolerance):
+    # B'' = 2·(p0-2p1+p2) constante
+    dd = math.hypot(x0 - 2 * x1 + x2, y0 - 2 * y1 + y2)
+    n = _bezier_steps(0.25 * dd, tolerance)
+    for k in range(1, n):
+        t = k / n
+        mt = 1.0 - t
+        a, b, c = mt * mt, 2 * mt * t, t * t
+        pts.append((a * x0 + b * x1 + c * x2, a * y0 + b * y1 + c * y2))
+    pts.append((x2, y2))
+
+
+def _flatten_arc(pts, x0, y0, rx, ry, phi_deg, large_arc, sweep, x, y, tolerance):
+    """Arco elíptico SVG (parametrización por extremos, SVG 1.1 F.6.5)."""
+    rx, ry = abs(rx), abs(ry)
+    if rx == 0 or ry == 0 or (x0 == x and y0 == y):
+        pts.append((x, y))
+        return
+
+    phi = math.radians(phi_deg % 360.0)
+    cos_p, sin_p = math.cos(phi), math.sin(phi)
+    dx2, dy2 = (x0 - x) * 0.5, (y0 - y) * 0.5
+    x1p = cos_p * dx2 + sin_p * dy2
+    y1p = -sin_p * dx2 + cos_p * dy2
+
+    # Radios demasiado chicos: se agrandan lo justo (F.6.6)
+    lam = (x1p * x1p) / (rx * rx) + (y1p * y1p) / (ry * ry)
+    if lam > 1.0:
+        scale = math.sqrt(lam)
+        rx, ry = rx * scale, ry * scale
+
+    num = rx * rx * ry * ry - rx * rx * y1p * y1p - ry * ry * x1p * x1p
+    den = rx * rx * y1p * y1p + ry * ry * x1p * x1p
+    coef = math.sqrt(max(0.0, num / den)) if den else 0.0
+    if large_arc == sweep:
+        coef = -coef
+    cxp = coef * rx * y1p / ry
+    cyp = -coef * ry * x1p / rx
+    cx = cos_p * cxp - sin_p * cyp + (x0 + x) * 0.5
+    cy = sin_p * cxp + cos_p * cyp + (y0 + y) * 0.5
+
+    theta1 = math.atan2((y1p - cyp) / ry, (x1p - cxp) / rx)
+    theta2 = math.atan2((-y1p - cyp) / ry, (-x1p - cxp) / rx)
+    dtheta = theta2 - theta1
+    if sweep and dtheta < 0:
+        dtheta += 2 * math.pi
+    elif not sweep and dtheta > 0:
+        dtheta -= 2 * math.pi
+
+    r = max(rx, ry)
+    if tolerance > 0 and tolerance < r:
+        step = 2.0 * math.acos(1.0 - tolerance / r)
+        n = max(1, min(MAX_CURVE_STEPS, int(math.ceil(abs(dtheta) / step))))
+    else:
+        n = 1
+
+    for k in range(1, n):
+        t = theta1 + dtheta * k / n
+        ex, ey = rx * math.cos(t), ry * math.sin(t)
+        pts.append((cos_p * ex - sin_p * ey + cx, sin_p * ex + cos_p * ey + cy))
+    pts.append((x, y))
+
+
+def parse_path_d(d, tolerance=PATH_FLATTEN_TOLERANCE):
+    """
+    Atributo d → lista de subpaths [[(x, y), ...], ...] en absolutas.
+    Gramática completa: M/L/H/V/Z, curvas C/S/Q/T y arcos A, absolutos y
+    relativos. Curvas y arcos se aproximan con cuerdas a menos de
+    tolerance (en unidades del path) de la curva real.
+
+    Una sola pasada de regex separa comando + argumentos; los argumentos
+    de cada comando se convierten de una vez (M/L absolutos, lo más común
+    en un die, se agregan sin loop por punto).
+    """
+    d = d or ""
+    if not _NOT_ABS_ML_RE.search(d):
+        # Camino rápido: solo M/L absolutos (export típico de un die)
+        subpaths = []
+        for chunk in d.split("M"):
+            vals = [float(v) for v in _NUMBER_RE.findall(chunk)]
+            count = len(vals) - len(vals) % 2
+            if count >= 4:
+                subpaths.append(list(zip(vals[0:count:2], vals[1:count:2], strict=True)))
+        return subpaths
+
+    subpaths = []
+    pts = []
+    x = y = 0.0
+    start_x = start_y = 0.0
+    # Último punto de control (para S/T) y comando que lo dejó
+    ctrl_x = ctrl_y = 0.0
+    prev_up = None
+
+    for cmd, raw_args in _PATH_CMD_RE.findall(d):
+        up = cmd.upper()
+
+        if up == "Z":
+            if pts:
+                if pts[0] != pts[-1]:
+                    pts.append(pts[0])
+                subpaths.append(pts)
+                pts = []
+            x, y = start_x, start_y
+            prev_up = "Z"
+            continue
+
+        if up == "A":
+            args = [float(v) for group in _ARC_ARGS_RE.findall(raw_args) for v in group]
+        else:
+            args = [float(v) for v in _NUMBER_RE.findall(raw_args)]
+        arity = _PATH_ARITY[up]
+        count = len(args) - len(args) % arity
+        if not count:
+            continue
+        rel = cmd.islower()
+
+        if up == "M":
+            if len(pts) >= 2:
+                subpaths.append(pts)
+            x, y = (x + args[0], y + args[1]) if rel else (args[0], args[1])
+            start_x, start_y = x, y
+            pts = [(x, y)]
+            # Pares extra después de M son L implícitos
+            args = args[2:count]
+            count -= 2
+            up = "L"
+            if not count:
+                prev_up = "M"
+                continue
+        elif not pts:
+            # Dibujo tras Z sin M: arranca en el punto actual
+            pts = [(x, y)]
+
+        if up == "L":
+            if rel:
+                for k in range(0, count, 2):
+                    x += args[k]
+                    y += args[k + 1]
+                    pts.append((x, y))
+            else:
+                pts.extend(zip(args[0:count:2], args[1:count:2], strict=True))
+                x, y = pts[-1]
+        elif up == "H":
+            for v in args:
+                x = x + v if rel else v
+                pts.append((x, y))
+        elif up == "V":
+            for v in args:
+                y = y + v if rel else v
+                pts.append((x, y))
+        else:
+            for k in range(0, count, arity):
+                a = args[k : k + arity]
+                if rel:
+                    # Todos los pares (x, y) relativos al punto actual (no en A)
+                    if up == "A":
+                        a[5] += x
+                        a[6] += y
+                    else:
+                        a = [v + (x if j % 2 == 0 else y) for j, v in enumerate(a)]
+
+                if up == "C":
+                    ctrl_x, ctrl_y = a[2], a[3]
+                    _flatten_cubic(pts, x, y, a[0], a[1], a[2], a[3], a[4], a[5], tolerance)
+                elif up == "S":
+                    if prev_up in ("C", "S"):
+                        x1, y1 = 2 * x - ctrl_x, 2 * y - ctrl_y
+                    else:
+                        x1, y1 = x, y
+                    ctrl_x, ctrl_y = a[0], a[1]
+                    _flatten_cubic(pts, x, y, x1, y1, a[0], a[1], a[2], a[3], tolerance)
+                elif up == "Q":
+                    ctrl_x, ctrl_y = a[0], a[1]
+                    _flatten_quad(pts, x, y, a[0], a[1], a[2], a[3], tolerance)
+                elif up == "T":
+                    if prev_up in ("Q", "T"):
+                        ctrl_x, ctrl_y = 2 * x - ctrl_x, 2 * y - ctrl_y
+                    else:
+                        ctrl_x, ctrl_y = x, y
+                    _flatten_quad(pts, x, y, ctrl_x, ctrl_y, a[0], a[1], tolerance)
+                else:
+                    _flatten_arc(pts, x, y, a[0], a[1], a[2], a[3] != 0, a[4] != 0, a[5], a[6], tolerance)
+                x, y = pts[-1]
+                prev_up = up
+            continue
+        prev_up = up
+
+    if len(pts) >= 2:
+        subpaths.append(pts)
+    return subpaths
+
+
+def element_polylines(node, tag, tolerance=PATH_FLATTEN_TOLERANCE):
+    """
+    Polilíneas locales de un elemento soportado (lista de listas de puntos).
+    node: Element o dict de atributos.
+    """
+    if tag == "line":
+        try:
+            p1 = (_attr_float(node, "x1"), _attr_float(node, "y1"))
+            p2 = (_attr_float(node, "x2"), _attr_float(node, "y2"))
+        except Exception:
+            p1 = p2 = (0.0, 0.0)
+        return [[p1, p2]]
+
+    if tag == "rect":
+        try:
+            x, y = _attr_float(node, "x"), _attr_float(node, "y")
+            w, h = _attr_float(node, "width"), _attr_float(node, "height")
+        except Exception:
+            return []
+        if w <= 0 or h <= 0:
+            return []
+        return [[(x, y), (x + w, y), (x + w, y + h), (x, y + h), (x, y)]]
+
+    if tag in ("polyline", "polygon"):
+        pts = parse_points(node.get("points"))
+        if tag == "polygon" and len(pts) >= 3 and pts[0] != pts[-1]:
+            pts.append(pts[0])
+        return [pts] if len(pts) >= 2 else []
+
+    if tag == "path":
+        return parse_path_d(node.get("d"), tolerance)
+
+    return []
+
+
+# ---------------------------------------------------------
+# Segmentos en bloque
+# ---------------------------------------------------------
+
+class SegmentArrays:
+    """Segmentos ya transformados: arrays paralelos x1, y1, x2, y2, length, kind."""
+
+    def __init__(self, x1, y1, x2, y2, kind):
+        self.x1 = x1
+        self.y1 = y1
+        self.x2 = x2
+        self.y2 = y2
+        self.kind = kind
+        self.length = np.hypot(x2 - x1, y2 - y1)
+
+    def __len__(self):
+        return int(self.x1.shape[0])
+
+    def bounds(self):
+        """(min_x, min_y, max_x, max_y) o None si no hay segmentos."""
+        if not len(self):
+            return None
+        return (
+            float(min(self.x1.min(), self.x2.min())),
+            float(min(self.y1.min(), self.y2.min())),
+            float(max(self.x1.max(), self.x2.max())),
+            float(max(self.y1.max(), self.y2.max())),
+        )
+
+
+class SegmentCollector:
+    """
+    Acumula coordenadas crudas por matriz y las transforma al final,
+    un producto vectorizado por matriz distinta.
+    """
+
+    def __init__(self):
+        self.groups = {}
+
+    def add_segment(self, matrix, coords, kind=0):
+        group = self.groups.get(matrix)
+        if group is None:
+            group = self.groups[matrix] = ([], [])
+        group[0].append(coords)
+        group[1].append(kind)
+
+    def add_polyline(self, matrix, pts, kind=0):
+        if len(pts) < 2:
+            return
+        group = self.groups.get(matrix)
+        if group is None:
+            group = self.groups[matrix] = ([], [])
+        coords, kinds = group
+        prev = pts[0]
+        for pt in pts[1:]:
+            coords.append((prev[0], prev[1], pt[0], pt[1]))
+            prev = pt
+        kinds.extend([kind] * (len(pts) - 1))
+
+    def arrays(self):
+        parts = []
+        kinds = []
+        for (a, c, e, b, d, f), (coords, group_kinds) in self.groups.items():
+            raw = np.asarray(coords, dtype=np.float64)
+            out = np.empty_like(raw)
+            out[:, 0] = a * raw[:, 0] + c * raw[:, 1] + e
+            out[:, 1] = b * raw[:, 0] + d * raw[:, 1] + f
+            out[:, 2] = a * raw[:, 2] + c * raw[:, 3] + e
+            out[:, 3] = b * raw[:, 2] + d * raw[:, 3] + f
+            parts.append(out)
+            kinds.append(np.asarray(group_kinds, dtype=np.int8))
+
+        if parts:
+            allc = np.concatenate(parts)
+            allk = np.concatenate(kinds)
+        else:
+            allc = np.zeros((0, 4), dtype=np.float64)
+            allk = np.zeros(0, dtype=np.int8)
+        return SegmentArrays(allc[:, 0], allc[:, 1], allc[:, 2], allc[:, 3], allk)
+
+
+class PolylineArrays:
+    """
+    Polilíneas transformadas en formato compacto: coords (N x 2, float64)
+    con todos los puntos seguidos y offsets (M + 1): la polilínea i es
+    coords[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, coords, offsets, kind=None):
+        self.coords = coords
+        self.offsets = offsets
+        self.kind = kind if kind is not None else np.zeros(len(offsets) - 1, dtype=np.int8)
+
+    def __len__(self):
+        return int(self.offsets.shape[0] - 1)
+
+    def __getitem__(self, i):
+        return self.coords[self.offsets[i] : self.offsets[i + 1]]
+
+    def __iter__(self):
+        coords, offsets = self.coords, self.offsets
+        for i in range(len(self)):
+            yield coords[offsets[i] : offsets[i + 1]]
+
+    def bounds(self):
+        """(min_x, min_y, max_x, max_y) o None si no hay puntos."""
+        if not self.coords.shape[0]:
+            return None
+        mn = self.coords.min(axis=0)
+        mx = self.coords.max(axis=0)
+        return float(mn[0]), float(mn[1]), float(mx[0]), float(mx[1])
+
+
+class PolylineCollector:
+    """Como SegmentCollector pero conserva las polilíneas enteras."""
+
+    def __init__(self):
+        self.groups = {}
+
+    def add_polyline(self, matrix, pts, kind=0):
+        if len(pts) < 2:
+            return
+        group = self.groups.get(matrix)
+        if group is None:
+            group = self.groups[matrix] = ([], [], [])
+        group[0].extend(pts)
+        group[1].append(len(pts))
+        group[2].append(kind)
+
+    def arrays(self):
+        parts = []
+        lengths = []
+        kinds = []
+        for (a, c, e, b, d, f), (pts, group_lengths, group_kinds) in self.groups.items():
+            raw = np.asarray(pts, dtype=np.float64)
+            out = np.empty_like(raw)
+            out[:, 0] = a * raw[:, 0] + c * raw[:, 1] + e
+            out[:, 1] = b * raw[:, 0] + d * raw[:, 1] + f
+            parts.append(out)
+            lengths.extend(group_lengths)
+            kinds.extend(group_kinds)
+
+        coords = np.concatenate(parts) if parts else np.zeros((0, 2), dtype=np.float64)
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        if lengths:
+            np.cumsum(lengths, out=offsets[1:])
+        return PolylineArrays(coords, offsets, np.asarray(kinds, dtype=np.int8))
+
+
+def local_tag(node):
+    tag = node.tag
+    if "}" in tag:
+        tag = tag.split("}", 1)[1]
+    return tag
+
+
+def _open_source(source):
+    """str / bytes / file-like → file-like para leer por bloques."""
+    if isinstance(source, str):
+        return io.StringIO(source)
+    if isinstance(source, bytes | bytearray):
+        return io.BytesIO(source)
+    return source
+
+
+class _SegmentTarget:
+    """
+    Target de XMLParser: recibe start/end directamente de expat, sin armar
+    Elements. Mantiene la pila de matrices y vuelca coordenadas crudas al
+    SegmentCollector.
+    """
+
+    def __init__(self, tags, classify, tolerance=PATH_FLATTEN_TOLERANCE):
+        self.tags = tags
+        self.classify = classify
+        self.tolerance = tolerance
+        self.collector = SegmentCollector()
+        self.root_attrib = None
+        self.matrices = [IDENTITY]
+
+    def start(self, tag, attrib):
+        if "}" in tag:
+            tag = tag.split("}", 1)[1]
+
+        get = attrib.get
+        matrices = self.matrices
+        transform_str = get("transform")
+        matrix = compose_transform(matrices[-1], transform_str) if transform_str else matrices[-1]
+        matrices.append(matrix)
+
+        if self.root_attrib is None:
+            self.root_attrib = dict(attrib)
+
+        if tag not in self.tags:
+            return
+
+        kind = self.classify(attrib) if self.classify else 0
+        if tag == "line":
+            # Camino rápido: un segmento, sin listas intermedias
+            try:
+                coords = (
+                    float(get("x1", "0") or "0"),
+                    float(get("y1", "0") or "0"),
+                    float(get("x2", "0") or "0"),
+                    float(get("y2", "0") or "0"),
+                )
+            except Exception:
+                coords = (0.0, 0.0, 0.0, 0.0)
+            self.collector.add_segment(matrix, coords, kind)
+            return
+
+        for pts in element_polylines(attrib, tag, self.tolerance):
+            self.collector.add_polyline(matrix, pts, kind)
+
+    def end(self, tag):
+        self.matrices.pop()
+
+    def close(self):
+        return self.root_attrib or {}, self.collector.arrays()
+
+
+class _PolylineTarget(_SegmentTarget):
+    """Mismo recorrido que _SegmentTarget, juntando polilíneas enteras."""
+
+    def __init__(self, tags, classify, tolerance=PATH_FLATTEN_TOLERANCE):
+        super().__init__(tags, classify, tolerance)
+        self.collector = PolylineCollector()
+
+    def start(self, tag, attrib):
+        if "}" in tag:
+            tag = tag.split("}", 1)[1]
+
+        matrices = self.matrices
+        transform_str = attrib.get("transform")
+        matrix = compose_transform(matrices[-1], transform_str) if transform_str else matrices[-1]
+        matrices.append(matrix)
+
+        if self.root_attrib is None:
+            self.root_attrib = dict(attrib)
+
+        if tag not in self.tags:
+            return
+
+        kind = self.classify(attrib) if self.classify else 0
+        for pts in element_polylines(attrib, tag, self.tolerance):
+            self.collector.add_polyline(matrix, pts, kind)
+
+
+def _parse_stream(target, source, chunk_size):
+    parser = ET.XMLParser(target=target)
+    stream = _open_source(source)
+
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        parser.feed(chunk)
+
+    return parser.close()
+
+
+def extract_svg_segments(source, tags=SEGMENT_TAGS, classify=None, chunk_size=64 * 1024,
+                         tolerance=PATH_FLATTEN_TOLERANCE):
+    """
+    Recorre el SVG en streaming y devuelve (root_attrib, SegmentArrays).
+    - source: str, bytes o file-like (se lee por bloques de chunk_size)
+    - classify(attrib) → entero de tipo por elemento (default 0)
+    - tolerance: desvío máximo al aplanar curvas y arcos de <path>
+    No se construye el árbol: memoria acotada y sin recursión.
+    """
+    return _parse_stream(_SegmentTarget(tags, classify, tolerance), source, chunk_size)
+
+
+def extract_svg_polylines(source, tags=SEGMENT_TAGS, classify=None, chunk_size=64 * 1024,
+                          tolerance=PATH_FLATTEN_TOLERANCE):
+    """
+    Igual que extract_svg_segments pero devuelve (root_attrib, PolylineArrays):
+    cada <path> (por subpath), <polyline>, <polygon>, <rect> o <line> como
+    una polilínea con los transforms ya aplicados.
+    """
+    return _parse_stream(_PolylineTarget(tags, classify, tolerance), source, chunk_size)
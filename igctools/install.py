@@ -0,0 +1,100 @@
+# apps/igctools/igctools/install.py
+import frappe
+from frappe.custom.doctype.custom_field.custom_field import create_custom_fields
+
+
+def get_custom_fields():
+    """Custom fields que igctools agrega a doctypes de otras apps."""
+    return {
+        "Troquel": [
+            {
+                "fieldname": "igc_die_features_section",
+                "fieldtype": "Section Break",
+                "label": "Features de Troquel (IGCTools)",
+                "collapsible": 1,
+                "insert_after": "svg_plano_mecanico_individual",
+            },
+            {
+                "fieldname": "igc_die_width",
+                "fieldtype": "Float",
+                "search_index": 1,
+                "label": "Ancho Die (mm)",
+                "read_only": 1,
+                "no_copy": 1,
+                "insert_after": "igc_die_features_section",
+            },
+            {
+                "fieldname": "igc_die_height",
+                "fieldtype": "Float",
+                "search_index": 1,
+                "label": "Alto Die (mm)",
+                "read_only": 1,
+                "no_copy": 1,
+                "insert_after": "igc_die_width",
+            },
+            {
+                "fieldname": "igc_die_features_version",
+                "fieldtype": "Int",
+                "label": "Versión Features",
+                "read_only": 1,
+                "no_copy": 1,
+                "insert_after": "igc_die_height",
+            },
+            {
+                "fieldname": "igc_die_signature",
+                "fieldtype": "Small Text",
+                "label": "Firma Paneles (dx/dy)",
+                "read_only": 1,
+                "no_copy": 1,
+                "insert_after": "igc_die_features_version",
+            },
+            {
+                "fieldname": "igc_tetebeche_step_y",
+                "fieldtype": "Float",
+                "label": "Pitch Tête-bêche (mm, sin gap)",
+                "read_only": 1,
+                "no_copy": 1,
+                "insert_after": "igc_die_signature",
+            },
+            {
+                "fieldname": "igc_grid_step_y",
+                "fieldtype": "Float",
+                "label": "Pitch Grid (mm, sin gap)",
+                "read_only": 1,
+                "no_copy": 1,
+                "insert_after": "igc_tetebeche_step_y",
+            },
+            {
+                "fieldname": "igc_pitch_error",
+                "fieldtype": "Float",
+                "label": "Error Pitch (mm)",
+                "read_only": 1,
+                "no_copy": 1,
+                "insert_after": "igc_grid_step_y",
+            },
+            {
+                "fieldname": "igc_pitch_hash",
+                "fieldtype": "Data",
+                "label": "Hash Geometría Pitch",
+                "read_only": 1,
+                "no_copy": 1,
+                "insert_after": "igc_pitch_error",
+            },
+            {
+                "fieldname": "igc_pitch_status",
+                "fieldtype": "Select",
+                "options": "\nPendiente\nCalculado\nFallido",
+                "label": "Estado Pitch",
+                "read_only": 1,
+                "no_copy": 1,
+                "insert_after": "igc_pitch_hash",
+            },
+        ]
+    }
+
+
+def after_migrate():
+    # Troquel vive en otra app / como doctype custom: si no existe, no hacemos nada
+    if not frappe.db.exists("DocType", "Troquel"):
+        return
+    create_custom_fields(get_custom_fields(), update=True)
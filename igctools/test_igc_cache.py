@@ -0,0 +1,98 @@
+# Copyright (c) 2025, Ezequiel Sierra and Contributors
+# See license.txt
+
+import threading
+import time
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from igctools import igc_cache
+from igctools.igc_cache import cache_clear, cache_set, single_flight
+from igctools.tests.utils import frappe_sandbox
+
+
+class TestSingleFlight(FrappeTestCase):
+    namespace = "test_single_flight"
+
+    def setUp(self):
+        cache_clear(self.namespace)
+        for key in ("once", "wait"):
+            igc_cache._raw_redis().delete(igc_cache._lock_key(self.namespace, key))
+
+    def test_computes_once_then_serves_cache(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {"v": 1}
+
+        self.assertEqual(single_flight(self.namespace, "once", compute), ({"v": 1}, "computed"))
+        self.assertEqual(single_flight(self.namespace, "once", compute), ({"v": 1}, "cache"))
+        self.assertEqual(len(calls), 1)
+        self.assertFalse(igc_cache._raw_redis().exists(igc_cache._lock_key(self.namespace, "once")))
+
+    def test_waits_for_the_lock_owner(self):
+        lock_key = igc_cache._lock_key(self.namespace, "wait")
+        igc_cache._raw_redis().set(lock_key, "otro-worker", nx=True, ex=60)
+
+        # Mientras esperamos, el dueño del lock publica el resultado
+        def owner_finishes(_sec):
+            cache_set(self.namespace, "wait", {"v": "compartido"})
+
+        with patch.object(igc_cache.time, "sleep", owner_finishes):
+            value, origin = single_flight(self.namespace, "wait", lambda: self.fail("no debía calcular"))
+
+        self.assertEqual((value, origin), ({"v": "compartido"}, "coalesced"))
+        self.assertGreaterEqual(igc_cache.single_flight_stats()[self.namespace]["duplicates_avoided"], 1)
+        # El lock ajeno no se toca al terminar
+        self.assertTrue(igc_cache._raw_redis().exists(lock_key))
+
+    def test_waiter_reads_past_the_request_memo(self):
+        # RedisWrapper memoriza en frappe.local.cache también los misses: el
+        # que espera tiene que seguir leyendo Redis para ver al dueño del lock
+        with frappe_sandbox():
+            lock_key = igc_cache._lock_key(self.namespace, "memo")
+            igc_cache._raw_redis().set(lock_key, "otro-worker", nx=True, ex=60)
+            frappe.cache.get_value(igc_cache._entry_key(self.namespace, "memo"))
+
+            def owner_finishes(_sec):
+                # Escribe otro worker: el memo de este request no se entera
+                frappe.cache[igc_cache._entry_key(self.namespace, "memo")] = ({"v": "compartido"}, None)
+
+            with patch.object(igc_cache.time, "sleep", owner_finishes):
+                result = single_flight(self.namespace, "memo", lambda: self.fail("no debía calcular"), wait_sec=1)
+
+        self.assertEqual(result, ({"v": "compartido"}, "coalesced"))
+
+    def test_concurrent_callers_compute_once(self):
+        started = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return {"v": "único"}
+
+        results = []
+
+        def caller():
+            results.append(single_flight(self.namespace, "race", compute))
+
+        with frappe_sandbox(), patch.object(igc_cache, "SINGLE_FLIGHT_POLL_SEC", 0.01):
+            owner = threading.Thread(target=caller)
+            owner.start()
+            self.assertTrue(started.wait(5))
+            waiter = threading.Thread(target=caller)
+            waiter.start()
+            owner.join()
+            waiter.join()
+            stats = igc_cache.single_flight_stats()[self.namespace]
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(origin for _value, origin in results), ["coalesced", "computed"])
+        self.assertEqual({r[0]["v"] for r in results}, {"único"})
+        self.assertEqual(stats["coalesced"], 1)
+        self.assertEqual(stats["computed"], 1)
@@ -0,0 +1,25 @@
+# Copyright (c) 2025, Ezequiel Sierra and Contributors
+# See license.txt
+
+from frappe.tests.utils import FrappeTestCase
+from shapely.geometry import MultiPolygon, box
+
+from igctools.igc_collision import CollisionEngine
+
+
+class TestCollisionEngine(FrappeTestCase):
+    def test_probes_translate_without_touching_the_solids(self):
+        static = MultiPolygon([box(0, 0, 10, 10), box(20, 0, 30, 10)])
+        engine = CollisionEngine(static, box(0, 0, 5, 5), clearance_mm=0.5)
+
+        self.assertTrue(engine.collides(2.0, 2.0))
+        self.assertFalse(engine.collides(12.0, 0.0))
+        self.assertTrue(engine.collides(21.0, 0.0))
+        # Roce menor que dos holguras: no cuenta
+        self.assertFalse(engine.collides(10.0 - 0.9, 0.0))
+        self.assertFalse(engine.collides(0.0, 100.0))
+
+        self.assertEqual(engine.moving.bounds, (0.5, 0.5, 4.5, 4.5))
+        stats = engine.stats()
+        self.assertEqual(stats["probes"], 5)
+        self.assertEqual(stats["hits"], 2)
@@ -0,0 +1,108 @@
+# Copyright (c) 2025, Ezequiel Sierra and Contributors
+# See license.txt
+
+import random
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from igctools.api import die_duplicates
+from igctools.igc_die_duplicates import find_duplicate_clusters
+from igctools.igc_die_matcher import compare_die_features
+from igctools.test_igc_die_search import DieCatalogTestCase
+from igctools.test_igc_die_vectorized import _random_features
+
+
+def _pairwise_clusters(entries, tol):
+    """Referencia O(n²): todos contra todos y componentes conexas."""
+    pairs = set()
+    neighbours = {i: set() for i in range(len(entries))}
+    for i in range(len(entries)):
+        for j in range(i + 1, len(entries)):
+            _cmp_res, ok = compare_die_features(entries[i][1], entries[j][1], tol)
+            if ok:
+                pairs.add((i, j))
+                neighbours[i].add(j)
+                neighbours[j].add(i)
+
+    clusters, seen = set(), set()
+    for start in range(len(entries)):
+        if start in seen or not neighbours[start]:
+            continue
+        stack, members = [start], set()
+        while stack:
+            i = stack.pop()
+            if i not in members:
+                members.add(i)
+                stack.extend(neighbours[i] - members)
+        seen |= members
+        clusters.add(tuple(entries[m][0] for m in sorted(members)))
+    return pairs, clusters
+
+
+def _variant(rnd, base, tol):
+    """Copia de base con ruido del orden de tol: unas pasan, otras no."""
+    w, h = base["width"], base["height"]
+    if rnd.random() < 0.3:
+        w, h = h, w
+    dx_list = list(base["dx_list"])
+    if dx_list and rnd.random() < 0.2:
+        dx_list.pop()
+    return {
+        "width": w + rnd.uniform(-1.5 * tol, 1.5 * tol),
+        "height": h + rnd.uniform(-1.5 * tol, 1.5 * tol),
+        "dx_list": [d + rnd.uniform(-0.02, 0.02) for d in dx_list],
+        "dy_list": [d + rnd.uniform(-0.02, 0.02) for d in base["dy_list"]],
+    }
+
+
+class TestDuplicateClusters(FrappeTestCase):
+    def test_same_pairs_and_clusters_as_pairwise_scan(self):
+        rnd = random.Random(11)
+        for tol in (0.5, 1.0, 4.0):
+            # Grupos de variantes alrededor de unos pocos dies base, más ruido
+            entries = []
+            for _ in range(12):
+                base = _random_features(rnd)
+                base["width"] = base["width"] or 120.0
+                entries.append(base)
+                entries.extend(_variant(rnd, base, tol) for _ in range(rnd.randint(1, 25)))
+            rnd.shuffle(entries)
+            entries = [(f"T{i:05d}", feats) for i, feats in enumerate(entries)]
+
+            clusters, stats = find_duplicate_clusters(entries, tol)
+            expected_pairs, expected_clusters = _pairwise_clusters(entries, tol)
+            names = {name: i for i, (name, _feats) in enumerate(entries)}
+
+            found_pairs = {
+                (names[p["troquel_a"]], names[p["troquel_b"]]) for c in clusters for p in c["pairs"]
+            }
+            self.assertEqual(found_pairs, expected_pairs)
+            self.assertEqual({tuple(c["troqueles"]) for c in clusters}, expected_clusters)
+            self.assertEqual(stats["duplicate_pairs"], len(expected_pairs))
+            # El bucketing evita comparar todos contra todos
+            self.assertLess(stats["comparisons"], len(entries) * (len(entries) - 1) // 2)
+
+    def test_dies_without_dimensions_are_counted_as_skipped(self):
+        feats = {"width": 100.0, "height": 50.0, "dx_list": [0.5], "dy_list": [0.5]}
+        unreadable = {"width": None, "height": None, "dx_list": [], "dy_list": []}
+        entries = [("T-1", feats), ("T-2", dict(feats)), ("T-3", unreadable)]
+
+        clusters, stats = find_duplicate_clusters(entries, 1.0)
+
+        self.assertEqual([c["troqueles"] for c in clusters], [["T-1", "T-2"]])
+        self.assertEqual((stats["dies"], stats["skipped"]), (3, 1))
+
+
+class TestDuplicatesReport(DieCatalogTestCase):
+    def test_stale_dies_are_analyzed_and_reported(self):
+        # Un duplicado exacto de TRQ-0003 todavía sin features guardadas
+        twin = dict(self.catalog.rows["TRQ-0003"], name="TWIN", igc_die_features_version=0, igc_die_signature=None)
+        self.catalog.rows["TWIN"] = twin
+
+        with patch("igctools.api.die_features.enqueue_die_reindex"):
+            report = die_duplicates._duplicates_job(tolerance_mm=0.5)
+
+        self.assertIn(["TRQ-0003", "TWIN"], [c["troqueles"] for c in report["clusters"]])
+        self.assertEqual(report["stats"]["dies"], len(self.catalog.rows))
+        self.assertEqual(report["stats"]["analyzed_on_the_fly"], 1)
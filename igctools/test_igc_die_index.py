@@ -0,0 +1,82 @@
+# Copyright (c) 2025, Ezequiel Sierra and Contributors
+# See license.txt
+
+import random
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from igctools import igc_die_index
+from igctools import igc_die_matcher as matcher
+from igctools.igc_die_index import DieDimensionIndex
+from igctools.igc_die_matcher import (
+    DIE_FEATURES_VERSION,
+    _die_features_to_values,
+    _stored_die_features,
+    compare_die_features,
+    find_similar_dies_from_svg,
+)
+from igctools.test_igc_die_search import DieCatalogTestCase
+from igctools.test_igc_die_vectorized import _random_features
+from igctools.tests.utils import frappe_sandbox
+
+
+def _brute_force_top_k(entries, cliente, tol, k):
+    found = []
+    for idx, (name, troq) in enumerate(entries):
+        cmp_res, ok = compare_die_features(cliente, troq, tol)
+        if ok:
+            found.append((cmp_res["total_score"], idx, name))
+    found.sort()
+    return [(name, score) for score, _idx, name in found[:k]]
+
+
+class TestDieDimensionIndex(FrappeTestCase):
+    def test_top_k_matches_brute_force(self):
+        rnd = random.Random(3)
+        # 60 troqueles recorren el branch-and-bound; 1500 la versión NumPy
+        for n in (60, 1500):
+            for _ in range(10):
+                cliente = _random_features(rnd)
+                cliente["width"] = cliente["width"] or 200.0
+                entries = [(f"T{i:05d}", _random_features(rnd, cliente)) for i in range(n)]
+                index = DieDimensionIndex(entries)
+
+                for tol, k in ((0.5, 5), (3.0, 10), (10.0, 50)):
+                    self.assertEqual(
+                        [(name, cmp_res["total_score"]) for name, _feats, cmp_res in index.top_k(cliente, tol, k)],
+                        _brute_force_top_k(entries, cliente, tol, k),
+                    )
+
+    def test_stale_rows_are_analyzed_and_reindexed(self):
+        fresh = {"width": 100.0, "height": 200.0, "dx_list": [0.25], "dy_list": [0.5]}
+        stale = {"width": 120.0, "height": 80.0, "dx_list": [], "dy_list": []}
+        rows = [
+            {"name": "T-1", "svg_plano_mecanico_individual": "<svg/>", **_die_features_to_values(fresh)},
+            {"name": "T-2", "svg_plano_mecanico_individual": "<svg/>", "igc_die_features_version": 0},
+        ]
+        with frappe_sandbox(rows), \
+                patch("igctools.api.die_features.enqueue_die_reindex") as enqueue, \
+                patch.object(igc_die_index, "_analyze_troquel_svg", return_value=stale) as analyze:
+            entries = igc_die_index._load_die_index_entries()
+
+        self.assertEqual(entries, [("T-1", _stored_die_features(rows[0])), ("T-2", stale)])
+        analyze.assert_called_once_with("T-2")
+        enqueue.assert_called_once_with()
+
+
+class TestDieIndexSearch(DieCatalogTestCase):
+    def test_default_index_path_keeps_stale_rows(self):
+        row = self.catalog.rows["TRQ-0003"]
+        row.update(igc_die_features_version=DIE_FEATURES_VERSION - 1, igc_die_signature=None)
+
+        self.assertTrue(matcher.USE_DIE_INDEX)
+        with patch("igctools.api.die_features.enqueue_die_reindex") as enqueue, \
+                patch.object(igc_die_index, "_analyze_troquel_svg", wraps=matcher._analyze_troquel_svg) as analyze:
+            results = find_similar_dies_from_svg(self.svg(3), 3.0, 5)
+
+        # Hasta que corra el reindex, el troquel se analiza al armar el índice
+        analyze.assert_called_once_with("TRQ-0003")
+        enqueue.assert_called_once_with()
+        self.assertEqual(results[0]["name"], "TRQ-0003")
+        self.assertAlmostEqual(results[0]["score"], 0.0, places=4)
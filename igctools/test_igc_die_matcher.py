@@ -0,0 +1,97 @@
+# Copyright (c) 2025, Ezequiel Sierra and Contributors
+# See license.txt
+
+import io
+import xml.etree.ElementTree as ET
+
+from frappe.tests.utils import FrappeTestCase
+
+from igctools.benchmarks.legacy_svg import die_matcher_compute_signature, die_matcher_extract_segments
+from igctools.igc_die_matcher import (
+    SEGMENT_CREASE,
+    _parse_svg_bbox_from_root,
+    _segment_kind,
+    analyze_die_svg,
+)
+from igctools.igc_geometry import extract_svg_segments, parse_transform
+
+DIE_SVG = """<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg" width="120mm" height="80mm" viewBox="0 0 240 160">
+  <g transform="scale(0.5)">
+    <line x1="0" y1="0" x2="240" y2="0" ev-style="cut"/>
+    <line x1="240" y1="0" x2="240" y2="160" ev-style="cut"/>
+    <g transform="translate(10, 0)">
+      <line x1="50" y1="10" x2="50" y2="150" ev-style="creasing"/>
+      <line x1="110" y1="10" x2="110" y2="150" ev-style="creasing"/>
+      <text x="5" y="5">Cara A</text>
+    </g>
+    <line x1="10" y1="80" x2="230" y2="80" ev-style="Creasing rule"/>
+    <line x1="10" y1="120" x2="230" y2="120" ev-style="creasing"/>
+  </g>
+</svg>"""
+
+
+# Mismo die que DIE_SVG, con el corte como <rect> y los pliegues como <path> / <polyline>
+DIE_SVG_SHAPES = """<svg xmlns="http://www.w3.org/2000/svg" width="120mm" height="80mm" viewBox="0 0 240 160">
+  <g transform="scale(0.5)">
+    <rect x="0" y="0" width="240" height="160" ev-style="cut"/>
+    <g transform="translate(10, 0)">
+      <path d="m50,10 v140" ev-style="creasing"/>
+      <polyline points="110,10 110,150" ev-style="creasing"/>
+    </g>
+    <path d="M10 80 H230 M10,120 L230,120" ev-style="creasing"/>
+  </g>
+</svg>"""
+
+
+class TestIGCDieMatcher(FrappeTestCase):
+    def test_stream_matches_tree_walk(self):
+        root = ET.fromstring(DIE_SVG)
+        root_attrib, segs = extract_svg_segments(DIE_SVG, classify=_segment_kind)
+        segments = die_matcher_extract_segments(root)
+
+        self.assertEqual(_parse_svg_bbox_from_root(root_attrib), _parse_svg_bbox_from_root(root))
+        # Los segmentos salen agrupados por matriz: se comparan ordenados
+        self.assertEqual(
+            sorted(zip(segs.x1.tolist(), segs.y1.tolist(), segs.x2.tolist(), segs.y2.tolist(), (segs.kind == SEGMENT_CREASE).tolist(), strict=True)),
+            sorted((s["x1"], s["y1"], s["x2"], s["y2"], s["type"] == "crease") for s in segments),
+        )
+
+        width, height = _parse_svg_bbox_from_root(root)
+        dx_list, dy_list = die_matcher_compute_signature(segments, width, height)
+        self.assertEqual(analyze_die_svg(DIE_SVG), {"width": width, "height": height, "dx_list": dx_list, "dy_list": dy_list})
+
+    def test_paths_polylines_and_rects(self):
+        self.assertEqual(analyze_die_svg(DIE_SVG_SHAPES), analyze_die_svg(DIE_SVG))
+
+    def test_transform_parsing(self):
+        self.assertEqual(parse_transform("translate(10 -5) scale(2)"), (2.0, 0.0, 10.0, 0.0, 2.0, -5.0))
+        self.assertEqual(parse_transform("matrix(1,0,0,1,3,4)"), (1.0, 0.0, 3.0, 0.0, 1.0, 4.0))
+
+    def test_analyze_accepts_file_like(self):
+        expected = analyze_die_svg(DIE_SVG)
+
+        self.assertEqual(analyze_die_svg(io.BytesIO(DIE_SVG.encode("utf-8"))), expected)
+        self.assertEqual(analyze_die_svg(io.StringIO(DIE_SVG)), expected)
+        self.assertEqual(len(expected["dx_list"]), 1)
+        self.assertEqual(len(expected["dy_list"]), 1)
+
+    def test_deep_nesting_without_recursion(self):
+        depth = 5000
+        svg = (
+            '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 10 10">'
+            + '<g transform="translate(1,0)">' * depth
+            + '<line x1="0" y1="0" x2="0" y2="9" ev-style="creasing"/>'
+            + "</g>" * depth
+            + "</svg>"
+        )
+        _root_attrib, segs = extract_svg_segments(svg)
+
+        self.assertEqual(len(segs), 1)
+        self.assertEqual(segs.x1[0], float(depth))
+
+    def test_invalid_svg_returns_empty_features(self):
+        self.assertEqual(
+            analyze_die_svg("<svg><line></svg>"),
+            {"width": None, "height": None, "dx_list": [], "dy_list": []},
+        )
@@ -0,0 +1,142 @@
+# Copyright (c) 2025, Ezequiel Sierra and Contributors
+# See license.txt
+
+import random
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from igctools import igc_die_matcher as matcher
+from igctools.igc_die_matcher import (
+    _die_features_to_values,
+    _iter_troquel_pages,
+    _rank_by_tolerance_bands,
+    _scan_similar_dies,
+    analyze_die_svg,
+    compare_die_features,
+)
+from igctools.test_igc_die_matcher import DIE_SVG
+from igctools.test_igc_die_vectorized import _random_features
+from igctools.tests.utils import frappe_sandbox
+
+
+def _catalog(rnd, cliente, n=60):
+    """(name, features) alrededor de cliente, con copias exactas para forzar empates."""
+    entries = []
+    for i in range(n):
+        feats = _random_features(rnd, cliente)
+        if entries and rnd.random() < 0.25:
+            feats = dict(rnd.choice(entries)[1])
+        entries.append((f"T{i:05d}", feats))
+    return entries
+
+
+def _banded_reference(candidates, cliente, bands, min_results, max_res):
+    """Una llamada a compare_die_features por banda, sin heaps."""
+    hits = [[(pos, name, troq) for pos, (name, troq) in enumerate(candidates)
+             if compare_die_features(cliente, troq, b)[1]] for b in bands]
+    chosen = next((i for i, h in enumerate(hits) if len(h) >= min_results), len(bands) - 1)
+
+    rows = []
+    for pos, name, troq in hits[chosen]:
+        first = next(i for i, b in enumerate(bands) if compare_die_features(cliente, troq, b)[1])
+        cmp_res, _ok = compare_die_features(cliente, troq, bands[chosen])
+        rows.append((first, cmp_res["total_score"], pos, name, bands[first]))
+    rows.sort()
+    return bands[chosen], [(name, score, band) for _f, score, _p, name, band in rows[:max_res]]
+
+
+def _troquel_rows(entries, stale=0):
+    rows = [
+        {"name": name, "svg_plano_mecanico_individual": "<svg/>", **_die_features_to_values(feats)}
+        for name, feats in entries
+    ]
+    # Sin features vigentes: el scan los analiza al vuelo desde el SVG
+    rows += [
+        {"name": f"Z{i:03d}", "svg_plano_mecanico_individual": DIE_SVG, "igc_die_features_version": 0}
+        for i in range(stale)
+    ]
+    return rows
+
+
+class TestToleranceBands(FrappeTestCase):
+    def test_single_pass_matches_one_compare_per_band(self):
+        rnd = random.Random(5)
+        for _ in range(20):
+            cliente = _random_features(rnd)
+            cliente["width"] = cliente["width"] or 200.0
+            candidates = _catalog(rnd, cliente)
+            bands = matcher._tolerance_bands(1.0, 10.0)
+
+            for min_results, max_res in ((1, 5), (10, 30), (40, 10), (1000, 3), (5, 0)):
+                chosen, ranked = _rank_by_tolerance_bands(candidates, cliente, bands, min_results, max_res)
+                self.assertEqual(
+                    (chosen, [(name, cmp_res["total_score"], band) for name, _t, cmp_res, band in ranked]),
+                    _banded_reference(candidates, cliente, bands, min_results, max_res),
+                )
+
+
+class TestPagedScan(FrappeTestCase):
+    def test_pages_cover_every_row_once(self):
+        for n in (0, 1, 5, 6, 7):
+            rows = [{"name": f"T{i:03d}", "svg_plano_mecanico_individual": "<svg/>"} for i in range(n)]
+            with frappe_sandbox(rows) as (catalog, _cache), \
+                    patch.object(frappe, "get_all", wraps=catalog.get_all) as get_all:
+                names = [r["name"] for r in _iter_troquel_pages([], ["name"], page_size=3)]
+
+            self.assertEqual(names, sorted(r["name"] for r in rows))
+            # Una consulta por página más la que vuelve vacía
+            self.assertEqual(get_all.call_count, n // 3 + 1 + (1 if n % 3 else 0))
+
+    def test_paged_scan_matches_unpaged_scan(self):
+        rnd = random.Random(9)
+        stale_feats = analyze_die_svg(DIE_SVG)
+        for _ in range(10):
+            cliente = dict(stale_feats, width=stale_feats["width"] + rnd.uniform(-2.0, 2.0))
+            entries = _catalog(rnd, cliente, n=80)
+            rows = _troquel_rows(entries, stale=3)
+
+            with frappe_sandbox(rows):
+                with patch.object(matcher, "DIE_SCAN_PAGE_SIZE", 10**9):
+                    unpaged = _scan_similar_dies(cliente, 3.0, 15)
+                for page_size in (1, 2, 7):
+                    with patch.object(matcher, "DIE_SCAN_PAGE_SIZE", page_size):
+                        self.assertEqual(_scan_similar_dies(cliente, 3.0, 15), unpaged)
+
+            # Contra todos contra todos: mismos scores y, salvo empates en
+            # el corte, los mismos troqueles
+            # (las features guardadas van redondeadas: se comparan esas)
+            everything = [(r["name"], matcher._stored_die_features(r) or stale_feats) for r in rows]
+            brute = sorted(
+                (cmp_res["total_score"], name)
+                for name, troq in everything
+                for cmp_res, ok in [compare_die_features(cliente, troq, 3.0)]
+                if ok
+            )[:15]
+            self.assertEqual([cmp_res["total_score"] for _n, _t, cmp_res in unpaged], [s for s, _n in brute])
+            if brute:
+                cut = brute[-1][0]
+                self.assertEqual(
+                    {name for name, _t, cmp_res in unpaged if cmp_res["total_score"] < cut},
+                    {name for score, name in brute if score < cut},
+                )
+
+    def test_banded_scan_matches_separate_scans(self):
+        rnd = random.Random(13)
+        cliente = _random_features(rnd)
+        cliente["width"] = cliente["width"] or 200.0
+        rows = _troquel_rows(_catalog(rnd, cliente, n=80))
+
+        with frappe_sandbox(rows), patch.object(matcher, "DIE_SCAN_PAGE_SIZE", 4):
+            for min_results in (1, 15, 1000):
+                with patch.object(matcher, "USE_DIE_INDEX", False):
+                    banded = matcher._match_similar_dies_banded(cliente, 1.0, 8.0, min_results, 1000)
+
+                per_band = {b: _scan_similar_dies(cliente, b, 1000) for b in banded["bands"]}
+                chosen = next((b for b in banded["bands"] if len(per_band[b]) >= min_results), banded["bands"][-1])
+                self.assertEqual(banded["tolerance_mm"], chosen)
+                self.assertEqual(
+                    sorted((r["name"], r["score"]) for r in banded["results"]),
+                    sorted((name, cmp_res["total_score"]) for name, _t, cmp_res in per_band[chosen]),
+                )
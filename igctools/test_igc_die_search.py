@@ -0,0 +1,332 @@
+# Copyright (c) 2025, Ezequiel Sierra and Contributors
+# See license.txt
+
+import io
+import json
+import os
+import tempfile
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from igctools import igc_die_matcher as matcher
+from igctools.benchmarks.synthetic_dies import die_svg, random_die_specs
+from igctools.igc_die_index import _load_die_index_entries, clear_die_indexes, get_die_index
+from igctools.igc_die_matcher import (
+    DIE_FEATURES_VERSION,
+    _die_features_to_values,
+    _stored_die_features,
+    analyze_die_svg,
+    find_similar_dies_from_svg,
+    update_troquel_die_features,
+)
+from igctools.tests.utils import use_frappe_sandbox
+
+
+def _catalog_rows(n=30, seed=0):
+    """Troqueles sintéticos con sus features ya guardadas."""
+    rows = []
+    for i, (style, length, width, depth) in enumerate(random_die_specs(n, seed=seed)):
+        svg = die_svg(style, length, width, depth, seed=i)
+        rows.append({
+            "name": f"TRQ-{i:04d}",
+            "tipo_producto": "Caja" if i % 2 else "Estuche",
+            "svg_plano_mecanico_individual": svg,
+            **_die_features_to_values(analyze_die_svg(svg)),
+        })
+    return rows
+
+
+class _Doc(dict):
+    """Lo mínimo de un Document para los hooks de Troquel."""
+
+    def __init__(self, new=False, svg_changed=False, **fields):
+        super().__init__(fields)
+        self._new = new
+        self._svg_changed = svg_changed
+
+    def is_new(self):
+        return self._new
+
+    def has_value_changed(self, fieldname):
+        return self._svg_changed and fieldname == "svg_plano_mecanico_individual"
+
+
+class DieCatalogTestCase(FrappeTestCase):
+    """Catálogo de Troqueles, BD y cache en memoria para cada test."""
+
+    def setUp(self):
+        self.rows = _catalog_rows()
+        self.catalog, self.cache = use_frappe_sandbox(self, self.rows)
+
+        # Los índices por worker sobreviven entre tests: arrancar de cero
+        clear_die_indexes()
+        self.addCleanup(clear_die_indexes)
+
+    def svg(self, idx):
+        return self.rows[idx]["svg_plano_mecanico_individual"]
+
+
+class TestStoredDieFeatures(DieCatalogTestCase):
+    def test_matches_against_stored_features_without_parsing_the_catalog(self):
+        for use_index in (True, False):
+            with patch.object(matcher, "USE_DIE_INDEX", use_index), \
+                    patch.object(matcher, "_analyze_troquel_svg", side_effect=AssertionError("no debía analizar")), \
+                    patch.object(matcher, "analyze_die_svg", wraps=analyze_die_svg) as analyze:
+                results = matcher._match_similar_dies(analyze_die_svg(self.svg(3)), 3.0, 5)
+
+            # El catálogo se lee de las features guardadas, sin analizar SVGs
+            self.assertEqual(analyze.call_count, 0)
+            self.assertEqual(results[0]["name"], "TRQ-0003")
+            self.assertAlmostEqual(results[0]["score"], 0.0, places=4)
+
+    def test_stale_row_falls_back_to_its_svg(self):
+        row = self.catalog.rows["TRQ-0003"]
+        row.update(igc_die_features_version=DIE_FEATURES_VERSION - 1, igc_die_signature=None)
+        self.assertIsNone(_stored_die_features(row))
+
+        with patch.object(matcher, "USE_DIE_INDEX", False), \
+                patch.object(matcher, "_analyze_troquel_svg", wraps=matcher._analyze_troquel_svg) as fallback:
+            results = find_similar_dies_from_svg(self.svg(3), 3.0, 5)
+
+        fallback.assert_called_once_with("TRQ-0003")
+        self.assertEqual(results[0]["name"], "TRQ-0003")
+
+    def test_before_save_hook_only_recomputes_when_needed(self):
+        svg = self.svg(0)
+        expected = _die_features_to_values(analyze_die_svg(svg))
+
+        doc = _Doc(new=True, svg_plano_mecanico_individual=svg)
+        update_troquel_die_features(doc)
+        self.assertEqual({k: doc.get(k) for k in expected}, expected)
+
+        # Sin cambios de SVG ni de versión no se vuelve a analizar
+        with patch.object(matcher, "analyze_die_svg", side_effect=AssertionError("no debía analizar")):
+            update_troquel_die_features(_Doc(svg_plano_mecanico_individual=svg, **expected))
+
+        stale = _Doc(svg_plano_mecanico_individual=svg, **dict(expected, igc_die_features_version=0))
+        update_troquel_die_features(stale)
+        self.assertEqual(stale["igc_die_features_version"], DIE_FEATURES_VERSION)
+
+        # Round trip de la firma guardada
+        stored = _stored_die_features(expected)
+        feats = analyze_die_svg(svg)
+        self.assertEqual((stored["width"], stored["height"]), (feats["width"], feats["height"]))
+        for got, want in zip(stored["dx_list"] + stored["dy_list"], feats["dx_list"] + feats["dy_list"], strict=True):
+            self.assertAlmostEqual(got, want, places=matcher.DIE_SIGNATURE_DECIMALS)
+
+
+class TestDimensionPrefilter(DieCatalogTestCase):
+    def test_window_returns_direct_rotated_and_stale_rows_once(self):
+        base = self.catalog.rows["TRQ-0005"]
+        cw, ch = base["igc_die_width"], base["igc_die_height"]
+        self.catalog.rows["ROT"] = dict(base, name="ROT", igc_die_width=ch + 1.0, igc_die_height=cw - 1.0)
+        self.catalog.rows["LEJOS"] = dict(base, name="LEJOS", igc_die_width=cw + 3.5)
+        self.catalog.rows["VIEJO"] = dict(base, name="VIEJO", igc_die_features_version=0)
+
+        with patch.object(frappe, "get_all", wraps=self.catalog.get_all) as get_all:
+            names = [t["name"] for t in matcher._fetch_candidate_troqueles(cw, ch, 3.0)]
+
+        for call in get_all.call_args_list:
+            self.assertNotIn("svg_plano_mecanico_individual", call.kwargs["fields"])
+
+        def in_window(w, h):
+            return abs(w - cw) <= 3.0 and abs(h - ch) <= 3.0
+
+        expected = {
+            name for name, r in self.catalog.rows.items()
+            if r.get("igc_die_features_version") != DIE_FEATURES_VERSION
+            or in_window(r["igc_die_width"], r["igc_die_height"])
+            or in_window(r["igc_die_height"], r["igc_die_width"])
+        }
+        self.assertEqual(len(names), len(set(names)))
+        self.assertEqual(set(names), expected)
+        self.assertTrue({"TRQ-0005", "ROT", "VIEJO"} <= expected)
+        self.assertNotIn("LEJOS", expected)
+
+    def test_tipo_producto_filter(self):
+        base = self.catalog.rows["TRQ-0005"]
+        names = {
+            t["name"] for t in matcher._fetch_candidate_troqueles(
+                base["igc_die_width"], base["igc_die_height"], 500.0, base["tipo_producto"]
+            )
+        }
+        self.assertIn("TRQ-0005", names)
+        self.assertEqual({self.catalog.rows[n]["tipo_producto"] for n in names}, {base["tipo_producto"]})
+
+
+class TestBatchSearch(DieCatalogTestCase):
+    def test_batch_matches_single_calls_in_order(self):
+        items = [
+            {"key": "a", "svg_text": self.svg(3)},
+            {"key": "b", "svg_text": self.svg(7), "tolerance_mm": 5.0, "max_results": 3, "tipo_producto": "Caja"},
+            {"key": "c", "svg_text": self.svg(3), "min_results": 3, "max_tolerance_mm": 10.0},
+            {"key": "vacío"},
+        ]
+        with patch("igctools.igc_die_index._load_die_index_entries", wraps=_load_die_index_entries) as load, \
+                patch.object(matcher, "analyze_die_svg", wraps=analyze_die_svg) as analyze:
+            out = matcher.find_similar_dies_batch(json.dumps(items))
+
+        self.assertEqual([o["key"] for o in out], ["a", "b", "c", "vacío"])
+        # El mismo SVG se analiza una vez por lote y el índice se arma una vez por tipo
+        self.assertEqual(analyze.call_count, 2)
+        self.assertEqual(sorted(str(c.args[0]) for c in load.call_args_list), ["Caja", "None"])
+
+        self.assertEqual(out[0]["results"], find_similar_dies_from_svg(self.svg(3)))
+        self.assertEqual(out[1]["results"], find_similar_dies_from_svg(self.svg(7), 5.0, 3, "Caja"))
+        banded = find_similar_dies_from_svg(self.svg(3), min_results=3, max_tolerance_mm=10.0)
+        self.assertEqual({k: out[2][k] for k in banded}, banded)
+        self.assertEqual(out[3], {"key": "vacío", "results": []})
+
+    def test_batch_honours_the_flag_and_the_result_cache(self):
+        items = [{"key": "a", "svg_text": self.svg(3)}, {"key": "b", "svg_text": self.svg(7), "tolerance_mm": 5.0}]
+        with patch.object(matcher, "USE_DIE_INDEX", False), \
+                patch("igctools.igc_die_index.get_die_index", side_effect=AssertionError("no debía usar el índice")):
+            scanned = matcher.find_similar_dies_batch(items)
+
+        self.assertEqual(scanned[0]["results"], find_similar_dies_from_svg(self.svg(3)))
+
+        # Lo que dejó el lote en cache lo aprovecha la búsqueda individual, y al revés
+        with patch.object(matcher, "_match_similar_dies", side_effect=AssertionError("no debía buscar")):
+            self.assertEqual(find_similar_dies_from_svg(self.svg(7), 5.0), scanned[1]["results"])
+            self.assertEqual(matcher.find_similar_dies_batch(items), scanned)
+
+    def test_failing_item_does_not_break_the_batch(self):
+        with patch.object(frappe, "get_doc", side_effect=Exception("File inexistente"), create=True):
+            out = matcher.find_similar_dies_batch([{"file_name": "nope"}, {"svg_text": self.svg(1)}])
+
+        self.assertEqual(out[0], {"key": 0, "error": "File inexistente"})
+        self.assertEqual(out[1]["results"][0]["name"], "TRQ-0001")
+
+    def test_rejects_oversized_batches(self):
+        with self.assertRaises(Exception):
+            matcher.find_similar_dies_batch([{}] * (matcher.MAX_BATCH_ITEMS + 1))
+        with self.assertRaises(Exception):
+            matcher.find_similar_dies_batch({"svg_text": self.svg(1)})
+
+
+class TestDieMatchCache(DieCatalogTestCase):
+    def test_results_and_client_features_are_cached(self):
+        first = find_similar_dies_from_svg(self.svg(3), 3.0, 5)
+
+        with patch.object(matcher, "analyze_die_svg", side_effect=AssertionError("no debía analizar")), \
+                patch.object(matcher, "_match_similar_dies", wraps=matcher._match_similar_dies) as match:
+            # Mismo SVG con otro espaciado entre tags: misma entrada de cache
+            again = find_similar_dies_from_svg(self.svg(3).replace("><", ">\n  <"), 3.0, 5)
+            self.assertEqual(again, first)
+            match.assert_not_called()
+
+            # Otra tolerancia busca de nuevo, pero con las features ya cacheadas
+            find_similar_dies_from_svg(self.svg(3), 4.0, 5)
+            match.assert_called_once()
+
+    def test_catalog_change_invalidates_results(self):
+        first = find_similar_dies_from_svg(self.svg(3), 3.0, 5)
+        self.assertEqual(first[0]["name"], "TRQ-0003")
+
+        # on_trash del Troquel: sale del catálogo y cambia la versión
+        del self.catalog.rows["TRQ-0003"]
+        matcher.bump_die_catalog_version()
+
+        after = find_similar_dies_from_svg(self.svg(3), 3.0, 5)
+        self.assertNotIn("TRQ-0003", [r["name"] for r in after])
+
+
+class TestShapeSearch(DieCatalogTestCase):
+    def test_finds_the_same_die_at_another_size(self):
+        feats = analyze_die_svg(self.svg(3))
+        scaled = dict(feats, width=feats["width"] * 2, height=feats["height"] * 2)
+        self.catalog.rows["ESCALA"] = {
+            "name": "ESCALA",
+            "tipo_producto": "Caja",
+            "svg_plano_mecanico_individual": "<svg/>",
+            **_die_features_to_values(scaled),
+        }
+
+        shapes = matcher.find_similar_shapes_from_svg(self.svg(3), max_results=5)
+        top = {r["name"]: r for r in shapes[:2]}
+        self.assertEqual(set(top), {"TRQ-0003", "ESCALA"})
+        self.assertAlmostEqual(top["ESCALA"]["shape_score"], 0.0, places=4)
+        self.assertAlmostEqual(top["ESCALA"]["scale_w"], 0.5)
+        self.assertAlmostEqual(top["ESCALA"]["scale_h"], 0.5)
+        self.assertEqual([r["shape_score"] for r in shapes], sorted(r["shape_score"] for r in shapes))
+
+        # La búsqueda dimensional no lo ve: está al doble de tamaño
+        self.assertNotIn("ESCALA", [r["name"] for r in find_similar_dies_from_svg(self.svg(3), 3.0, 30)])
+
+    def test_max_shape_score_and_empty_signature(self):
+        shapes = matcher.find_similar_shapes_from_svg(self.svg(3), max_results=50, max_shape_score=0.05)
+        self.assertTrue(shapes)
+        self.assertTrue(all(r["shape_score"] <= 0.05 for r in shapes))
+
+        # Sin pliegues no hay firma con qué comparar
+        blank = '<svg xmlns="http://www.w3.org/2000/svg" width="100mm" height="50mm"/>'
+        self.assertEqual(matcher.find_similar_shapes_from_svg(blank), [])
+
+
+class _FileDoc:
+    """File de Frappe sobre un archivo en disco (o una URL remota)."""
+
+    def __init__(self, path=None, content_hash=None, file_url="/private/files/cliente.svg", content=None):
+        self.path = path
+        self.content_hash = content_hash
+        self.file_url = file_url
+        self.content = content
+        self.permission_checks = []
+
+    def check_permission(self, ptype):
+        self.permission_checks.append(ptype)
+
+    def get_full_path(self):
+        return self.path
+
+    def get_content(self):
+        return self.content
+
+
+class TestSvgSources(DieCatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "cliente.svg")
+        with open(self.path, "w", encoding="utf-8") as fh:
+            fh.write(self.svg(3))
+        self.expected = find_similar_dies_from_svg(self.svg(3), 3.0, 5)
+
+    def test_file_reference_is_cached_by_content_hash(self):
+        file_doc = _FileDoc(self.path, content_hash="abc123")
+        with patch.object(frappe, "get_doc", return_value=file_doc, create=True) as get_doc:
+            self.assertEqual(find_similar_dies_from_svg(file_name="FILE-1", tolerance_mm=3.0, max_results=5), self.expected)
+            self.assertEqual(file_doc.permission_checks, ["read"])
+
+            # Con el hash ya en cache el archivo no se vuelve a leer
+            os.remove(self.path)
+            self.assertEqual(
+                find_similar_dies_from_svg(file_url=file_doc.file_url, tolerance_mm=3.0, max_results=5), self.expected
+            )
+
+        get_doc.assert_called_with("File", {"file_url": file_doc.file_url})
+
+    def test_file_without_hash_and_remote_file(self):
+        with patch.object(frappe, "get_doc", return_value=_FileDoc(self.path), create=True):
+            self.assertEqual(find_similar_dies_from_svg(file_name="FILE-1", tolerance_mm=3.0, max_results=5), self.expected)
+
+        remote = _FileDoc(file_url="https://example.com/cliente.svg", content=self.svg(3))
+        with patch.object(frappe, "get_doc", return_value=remote, create=True):
+            self.assertEqual(find_similar_dies_from_svg(file_name="FILE-2", tolerance_mm=3.0, max_results=5), self.expected)
+
+    def test_multipart_upload_is_read_from_the_stream(self):
+        def request():
+            upload = SimpleNamespace(stream=io.BytesIO(self.svg(3).encode("utf-8")))
+            return SimpleNamespace(files={"file": upload})
+
+        with patch.object(frappe, "request", request(), create=True):
+            self.assertEqual(find_similar_dies_from_svg(tolerance_mm=3.0, max_results=5), self.expected)
+        with patch.object(frappe, "request", request(), create=True):
+            self.assertEqual(matcher.find_similar_shapes_from_svg(max_results=1)[0]["name"], "TRQ-0003")
+
+        with patch.object(frappe, "request", SimpleNamespace(files={}), create=True):
+            self.assertEqual(find_similar_dies_from_svg(), [])
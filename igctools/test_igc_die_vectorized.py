@@ -0,0 +1,77 @@
+# Copyright (c) 2025, Ezequiel Sierra and Contributors
+# See license.txt
+
+import random
+
+from frappe.tests.utils import FrappeTestCase
+
+from igctools.igc_die_matcher import compare_die_features
+from igctools.igc_die_vectorized import DieFeatureMatrix
+
+
+def _random_features(rnd, base=None):
+    if base is not None and rnd.random() < 0.5:
+        # Variantes cercanas a la base para que haya muchos aciertos
+        w, h = base["width"], base["height"]
+        if rnd.random() < 0.3:
+            w, h = h, w
+        return {
+            "width": w + rnd.uniform(-4.0, 4.0),
+            "height": h + rnd.uniform(-4.0, 4.0),
+            "dx_list": [d + rnd.uniform(-0.05, 0.05) for d in base["dx_list"][: rnd.randint(0, 10)]],
+            "dy_list": [d + rnd.uniform(-0.05, 0.05) for d in base["dy_list"]],
+        }
+
+    width = rnd.uniform(50.0, 600.0)
+    if rnd.random() < 0.05:
+        # Troqueles sin dimensiones: nunca deben pasar
+        width = rnd.choice([None, 0.0])
+
+    return {
+        "width": width,
+        "height": rnd.uniform(50.0, 600.0),
+        "dx_list": [rnd.uniform(0.0, 0.5) for _ in range(rnd.randint(0, 10))],
+        "dy_list": [rnd.uniform(0.0, 0.5) for _ in range(rnd.randint(0, 10))],
+    }
+
+
+class TestIGCDieVectorized(FrappeTestCase):
+    def test_same_results_as_scalar_compare(self):
+        rnd = random.Random(20251016)
+        for _ in range(30):
+            cliente = _random_features(rnd)
+            cliente["width"] = cliente["width"] or 200.0
+            entries = [(f"T{i:05d}", _random_features(rnd, cliente)) for i in range(400)]
+            matrix = DieFeatureMatrix(entries)
+
+            for tol in (None, 0.5, 3.0, 10.0):
+                res = matrix.compare(cliente, tol)
+                for i, (_name, troq) in enumerate(entries):
+                    cmp_res, ok = compare_die_features(cliente, troq, tol)
+                    self.assertEqual(bool(res["ok"][i]), ok)
+                    if not ok:
+                        continue
+                    self.assertEqual(float(res["total_score"][i]), cmp_res["total_score"])
+                    self.assertEqual(float(res["shape_score"][i]), cmp_res["shape_score"])
+                    self.assertEqual(float(res["delta_w"][i]), cmp_res["delta_w"])
+                    self.assertEqual(float(res["delta_h"][i]), cmp_res["delta_h"])
+                    self.assertEqual(bool(res["rotated"][i]), cmp_res["rotated"])
+
+    def test_same_ranking_as_scalar_sort(self):
+        rnd = random.Random(7)
+        cliente = _random_features(rnd)
+        entries = [(f"T{i:05d}", _random_features(rnd, cliente)) for i in range(2000)]
+        matrix = DieFeatureMatrix(entries)
+
+        candidatos = []
+        for name, troq in entries:
+            cmp_res, ok = compare_die_features(cliente, troq, 3.0)
+            if ok:
+                candidatos.append((name, cmp_res["total_score"]))
+        candidatos.sort(key=lambda c: c[1])
+
+        ranked = matrix.top_k(cliente, 3.0, 30)
+        self.assertEqual(
+            [(entries[idx][0], cmp_res["total_score"]) for idx, cmp_res in ranked],
+            candidatos[:30],
+        )
@@ -0,0 +1,60 @@
+# Copyright (c) 2025, Ezequiel Sierra and Contributors
+# See license.txt
+
+import math
+
+from frappe.tests.utils import FrappeTestCase
+
+from igctools.igc_geometry import extract_svg_polylines, parse_path_d
+
+
+class TestIGCGeometry(FrappeTestCase):
+    def test_relative_and_absolute_paths_match(self):
+        absolute = parse_path_d("M10 10 L30 10 L30 40 L10 40 Z")
+        relative = parse_path_d("m10 10 h20 v30 l-20 0 z")
+
+        self.assertEqual(absolute, relative)
+        self.assertEqual(absolute[0][0], absolute[0][-1])
+
+    def test_arcs_are_flattened_within_tolerance(self):
+        # Círculo completo de radio 10 en dos arcos, banderas pegadas
+        pts = parse_path_d("M10,0a10,10 0 1,1 -20,0 a10 10 0 11 20 0", tolerance=0.01)[0]
+
+        self.assertGreater(len(pts), 40)
+        self.assertEqual(pts[-1], (10.0, 0.0))
+        for x, y in pts:
+            self.assertAlmostEqual(math.hypot(x, y), 10.0, places=9)
+
+    def test_smooth_curves_reflect_control_points(self):
+        cubic = parse_path_d("M0 0 C0 10 10 10 10 0 S20 -10 20 0")[0]
+        quad = parse_path_d("M0 0 q5 10 10 0 t10 0")[0]
+
+        self.assertEqual(cubic[-1], (20.0, 0.0))
+        self.assertEqual(quad[-1], (20.0, 0.0))
+        # Simetría: la segunda mitad es la primera reflejada
+        self.assertAlmostEqual(min(y for _x, y in cubic), -max(y for _x, y in cubic))
+        self.assertAlmostEqual(min(y for _x, y in quad), -max(y for _x, y in quad))
+
+    def test_polylines_with_transforms(self):
+        svg = (
+            '<svg xmlns="http://www.w3.org/2000/svg">'
+            '<g transform="translate(100, 0) scale(2)">'
+            '<path d="M0 0 L10 0 M0 5 L10 5"/>'
+            '<polygon points="0,0 1,0 1,1"/>'
+            "</g>"
+            '<line x1="0" y1="0" x2="0" y2="3"/>'
+            "</svg>"
+        )
+        _root_attrib, polylines = extract_svg_polylines(svg)
+
+        self.assertEqual(len(polylines), 4)
+        self.assertEqual(
+            sorted(tuple(map(tuple, p.tolist())) for p in polylines),
+            sorted([
+                ((100.0, 0.0), (120.0, 0.0)),
+                ((100.0, 10.0), (120.0, 10.0)),
+                ((100.0, 0.0), (102.0, 0.0), (102.0, 2.0), (100.0, 0.0)),
+                ((0.0, 0.0), (0.0, 3.0)),
+            ]),
+        )
+        self.assertEqual(polylines.bounds(), (0.0, 0.0, 120.0, 10.0))
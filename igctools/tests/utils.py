@@ -0,0 +1,357 @@
+# apps/igctools/igctools/tests/utils.py
+#
+# Frappe en memoria para los tests (y los benchmarks) de igctools:
+# catálogo de Troqueles, BD y cache sin site, Redis ni MariaDB.
+
+import contextlib
+import json
+import sys
+import threading
+import time
+import types
+from datetime import datetime
+from unittest import mock
+
+
+class _Row(dict):
+    __getattr__ = dict.get
+
+
+class MemoryCatalog:
+    """get_all en memoria con los operadores que usa igctools."""
+
+    def __init__(self, rows=None):
+        self.rows = {}
+        for row in rows or []:
+            self.rows[row["name"]] = row
+
+    def _match(self, row, flt):
+        field, op, value = flt
+        v = row.get(field)
+        op = op.lower()
+        if op == "is":
+            is_set = v not in (None, "")
+            return is_set if value == "set" else not is_set
+        if op == "=":
+            return v == value
+        if op == "!=":
+            # Frappe aplica ifnull(...) en !=
+            return (v if v is not None else 0) != value
+        if op == "not in":
+            # También con ifnull(...): NULL cuenta como ""
+            return (v if v is not None else "") not in value
+        if v is None:
+            return False
+        if op == ">":
+            return v > value
+        if op == ">=":
+            return v >= value
+        if op == "<":
+            return v < value
+        if op == "<=":
+            return v <= value
+        if op == "in":
+            return v in value
+        raise NotImplementedError(op)
+
+    def _normalize(self, filters):
+        if not filters:
+            return []
+        if isinstance(filters, dict):
+            out = []
+            for field, value in filters.items():
+                if isinstance(value, list | tuple):
+                    out.append((field, value[0], value[1]))
+                else:
+                    out.append((field, "=", value))
+            return out
+        return [tuple(f[-3:]) for f in filters]
+
+    def get_all(self, doctype, filters=None, fields=None, order_by=None, start=0,
+                page_length=0, limit=None, limit_page_length=None, **kwargs):
+        flts = self._normalize(filters)
+        rows = [r for r in self.rows.values() if all(self._match(r, f) for f in flts)]
+        if order_by:
+            field, _, direction = order_by.partition(" ")
+            rows.sort(key=lambda r: r.get(field), reverse=direction.strip().lower() == "desc")
+        rows = rows[int(start or 0):]
+        size = page_length or limit or limit_page_length
+        if size:
+            rows = rows[: int(size)]
+        fields = fields or ["name"]
+        return [_Row({f: r.get(f) for f in fields}) for r in rows]
+
+    def count(self, doctype, filters=None, **kwargs):
+        return len(self.get_all(doctype, filters=filters))
+
+
+class MemoryCache(dict):
+    """Subconjunto de RedisWrapper usado por igctools, en un dict."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+
+    def make_key(self, key, *args, **kwargs):
+        return key
+
+    def _request_cache(self):
+        # Como RedisWrapper: frappe.local.cache memoriza lecturas por request
+        import frappe
+
+        return getattr(frappe.local, "cache", None)
+
+    def get_value(self, key, *args, expires=False, **kwargs):
+        memo = None if expires else self._request_cache()
+        if memo is not None and key in memo:
+            return memo[key]
+        value = self.get(key)
+        if memo is not None:
+            # También los misses: el request no vuelve a leer de Redis
+            memo[key] = value
+        return value
+
+    def set_value(self, key, value, expires_in_sec=None, *args, **kwargs):
+        memo = self._request_cache()
+        if memo is not None:
+            if expires_in_sec:
+                memo.pop(key, None)
+            else:
+                memo[key] = value
+        self[key] = (value, time.time() + expires_in_sec if expires_in_sec else None)
+
+    def delete_value(self, keys, *args, **kwargs):
+        memo = self._request_cache() or {}
+        for key in keys if isinstance(keys, list | tuple) else [keys]:
+            memo.pop(key, None)
+            self.pop(key, None)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.pop(key, None)
+
+    def _zset(self, key):
+        return self.setdefault(key, ({}, None))[0]
+
+    def zadd(self, key, mapping, *args, **kwargs):
+        self._zset(key).update(mapping)
+
+    def zcard(self, key):
+        return len(self._zset(key))
+
+    def zpopmin(self, key, count=1):
+        zset = self._zset(key)
+        items = sorted(zset.items(), key=lambda kv: kv[1])[:count]
+        for k, _s in items:
+            zset.pop(k, None)
+        return items
+
+    def zrange(self, key, start, end, *args, **kwargs):
+        items = [k for k, _s in sorted(self._zset(key).items(), key=lambda kv: kv[1])]
+        return items[start:] if end == -1 else items[start : end + 1]
+
+    def expire(self, *args, **kwargs):
+        return True
+
+    # Comandos "crudos" (lock y contadores de single_flight, esperas de jobs)
+    def _bytes(self, value):
+        return value if isinstance(value, bytes) else str(value).encode()
+
+    def set(self, key, value, nx=False, ex=None, *args, **kwargs):
+        with self._lock:
+            if nx and self.get(key) is not None:
+                return None
+            self[key] = (self._bytes(value), time.time() + ex if ex else None)
+            return True
+
+    def get(self, key, default=None):
+        entry = dict.get(self, key)
+        if entry is None:
+            return default
+        value, expires = entry
+        if expires and expires < time.time():
+            self.pop(key, None)
+            return default
+        return value
+
+    def exists(self, *keys):
+        return sum(1 for key in keys if self.get(key) is not None)
+
+    def eval(self, script, numkeys, *args):
+        # Solo el compare-and-delete del lock de igc_cache
+        if "del" not in script:
+            raise NotImplementedError(script)
+        key, token = args[0], args[numkeys]
+        with self._lock:
+            if self.get(key) == self._bytes(token):
+                self.pop(key, None)
+                return 1
+        return 0
+
+    def _hash(self, key):
+        return self.setdefault(key, ({}, None))[0]
+
+    def hincrby(self, key, field, amount=1):
+        with self._lock:
+            h = self._hash(key)
+            h[self._bytes(field)] = h.get(self._bytes(field), 0) + int(amount)
+            return h[self._bytes(field)]
+
+    def hgetall(self, key):
+        return dict(self._hash(key))
+
+    def sadd(self, key, *values):
+        self._hash(key).update(dict.fromkeys(self._bytes(v) for v in values))
+
+    def srem(self, key, *values):
+        members = self._hash(key)
+        for v in values:
+            members.pop(self._bytes(v), None)
+
+    def smembers(self, key):
+        return set(self._hash(key))
+
+    def __call__(self):
+        return self
+
+
+class MemoryDB:
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.globals = {}
+
+    def get_value(self, doctype, name, fieldname=None, *args, as_dict=False, **kwargs):
+        row = self.catalog.rows.get(name)
+        if row is None:
+            return None
+        if isinstance(fieldname, list | tuple):
+            if as_dict:
+                return _Row({f: row.get(f) for f in fieldname})
+            return tuple(row.get(f) for f in fieldname)
+        return row.get(fieldname or "name")
+
+    def set_value(self, doctype, name, fieldname, value=None, *args, **kwargs):
+        row = self.catalog.rows.get(name)
+        if row is None:
+            return
+        if isinstance(fieldname, dict):
+            row.update(fieldname)
+        else:
+            row[fieldname] = value
+
+    def count(self, doctype, filters=None, *args, **kwargs):
+        return self.catalog.count(doctype, filters=filters)
+
+    def exists(self, doctype, name=None, *args, **kwargs):
+        return name in self.catalog.rows if isinstance(name, str) else True
+
+    def get_global(self, key, *args, **kwargs):
+        return self.globals.get(key)
+
+    def set_global(self, key, value, *args, **kwargs):
+        self.globals[key] = value
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def _stub_frappe_module():
+    """Módulo frappe mínimo para importar igctools en una máquina sin bench."""
+    frappe = types.ModuleType("frappe")
+    utils = types.ModuleType("frappe.utils")
+
+    def cint(value):
+        try:
+            return int(float(value or 0))
+        except Exception:
+            return 0
+
+    def flt(value, precision=None):
+        try:
+            value = float(value or 0)
+        except Exception:
+            value = 0.0
+        return round(value, precision) if precision is not None else value
+
+    utils.cint = cint
+    utils.flt = flt
+    utils.cstr = lambda value: "" if value is None else str(value)
+    utils.now_datetime = datetime.now
+
+    def whitelist(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda fn: fn
+
+    def throw(msg, *args, **kwargs):
+        raise Exception(msg)
+
+    frappe.utils = utils
+    frappe.whitelist = whitelist
+    frappe.throw = throw
+    frappe.local = types.SimpleNamespace(site="bench")
+    frappe.session = types.SimpleNamespace(user="Administrator")
+    frappe.flags = types.SimpleNamespace()
+    frappe._dict = _Row
+    return frappe, utils
+
+
+def ensure_frappe():
+    """Importa frappe; si no está instalado registra el módulo mínimo."""
+    try:
+        import frappe
+    except ImportError:
+        frappe, utils = _stub_frappe_module()
+        sys.modules["frappe"] = frappe
+        sys.modules["frappe.utils"] = utils
+
+
+class _RequestLocal(threading.local):
+    """frappe.local por hilo, cada uno con su memo de lecturas del cache."""
+
+    def __init__(self):
+        self.site = "bench"
+        self.cache = {}
+
+
+@contextlib.contextmanager
+def frappe_sandbox(rows=None):
+    """
+    Parchea frappe (real o mínimo) con catálogo, BD y cache en memoria.
+    Devuelve (catalog, cache) para inspección.
+    """
+    ensure_frappe()
+    import frappe
+
+    catalog = MemoryCatalog(rows)
+    cache = MemoryCache()
+    db = MemoryDB(catalog)
+    counter = iter(range(1, 1 << 62))
+
+    patches = {
+        "get_all": catalog.get_all,
+        "get_list": catalog.get_all,
+        "cache": cache,
+        "db": db,
+        "local": _RequestLocal(),
+        "log_error": lambda *args, **kwargs: None,
+        "publish_realtime": lambda *args, **kwargs: None,
+        "parse_json": lambda value: json.loads(value) if isinstance(value, str) else value,
+        "generate_hash": lambda *args, **kwargs: f"bench{next(counter)}",
+        "has_permission": lambda *args, **kwargs: True,
+    }
+    with contextlib.ExitStack() as stack:
+        for attr, value in patches.items():
+            stack.enter_context(mock.patch.object(frappe, attr, value, create=True))
+        yield catalog, cache
+
+
+def use_frappe_sandbox(testcase, rows=None):
+    """frappe_sandbox(rows) durante un test: se cierra en su cleanup."""
+    sandbox = frappe_sandbox(rows)
+    catalog, cache = sandbox.__enter__()
+    testcase.addCleanup(sandbox.__exit__, None, None, None)
+    return catalog, cache